@@ -6,6 +6,7 @@ import smart_open
 import tarfile
 
 from omegaml.backends.basecommon import BackendBaseCommon
+from omegaml.backends.runtime.modelcache import model_cache
 from omegaml.util import reshaped
 
 
@@ -119,8 +120,20 @@ class BaseModelBackend(BackendBaseCommon):
         return self.put_model(obj, name, uri=uri, **kwargs)
 
     def drop(self, name, force=False, version=-1, **kwargs):
+        model_cache.invalidate(self.model_store, name)
         return self.model_store._drop(name, force=force, version=version)
 
+    def _get_cached_model(self, name):
+        """
+        get the model for inference, using the process-local model cache if enabled
+
+        Use this instead of self.model_store.get() in methods that do not modify
+        the model, e.g. predict(). See omegaml.backends.runtime.modelcache.ModelCache
+
+        .. versionadded:: NEXT
+        """
+        return model_cache.get(self.model_store, name)
+
     def _package_model(self, model, key, tmpfn, serializer=None, **kwargs):
         """
         implement this method to serialize a model to the given tmpfn
@@ -265,6 +278,7 @@ class BaseModelBackend(BackendBaseCommon):
         packagefname = self._package_model(obj, storekey, tmpfn, **kwargs) or tmpfn
         gridfile = self._store_to_file(self.model_store, packagefname, storekey, uri=uri)
         self._remove_path(packagefname)
+        model_cache.invalidate(self.model_store, name)
         kind_meta = {
             self._backend_version_tag: self._backend_version,
         }
@@ -291,7 +305,7 @@ class BaseModelBackend(BackendBaseCommon):
         :param kwargs: kwargs passed to the model's predict method
         :return: return the predicted outcome
         """
-        model = self.model_store.get(modelname)
+        model = self._get_cached_model(modelname)
         data = self._resolve_input_data('predict', Xname, 'X', **kwargs)
         infer = getattr(self.infer, '__func__')  # __func__ is the unbound method
         reshape = getattr(self.reshape, '__func__')
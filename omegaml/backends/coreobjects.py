@@ -11,7 +11,7 @@ from omegaml.store import MongoQueryOps, Filter
 from omegaml.store.fastinsert import fast_insert, default_chunksize
 from omegaml.store.queryops import sanitize_filter
 from omegaml.util import is_dataframe, is_series, is_ndarray, ensure_index, unravel_index, jsonescape, \
-    cursor_to_dataframe, convert_dtypes, restore_index, signature, make_tuple, mongo_compatible
+    cursor_to_dataframe, collection_to_dataframe, convert_dtypes, restore_index, signature, make_tuple, mongo_compatible
 
 
 class CoreObjectsBackend(BaseDataBackend):
@@ -159,6 +159,43 @@ class CoreObjectsBackend(BaseDataBackend):
         # store dataframe indicies
         # FIXME this may be a performance issue, use size stored on stats or metadata
         row_count = self.collection(name).estimated_document_count()
+        obj, kind_meta = self.dataframe_to_documents(obj, row_count=row_count, ensure_compat=ensure_compat)
+        # create mongon indicies for data frame index columns
+        df_idxcols = [col for col in obj.columns if col.startswith('_idx#')]
+        if df_idxcols:
+            keys, idx_kwargs = MongoQueryOps().make_index(df_idxcols)
+            ensure_index(collection, keys, **idx_kwargs)
+        # create index on row id
+        keys, idx_kwargs = MongoQueryOps().make_index(['_om#rowid'])
+        ensure_index(collection, keys, **idx_kwargs)
+        # bulk insert
+        _fast_insert(obj, self, name, chunksize=chunksize)
+        kind = (MDREGISTRY.PANDAS_SEROWS
+                if store_series
+                else MDREGISTRY.PANDAS_DFROWS)
+        meta = self.store._make_metadata(name=name,
+                                         prefix=self.store.prefix,
+                                         bucket=self.store.bucket,
+                                         kind=kind,
+                                         kind_meta=kind_meta,
+                                         attributes=attributes,
+                                         collection=collection.name)
+        return meta.save()
+
+    def dataframe_to_documents(self, obj, row_count=0, ensure_compat=True):
+        """
+        convert a dataframe to the columns and values stored as documents
+
+        :param obj: the dataframe
+        :param row_count: the row id of the first row
+        :param ensure_compat: if True convert values to mongodb compatibility,
+           see put_dataframe_as_documents()
+        :return: tuple of (dataframe, kind_meta), where the dataframe contains
+           the index columns, _om#rowid and values as object dtype
+
+        .. versionadded:: NEXT
+        """
+        import pandas as pd
         # fixes #466, ensure column names are strings in a multiindex
         if isinstance(obj.columns, pd.MultiIndex):
             obj.columns = obj.columns.map('_'.join)
@@ -177,15 +214,6 @@ class CoreObjectsBackend(BaseDataBackend):
         }
         # ensure column names to be strings
         obj.columns = stored_columns
-        # create mongon indicies for data frame index columns
-        df_idxcols = [col for col in obj.columns if col.startswith('_idx#')]
-        if df_idxcols:
-            keys, idx_kwargs = MongoQueryOps().make_index(df_idxcols)
-            ensure_index(collection, keys, **idx_kwargs)
-        # create index on row id
-        keys, idx_kwargs = MongoQueryOps().make_index(['_om#rowid'])
-        ensure_index(collection, keys, **idx_kwargs)
-        # bulk insert
         # -- get native objects
         # -- seems to be required since pymongo 3.3.x. if not converted
         #    pymongo raises Cannot Encode object for int64 types
@@ -194,18 +222,7 @@ class CoreObjectsBackend(BaseDataBackend):
                 if 'datetime' in col_dtype:
                     obj[col].fillna('', inplace=True)
         obj = obj.astype('O', errors='ignore')
-        _fast_insert(obj, self, name, chunksize=chunksize)
-        kind = (MDREGISTRY.PANDAS_SEROWS
-                if store_series
-                else MDREGISTRY.PANDAS_DFROWS)
-        meta = self.store._make_metadata(name=name,
-                                         prefix=self.store.prefix,
-                                         bucket=self.store.bucket,
-                                         kind=kind,
-                                         kind_meta=kind_meta,
-                                         attributes=attributes,
-                                         collection=collection.name)
-        return meta.save()
+        return obj, kind_meta
 
     def put_dataframe_as_dfgroup(self, obj, name, groupby, attributes=None):
         """
@@ -364,13 +381,18 @@ class CoreObjectsBackend(BaseDataBackend):
         else:
             # TODO ensure the same processing is applied in MDataFrame
             # TODO this method should always use a MDataFrame disregarding lazy
-            if filter:
-                query = Filter(collection, **filter).query
-                cursor = FilteredCollection(collection).find(filter=query, projection=columns)
+            query = Filter(collection, **filter).query if filter else None
+            dtypes = meta.kind_meta.get('dtypes') if hasattr(meta, 'kind_meta') else None
+            readers = dict(getattr(self.store.defaults, 'OMEGA_DATAFRAME_READERS', None) or {})
+            n_jobs = int(readers.get('n_jobs') or 1)
+            if n_jobs > 1 and collection.estimated_document_count() >= int(readers.get('min_rows', 0)):
+                # read by parallel cursors
+                df = collection_to_dataframe(FilteredCollection(collection), filter=query, projection=columns,
+                                             dtypes=dtypes, n_jobs=n_jobs,
+                                             chunk_size=readers.get('chunksize') or 50000)
             else:
-                cursor = FilteredCollection(collection).find(projection=columns)
-            # restore dataframe
-            df = cursor_to_dataframe(cursor)
+                cursor = FilteredCollection(collection).find(filter=query, projection=columns)
+                df = cursor_to_dataframe(cursor, dtypes=dtypes)
             if '_id' in df.columns:
                 del df['_id']
             if hasattr(meta, 'kind_meta'):
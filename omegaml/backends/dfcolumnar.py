@@ -0,0 +1,321 @@
+import re
+
+import numpy as np
+import pandas as pd
+from bson import Binary
+
+from omegaml.backends.basedata import BaseDataBackend
+from omegaml.store import MongoQueryOps
+from omegaml.util import is_dataframe, unravel_index, jsonescape, restore_index, ensure_index
+
+
+class PandasColumnarBackend(BaseDataBackend):
+    """
+    Store pandas DataFrames as column-chunk blocks
+
+    Instead of one document per row (pandas.dfrows), every column is split into
+    chunks of rows and each chunk is stored as a single binary document. Numeric,
+    boolean and datetime columns are stored as raw NumPy buffers, all other
+    columns as a list of values. Every chunk records its row range and min/max
+    statistics, so that column projections, row ranges and simple filters only
+    read the chunks required.
+
+    Usage::
+
+        # store
+        om.datasets.put(df, 'foo', as_columnar=True)
+        # get back all data
+        df = om.datasets.get('foo')
+        # get only some columns and a range of rows
+        df = om.datasets.get('foo', columns=['x', 'y'], rows=slice(1000, 2000))
+        # filter, only chunks that may contain matching rows are read
+        df = om.datasets.get('foo', x__gte=5)
+        # iterate in chunks of rows
+        for chunkdf in om.datasets.get('foo', chunksize=10000):
+            ...
+
+    Storage format::
+
+        {
+            '_om#column': the stored column name,
+            '_om#start': the first row of this chunk (inclusive),
+            '_om#stop': the last row of this chunk (exclusive),
+            'encoding': 'ndarray' | 'list',
+            'dtype': the numpy dtype (ndarray encoding only),
+            'min': the minimum value (ndarray encoding only),
+            'max': the maximum value (ndarray encoding only),
+            'data': the binary buffer (ndarray) or list of values (list),
+        }
+
+    Notes:
+        * reading a single chunk returns a read-only view on the buffer
+          as returned from MongoDB, i.e. no data is copied
+        * filters support the operators eq, gt, gte, lt, lte, e.g.
+          x__gte=5, use a dict (filter=) to specify multiple operators
+          on the same column
+
+    .. versionadded:: NEXT
+    """
+    KIND = 'pandas.dfcolumnar'
+    #: max size of a single chunk document, must be < 16MB (BSON limit)
+    MAX_CHUNK_BYTES = 8 * 1024 * 1024
+    #: default number of rows per chunk
+    DEFAULT_CHUNKROWS = 100000
+    #: filter operators and their chunk pruning conditions on min, max
+    PRUNE_OPS = {
+        'eq': lambda v: {'min': {'$lte': v}, 'max': {'$gte': v}},
+        'gt': lambda v: {'max': {'$gt': v}},
+        'gte': lambda v: {'max': {'$gte': v}},
+        'lt': lambda v: {'min': {'$lt': v}},
+        'lte': lambda v: {'min': {'$lte': v}},
+    }
+    #: filter operators applied on the retrieved data
+    FILTER_OPS = {
+        'eq': lambda s, v: s == v,
+        'gt': lambda s, v: s > v,
+        'gte': lambda s, v: s >= v,
+        'lt': lambda s, v: s < v,
+        'lte': lambda s, v: s <= v,
+    }
+
+    _tz_pattern = re.compile(r'datetime64\[\w+, (.*)\]')
+
+    @classmethod
+    def supports(self, obj, name, as_columnar=False, data_store=None, **kwargs):
+        return is_dataframe(obj) and bool(as_columnar)
+
+    def put(self, obj, name, attributes=None, append=None, chunksize=None, as_columnar=True, **kwargs):
+        """
+        store a dataframe as column-chunk blocks
+
+        Args:
+            obj (pd.DataFrame): the dataframe to store
+            name (str): the name of the dataset
+            attributes (dict): optional, the attributes to store in metadata
+            append (bool): if False an existing dataset is replaced, if True or
+              None rows are appended. If None and the dataset exists, a warning
+              is issued. Appended dataframes must have the same columns.
+            chunksize (int): optional, the number of rows per chunk, defaults to
+              DEFAULT_CHUNKROWS. The effective number of rows is limited so
+              that a chunk does not exceed MAX_CHUNK_BYTES.
+
+        Returns:
+            Metadata
+        """
+        collection = self.data_store.collection(name)
+        meta = self.data_store.metadata(name)
+        if append is False or (meta is not None and meta.kind != self.KIND):
+            self.data_store.drop(name, force=True)
+            collection = self.data_store.collection(name)
+            meta = None
+        elif append is None and meta is not None:
+            from warnings import warn
+            warn('%s already exists, will append rows' % name)
+        row_count = meta.kind_meta.get('rows', 0) if meta is not None else 0
+        # fixes #466, ensure column names are strings in a multiindex
+        if isinstance(obj.columns, pd.MultiIndex):
+            obj.columns = obj.columns.map('_'.join)
+        obj, idx_meta = unravel_index(obj)
+        del obj['_om#rowid']
+        stored_columns = [jsonescape(col) for col in obj.columns]
+        column_map = list(zip(obj.columns, stored_columns))
+        obj.columns = stored_columns
+        dtypes = {col: dtype.name for col, dtype in obj.dtypes.items()}
+        if meta is not None and set(meta.kind_meta.get('dtypes', {})) != set(dtypes):
+            raise ValueError(f'cannot append to {name}, columns do not match')
+        chunkrows = self._chunkrows(obj, chunksize)
+        keys, idx_kwargs = MongoQueryOps().make_index(['_om#column', '_om#start'])
+        ensure_index(collection, keys, **idx_kwargs)
+        if len(obj):
+            collection.insert_many(self._iter_chunk_documents(obj, row_count, chunkrows))
+        kind_meta = {
+            'columns': column_map,
+            'dtypes': dtypes,
+            'idx_meta': idx_meta,
+            'rows': row_count + len(obj),
+            'chunkrows': chunkrows,
+        }
+        return self.data_store.make_metadata(name, self.KIND,
+                                             kind_meta=kind_meta,
+                                             attributes=attributes,
+                                             collection=collection.name).save()
+
+    def get(self, name, version=-1, force_python=False, lazy=False, columns=None, rows=None,
+            filter=None, chunksize=None, **kwargs):
+        """
+        retrieve a dataframe stored as column-chunk blocks
+
+        Args:
+            name (str): the name of the dataset
+            columns (list): optional, the list of columns to retrieve
+            rows (slice|tuple): optional, the range of rows to retrieve as
+              slice(start, stop) or (start, stop). stop is exclusive
+            filter (dict): optional, the filter as a column__op=value dict, the
+              filter is applied after retrieval, however only chunks that may
+              contain matching rows are read
+            chunksize (int): optional, if specified returns an iterator of
+              DataFrames of chunksize rows each
+            **kwargs: if filter is not specified, any other kwargs are used
+              as the filter
+
+        Returns:
+            pd.DataFrame, or an iterator of pd.DataFrame if chunksize is specified
+        """
+        meta = self.data_store.metadata(name)
+        filter = filter or kwargs
+        start, stop = self._resolve_rows(rows, meta.kind_meta.get('rows', 0))
+        if chunksize:
+            return (self._get_range(meta, columns, filter, i, min(i + chunksize, stop))
+                    for i in range(start, stop, chunksize))
+        return self._get_range(meta, columns, filter, start, stop)
+
+    def _get_range(self, meta, columns, filter, start, stop):
+        # read the columns and rows as specified, applying filter
+        collection = self.data_store.collection(meta.name)
+        kind_meta = meta.kind_meta
+        column_map = dict(kind_meta['columns'])
+        dtypes = kind_meta['dtypes']
+        idx_cols = [col for col in dtypes if col.startswith('_idx#')]
+        if columns:
+            stored = [column_map.get(col, col) for col in columns]
+            data_cols = [col for col in dtypes if col in stored and col not in idx_cols]
+        else:
+            data_cols = [col for col in dtypes if col not in idx_cols]
+        conditions = self._parse_filter(filter, column_map)
+        read_cols = list(dict.fromkeys(idx_cols + data_cols + [col for col, op, v in conditions]))
+        query = {
+            '_om#column': {'$in': read_cols},
+            '_om#start': {'$lt': stop},
+            '_om#stop': {'$gt': start},
+        }
+        if conditions:
+            query['_om#start']['$in'] = self._pruned_chunks(collection, conditions, start, stop)
+        blocks = {col: [] for col in read_cols}
+        cursor = collection.find(query, projection={'_id': 0}).sort('_om#start', 1)
+        for doc in cursor:
+            values = self._decode_chunk(doc)
+            lo = max(start - doc['_om#start'], 0)
+            hi = min(stop, doc['_om#stop']) - doc['_om#start']
+            blocks[doc['_om#column']].append(values[lo:hi])
+        data = {col: self._concat_blocks(blocks[col], dtypes[col]) for col in read_cols}
+        df = pd.DataFrame(data, columns=read_cols, copy=False)
+        if conditions:
+            mask = np.ones(len(df), dtype=bool)
+            for col, op, value in conditions:
+                mask &= np.asarray(self.FILTER_OPS[op](df[col], value))
+            df = df[mask]
+        df = df[idx_cols + data_cols]
+        df = restore_index(df, kind_meta.get('idx_meta', {}), rowid_sort=False)
+        orig_columns = {stored: orig for orig, stored in kind_meta['columns']}
+        df.rename(columns=orig_columns, inplace=True)
+        return df
+
+    def _chunkrows(self, obj, chunksize):
+        # number of rows per chunk, limited by MAX_CHUNK_BYTES of the widest column
+        chunkrows = chunksize or self.DEFAULT_CHUNKROWS
+        if len(obj):
+            bytes_per_row = max(obj.memory_usage(index=False, deep=True)) / len(obj)
+            chunkrows = min(chunkrows, int(self.MAX_CHUNK_BYTES // max(bytes_per_row, 1)))
+        return max(chunkrows, 1)
+
+    def _iter_chunk_documents(self, obj, row_count, chunkrows):
+        # yield one document per column and chunk of rows
+        for i in range(0, len(obj), chunkrows):
+            chunkdf = obj.iloc[i:i + chunkrows]
+            for col in chunkdf.columns:
+                doc = {
+                    '_om#column': col,
+                    '_om#start': row_count + i,
+                    '_om#stop': row_count + i + len(chunkdf),
+                }
+                doc.update(self._encode_chunk(chunkdf[col]))
+                yield doc
+
+    def _encode_chunk(self, series):
+        # encode a column chunk as a binary buffer with min/max stats, or a list of values
+        dtype = series.dtype
+        if isinstance(dtype, pd.DatetimeTZDtype):
+            series = series.dt.tz_convert('UTC').dt.tz_localize(None)
+            dtype = series.dtype
+        if isinstance(dtype, np.dtype) and dtype.kind in 'biufmM':
+            values = np.ascontiguousarray(series.values)
+            doc = {
+                'encoding': 'ndarray',
+                'dtype': values.dtype.str,
+                'data': Binary(values.tobytes()),
+            }
+            valid = values[~pd.isna(values)] if dtype.kind in 'fM' else values
+            if len(valid) and dtype.kind == 'M':
+                doc.update({'min': pd.Timestamp(valid.min()).to_pydatetime(),
+                            'max': pd.Timestamp(valid.max()).to_pydatetime()})
+            elif len(valid) and dtype.kind in 'biuf':
+                doc.update({'min': valid.min().item(), 'max': valid.max().item()})
+            return doc
+        values = series.astype('O')
+        return {
+            'encoding': 'list',
+            'data': values.where(series.notna(), None).tolist(),
+        }
+
+    def _decode_chunk(self, doc):
+        # decode a column chunk, ndarray chunks are read-only views on the buffer
+        if doc['encoding'] == 'ndarray':
+            return np.frombuffer(doc['data'], dtype=np.dtype(doc['dtype']))
+        return np.asarray(doc['data'], dtype='O')
+
+    def _concat_blocks(self, blocks, dtype):
+        # concatenate blocks, restoring the original dtype
+        values = blocks[0] if len(blocks) == 1 else (np.concatenate(blocks) if blocks else np.array([]))
+        tz_match = self._tz_pattern.match(dtype)
+        if tz_match:
+            return pd.Series(values).dt.tz_localize('UTC').dt.tz_convert(tz_match.groups()[0])
+        if values.dtype.kind == 'O' and dtype not in ('object', 'O'):
+            try:
+                return pd.Series(values).astype(dtype)
+            except (TypeError, ValueError):
+                pass
+        return values
+
+    def _parse_filter(self, filter, column_map):
+        # parse column__op=value filters into (stored column, op, value)
+        conditions = []
+        for key, value in (filter or {}).items():
+            col, op = key.rsplit('__', 1) if '__' in key else (key, 'eq')
+            col = column_map.get(col, col)
+            if isinstance(value, dict):
+                conditions.extend((col, k, v) for k, v in value.items())
+            else:
+                conditions.append((col, op, value))
+        for col, op, value in conditions:
+            if op not in self.FILTER_OPS:
+                raise ValueError(f'filter operator {op} is not supported, use one of {list(self.FILTER_OPS)}')
+        return conditions
+
+    def _pruned_chunks(self, collection, conditions, start, stop):
+        # get the start rows of all chunks that may contain rows matching all conditions
+        starts = None
+        for col, op, value in conditions:
+            value = value.to_pydatetime() if isinstance(value, pd.Timestamp) else value
+            query = {
+                '_om#column': col,
+                '_om#start': {'$lt': stop},
+                '_om#stop': {'$gt': start},
+                # chunks without stats (list encoding) cannot be pruned
+                '$or': [self.PRUNE_OPS[op](value), {'min': {'$exists': False}}],
+            }
+            matching = set(collection.distinct('_om#start', query))
+            starts = matching if starts is None else starts & matching
+        return sorted(starts)
+
+    def _resolve_rows(self, rows, total):
+        # resolve a rows specification to (start, stop)
+        if rows is None:
+            return 0, total
+        if isinstance(rows, slice):
+            if rows.step not in (None, 1):
+                raise ValueError('rows does not support a step')
+            rows = rows.start, rows.stop
+        start, stop = rows
+        start = 0 if start is None else (start + total if start < 0 else start)
+        stop = total if stop is None else (stop + total if stop < 0 else min(stop, total))
+        return start, stop
@@ -0,0 +1,192 @@
+from io import BytesIO
+
+import numpy as np
+
+
+class IVFIndex:
+    """ inverted file index for approximate nearest neighbour search
+
+    The index partitions all vectors into ``nlist`` clusters by k-means.
+    A query is compared to the cluster centroids first, and then only to
+    the vectors in the ``nprobe`` nearest clusters. Until the index holds
+    ``train_size`` vectors it is not trained and every query is an exact
+    search over all vectors.
+
+    Changes to the index can be written as segments, that is as a full
+    snapshot of the index, or as a list of added or removed vectors. Applying
+    the segments in the same order recreates the index, which allows
+    to persist the index incrementally.
+
+    Usage::
+
+        index = IVFIndex(nlist=100, nprobe=8)
+        index.add(ids, doc_ids, vectors)
+        index.search(vector, top=5)
+        => [(id, distance), ...]
+
+    .. versionadded:: NEXT
+    """
+
+    def __init__(self, nlist=100, nprobe=8, train_size=None):
+        self.nlist = int(nlist)
+        self.nprobe = int(nprobe)
+        self.train_size = int(train_size or self.nlist * 40)
+        self.centroids = None
+        self.ids = np.array([], dtype=str)
+        self.doc_ids = np.array([], dtype=str)
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.lists = np.array([], dtype=np.int32)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def is_trained(self):
+        return self.centroids is not None
+
+    def add(self, ids, doc_ids, vectors, lists=None):
+        """ add vectors to the index
+
+        Args:
+            ids (list): the id of each vector
+            doc_ids (list): the document id of each vector
+            vectors (list|np.ndarray): the vectors, as a 2-D list or array
+            lists (np.ndarray): optional, the cluster of each vector, defaults
+               to the nearest centroid
+
+        Returns:
+            True if the index was trained as a result of adding the vectors,
+            False otherwise
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        vectors = vectors.reshape(len(ids), -1) if len(ids) else vectors.reshape(0, self.vectors.shape[1])
+        if lists is None:
+            lists = self._assign(vectors) if self.is_trained else np.full(len(vectors), -1, dtype=np.int32)
+        self.ids = np.concatenate([self.ids, np.asarray(ids, dtype=str)])
+        self.doc_ids = np.concatenate([self.doc_ids, np.asarray(doc_ids, dtype=str)])
+        self.vectors = np.concatenate([self.vectors, vectors]) if len(self.vectors) else vectors
+        self.lists = np.concatenate([self.lists, np.asarray(lists, dtype=np.int32)])
+        if not self.is_trained and len(self) >= self.train_size:
+            self.train()
+            return True
+        return False
+
+    def remove(self, ids=None, doc_ids=None):
+        """ remove vectors by id or by document id
+
+        Returns:
+            the number of vectors removed
+        """
+        drop = np.zeros(len(self), dtype=bool)
+        if ids is not None:
+            drop |= np.isin(self.ids, np.asarray(ids, dtype=str))
+        if doc_ids is not None:
+            drop |= np.isin(self.doc_ids, np.asarray(doc_ids, dtype=str))
+        keep = ~drop
+        self.ids, self.doc_ids = self.ids[keep], self.doc_ids[keep]
+        self.vectors, self.lists = self.vectors[keep], self.lists[keep]
+        return int(drop.sum())
+
+    def train(self, iterations=10, seed=42):
+        """ cluster all vectors by k-means and assign each vector to its cluster """
+        rng = np.random.default_rng(seed)
+        nlist = min(self.nlist, len(self))
+        sample_size = min(len(self), nlist * 256)
+        sample = self.vectors[rng.choice(len(self), sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assigned = self._nearest(sample, centroids, 1)[:, 0]
+            for i in range(nlist):
+                members = sample[assigned == i]
+                if len(members):
+                    centroids[i] = members.mean(axis=0)
+        self.centroids = centroids
+        self.lists = self._assign(self.vectors)
+
+    def search(self, vector, top=5, metric='l2', doc_ids=None):
+        """ find the nearest vectors
+
+        Args:
+            vector (list|np.ndarray): the query vector
+            top (int): the number of results
+            metric (str): 'l2' or 'cos'
+            doc_ids (list): optional, only consider vectors of these documents
+
+        Returns:
+            list of tuples (id, distance), sorted by distance
+        """
+        query = np.asarray(vector, dtype=np.float32).reshape(-1)
+        candidates = np.ones(len(self), dtype=bool)
+        if self.is_trained:
+            nprobe = min(self.nprobe, len(self.centroids))
+            probes = self._nearest(query[None, :], self.centroids, nprobe)[0]
+            candidates &= np.isin(self.lists, probes) | (self.lists < 0)
+        if doc_ids is not None:
+            candidates &= np.isin(self.doc_ids, np.asarray(doc_ids, dtype=str))
+        rows = np.flatnonzero(candidates)
+        if not len(rows):
+            return []
+        vectors = self.vectors[rows]
+        if metric == 'l2':
+            dists = np.sqrt(np.maximum(((vectors - query) ** 2).sum(axis=1), 0))
+        elif metric == 'cos':
+            with np.errstate(divide='ignore', invalid='ignore'):
+                dists = 1 - vectors @ query / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query))
+        else:
+            raise ValueError(f"Unsupported distance metric: {metric}")
+        top = min(top, len(rows))
+        best = np.argpartition(dists, top - 1)[:top] if top < len(rows) else np.arange(len(rows))
+        best = best[np.argsort(dists[best], kind='stable')]
+        return [(str(self.ids[rows[i]]), float(dists[i])) for i in best]
+
+    def snapshot(self):
+        """ return a segment that contains the full index """
+        arrays = dict(ids=self.ids, doc_ids=self.doc_ids, vectors=self.vectors, lists=self.lists)
+        if self.is_trained:
+            arrays['centroids'] = self.centroids
+        return self._segment('snapshot', **arrays)
+
+    def added(self, ids):
+        """ return a segment that adds the given ids to an index """
+        rows = np.isin(self.ids, np.asarray(ids, dtype=str))
+        return self._segment('add', ids=self.ids[rows], doc_ids=self.doc_ids[rows],
+                             vectors=self.vectors[rows], lists=self.lists[rows])
+
+    def removed(self, ids=None, doc_ids=None):
+        """ return a segment that removes the given ids or document ids from an index """
+        return self._segment('remove',
+                             ids=np.asarray(ids if ids is not None else [], dtype=str),
+                             doc_ids=np.asarray(doc_ids if doc_ids is not None else [], dtype=str))
+
+    def apply(self, segment):
+        """ apply a segment as returned by snapshot(), added() or removed() """
+        data = np.load(BytesIO(segment), allow_pickle=False)
+        op = str(data['op'])
+        if op == 'snapshot':
+            self.centroids = data['centroids'] if 'centroids' in data else None
+            self.ids, self.doc_ids = data['ids'], data['doc_ids']
+            self.vectors, self.lists = data['vectors'], data['lists']
+        elif op == 'add':
+            self.add(data['ids'], data['doc_ids'], data['vectors'], lists=data['lists'])
+        elif op == 'remove':
+            self.remove(ids=data['ids'], doc_ids=data['doc_ids'])
+        else:
+            raise ValueError(f'unknown segment {op}')
+        return op
+
+    def _segment(self, op, **arrays):
+        buffer = BytesIO()
+        np.savez(buffer, op=np.array(op), **arrays)
+        return buffer.getvalue()
+
+    def _assign(self, vectors):
+        return self._nearest(vectors, self.centroids, 1)[:, 0].astype(np.int32)
+
+    def _nearest(self, vectors, centroids, n):
+        # indices of the n nearest centroids for each vector, by l2 distance
+        dists = ((vectors ** 2).sum(axis=1)[:, None]
+                 - 2 * vectors @ centroids.T
+                 + (centroids ** 2).sum(axis=1)[None, :])
+        if n < dists.shape[1]:
+            return np.argpartition(dists, n - 1, axis=1)[:, :n]
+        return np.argsort(dists, axis=1)
@@ -0,0 +1,138 @@
+import os
+import threading
+
+import cachetools
+
+
+class ConversationCache:
+    """ process-local cache of conversation histories for TextModel.chat()
+
+    Keeps the messages of recently active conversations in memory, so that
+    each turn of a conversation does not need to reload the full history
+    from the tracking provider. The tracking provider remains the durable
+    source of all messages, i.e. on a cache miss the history is loaded from
+    the tracking provider, and every message is still logged to it.
+
+    The cache holds up to maxsize conversations, least recently used
+    conversations are removed first. A conversation that has not been active
+    for ttl seconds is reloaded on its next turn.
+
+    Usage::
+
+        # enable in config.yml or om.defaults
+        OMEGA_CONVERSATION_CACHE:
+            enabled: true
+            maxsize: 1000
+            ttl: 600
+
+        # get hit/miss counters
+        conversation_cache.stats()
+
+    Notes:
+        * messages logged by other processes are not seen by this process
+          until the conversation expires from its cache. If several
+          processes serve turns of the same conversation, set a short ttl
+          or route the conversation to the same process
+        * the cache is cleared in a forked child process
+
+    .. versionadded:: NEXT
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._pid = os.getpid()
+        self._cache = None
+        self._reset_counters()
+
+    def _reset_counters(self):
+        self.hits = 0
+        self.misses = 0
+
+    def _settings(self, model):
+        defaults = getattr(model.data_store, 'defaults', None)
+        settings = getattr(defaults, 'OMEGA_CONVERSATION_CACHE', None) or {}
+        return (bool(settings.get('enabled', False)), int(settings.get('maxsize', 1000)),
+                float(settings.get('ttl', 600)))
+
+    def _get_cache(self, maxsize, ttl):
+        # get the cache for this process, reinitialize if settings have changed
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._cache = None
+            self._reset_counters()
+        if self._cache is None or (self._cache.maxsize, self._cache.ttl) != (maxsize, ttl):
+            self._cache = cachetools.TTLCache(maxsize=maxsize, ttl=ttl)
+        return self._cache
+
+    def _key(self, model, conversation_id):
+        store = model.data_store
+        experiment = getattr(model.tracking, '_experiment', None)
+        return store.mongo_url.rsplit('@', 1)[-1], store.bucket, str(experiment), conversation_id
+
+    def get(self, model, conversation_id, load):
+        """ get the messages of a conversation
+
+        Args:
+            model (TextModel): the model
+            conversation_id (str): the conversation id
+            load (callable): called on a cache miss, returns the list of messages
+
+        Returns:
+            list of messages, a copy of the cached messages
+        """
+        enabled, maxsize, ttl = self._settings(model)
+        if not enabled:
+            return load()
+        key = self._key(model, conversation_id)
+        with self._lock:
+            messages = self._get_cache(maxsize, ttl).get(key)
+            if messages is not None:
+                self.hits += 1
+                return [dict(m) for m in messages]
+            self.misses += 1
+        messages = list(load() or [])
+        with self._lock:
+            self._get_cache(maxsize, ttl)[key] = [dict(m) for m in messages]
+        return messages
+
+    def append(self, model, conversation_id, messages):
+        """ add messages to a cached conversation, if it is cached """
+        enabled, maxsize, ttl = self._settings(model)
+        if not enabled:
+            return
+        key = self._key(model, conversation_id)
+        with self._lock:
+            cache = self._get_cache(maxsize, ttl)
+            cached = cache.get(key)
+            if cached is not None:
+                # re-assign to reset the expiry time
+                cache[key] = cached + [dict(m) for m in messages]
+
+    def invalidate(self, model, conversation_id):
+        """ remove a conversation from the cache """
+        with self._lock:
+            if self._cache is not None and model.data_store is not None:
+                self._cache.pop(self._key(model, conversation_id), None)
+
+    def clear(self):
+        """ remove all conversations from the cache and reset counters """
+        with self._lock:
+            self._cache.clear() if self._cache is not None else None
+            self._reset_counters()
+
+    def stats(self):
+        """ return cache statistics
+
+        Returns:
+            dict of hits, misses, count (number of conversations cached)
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'count': len(self._cache) if self._cache is not None else 0,
+            }
+
+
+#: the process-local conversation cache
+conversation_cache = ConversationCache()
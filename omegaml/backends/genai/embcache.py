@@ -0,0 +1,208 @@
+import datetime
+import json
+from hashlib import sha256
+
+import numpy as np
+from bson import Binary
+from pymongo import ASCENDING, ReplaceOne
+
+from omegaml.util import grouper, CacheCounters
+
+
+class EmbeddingCache:
+    """ content-addressed cache of embeddings
+
+    Embeddings are stored in a MongoDB collection of the data store's
+    database, keyed by the embedding model (name, base url and parameters,
+    see model_key()) and the sha256 of the text. The text itself is not
+    stored. A batch of texts costs one query to look up all texts, and one
+    call of the embedding function for the texts that are not in the cache.
+
+    The total size of cached embeddings is limited to maxbytes, least
+    recently used embeddings are removed first. The size budget is enforced
+    by sweep(), which is called on fill() at most every sweep_interval seconds.
+
+    Configure in config.yml or om.defaults::
+
+        OMEGA_EMBEDDING_CACHE:
+            enabled: true
+            maxbytes: 1073741824
+            sweep_interval: 300
+
+    Usage::
+
+        cache = EmbeddingCache(om.datasets)
+        key = cache.model_key(model='text-embedding-3-small', dimensions=256)
+        embeddings = cache.embed(key, texts, embed_fn)
+        cache.stats()
+        => {'entries': 10, 'size': 20480, 'hits': 9, 'misses': 1, 'hit_rate': 0.9}
+
+    .. versionadded:: NEXT
+    """
+    #: name of the cache collection
+    collection_name = 'omegaml.genai.embeddings'
+
+    def __init__(self, store, maxbytes=None, sweep_interval=None, chunksize=1000):
+        self.store = store
+        settings = getattr(store.defaults, 'OMEGA_EMBEDDING_CACHE', None) or {}
+        self.maxbytes = maxbytes if maxbytes is not None else settings.get('maxbytes')
+        self.sweep_interval = sweep_interval if sweep_interval is not None else settings.get('sweep_interval', 300)
+        self.chunksize = chunksize
+        self._collection = None
+
+    @classmethod
+    def from_store(cls, store, **kwargs):
+        """ return the cache of store if enabled by OMEGA_EMBEDDING_CACHE, else None """
+        settings = getattr(getattr(store, 'defaults', None), 'OMEGA_EMBEDDING_CACHE', None) or {}
+        return cls(store, **kwargs) if store is not None and settings.get('enabled') else None
+
+    @property
+    def collection(self):
+        if self._collection is None:
+            collection = self.store.mongodb[self.collection_name]
+            collection.create_index([('accessed', ASCENDING)])
+            self._collection = collection
+        return self._collection
+
+    @property
+    def _key(self):
+        return self.collection.full_name
+
+    @staticmethod
+    def model_key(**params):
+        """ return the key of an embedding model, as the sha256 of its parameters """
+        return sha256(json.dumps(params, sort_keys=True, default=str).encode('utf8')).hexdigest()
+
+    @staticmethod
+    def text_key(model_key, text):
+        return '{}:{}'.format(model_key, sha256(str(text).encode('utf8')).hexdigest())
+
+    def lookup(self, model_key, texts):
+        """ return the cached embeddings of texts
+
+        Args:
+            model_key (str): the model key, see model_key()
+            texts (list): the list of texts
+
+        Returns:
+            list of embeddings (list of float), None for texts not in the cache
+        """
+        ids = [self.text_key(model_key, text) for text in texts]
+        found = {}
+        for chunk in grouper(self.chunksize, set(ids)):
+            for doc in self.collection.find({'_id': {'$in': list(chunk)}}, {'embedding': 1}):
+                found[doc['_id']] = np.frombuffer(doc['embedding'], dtype='float64').tolist()
+        if found:
+            self.collection.update_many({'_id': {'$in': list(found)}},
+                                        {'$set': {'accessed': datetime.datetime.now()}})
+        embeddings = [found.get(_id) for _id in ids]
+        hits = sum(1 for e in embeddings if e is not None)
+        _counters.count(self._key, hits=hits, misses=len(ids) - hits)
+        return embeddings
+
+    def fill(self, model_key, texts, embeddings):
+        """ add embeddings of texts to the cache
+
+        Args:
+            model_key (str): the model key, see model_key()
+            texts (list): the list of texts
+            embeddings (list): the embeddings of texts
+        """
+        now = datetime.datetime.now()
+        requests = []
+        for text, embedding in zip(texts, embeddings):
+            data = np.asarray(embedding, dtype='float64').tobytes()
+            _id = self.text_key(model_key, text)
+            requests.append(ReplaceOne({'_id': _id}, {
+                '_id': _id,
+                'model': model_key,
+                'embedding': Binary(data),
+                'size': len(data),
+                'created': now,
+                'accessed': now,
+            }, upsert=True))
+        for chunk in grouper(self.chunksize, requests):
+            self.collection.bulk_write(list(chunk), ordered=False)
+        self.sweep()
+
+    def embed(self, model_key, texts, embed_fn):
+        """ return the embeddings of texts, calling embed_fn for texts not in the cache
+
+        Args:
+            model_key (str): the model key, see model_key()
+            texts (list): the list of texts
+            embed_fn (callable): called as embed_fn(texts) for the missing texts,
+               returns the list of embeddings
+
+        Returns:
+            list of embeddings, in the order of texts
+        """
+        embeddings = self.lookup(model_key, texts)
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            # embed each distinct text once
+            missing_texts = list(dict.fromkeys(texts[i] for i in missing))
+            computed = dict(zip(missing_texts, embed_fn(missing_texts)))
+            self.fill(model_key, list(computed), list(computed.values()))
+            for i in missing:
+                embeddings[i] = computed[texts[i]]
+        return embeddings
+
+    def sweep(self, force=False):
+        """ enforce the size budget, removing least recently used embeddings first
+
+        Without maxbytes there is no budget and nothing is removed.
+
+        Args:
+            force (bool): ignore sweep_interval
+
+        Returns:
+            number of embeddings removed
+        """
+        if not self.maxbytes or not _counters.sweep_due(self._key, self.sweep_interval, force=force):
+            return 0
+        excess = self._size() - self.maxbytes
+        removed = 0
+        if excess > 0:
+            ids = []
+            for doc in self.collection.find({}, {'size': 1}).sort('accessed', ASCENDING):
+                ids.append(doc['_id'])
+                excess -= doc.get('size', 0)
+                if excess <= 0:
+                    break
+            for chunk in grouper(self.chunksize, ids):
+                removed += self.collection.delete_many({'_id': {'$in': list(chunk)}}).deleted_count
+        return removed
+
+    def clear(self, model_key=None):
+        """ remove all embeddings, or all embeddings of a model
+
+        Removing all embeddings also resets the hit/miss counters.
+        """
+        self.collection.delete_many({'model': model_key} if model_key else {})
+        _counters.reset(self._key) if not model_key else None
+
+    def stats(self):
+        """ return cache statistics
+
+        Returns:
+            dict(entries, size, hits, misses, hit_rate), where size is the total size of
+            embeddings in bytes and hit_rate = hits / (hits + misses)
+        """
+        counters = _counters.get(self._key)
+        hits, misses = counters['hits'], counters['misses']
+        return {
+            'entries': self.collection.estimated_document_count(),
+            'size': self._size(),
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / (hits + misses) if hits + misses else 0,
+        }
+
+    def _size(self):
+        result = list(self.collection.aggregate([{'$group': {'_id': None, 'size': {'$sum': '$size'}}}]))
+        return result[0]['size'] if result else 0
+
+
+#: hit/miss counters and sweep times of EmbeddingCache, by collection
+_counters = CacheCounters()
@@ -1,5 +1,9 @@
+import numpy as np
+import scipy.sparse as sp
 from sklearn.base import BaseEstimator
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.decomposition import TruncatedSVD
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer, TfidfVectorizer
+from sklearn.pipeline import make_pipeline
 
 from omegaml.util import ensure_list
 
@@ -9,13 +13,54 @@ class SimpleEmbeddingModel(BaseEstimator):
     A simple text embedding model that uses TF-IDF vectorization to generate
     numerical representations of input documents.
 
+    By default, the embeddings are dense vectors of the size of the vocabulary.
+    Since most values of TF-IDF vectors are zero, specify sparse=True to get a
+    scipy.sparse.csr_matrix instead. All vector stores except pgvector store
+    sparse embeddings as indices and values, and score by sparse dot products.
+
+    For vector stores that require dense vectors of a fixed size, specify
+    a projection to n_components dimensions:
+
+    * projection='hashing' hashes terms to n_components features, there is no
+      vocabulary to fit. The embeddings can be sparse or dense.
+    * projection='svd' reduces the TF-IDF vectors to n_components dimensions
+      by a truncated SVD (latent semantic analysis). The embeddings are dense.
+
+    Usage::
+
+        model = SimpleEmbeddingModel(sparse=True).fit(documents)
+        model.embed(documents)
+        => <3x12 sparse matrix of type '<class 'numpy.float64'>' ...>
+
+        model = SimpleEmbeddingModel(projection='svd', n_components=128).fit(documents)
+        model.embed(documents).shape
+        => (3, 128)
+
     Attributes:
-        vectorizer (TfidfVectorizer): The TF-IDF vectorizer used to transform
+        vectorizer (TfidfVectorizer|Pipeline): The TF-IDF vectorizer used to transform
             text documents into numerical feature vectors.
+
+    .. versionchanged:: NEXT
+        added the sparse, projection and n_components parameters
     """
 
-    def __init__(self):
-        self.vectorizer = TfidfVectorizer(min_df=1)
+    def __init__(self, sparse=False, projection=None, n_components=256):
+        if projection not in (None, 'hashing', 'svd'):
+            raise ValueError(f"projection must be None, 'hashing' or 'svd', not {projection}")
+        if sparse and projection == 'svd':
+            raise ValueError("projection='svd' returns dense embeddings, specify sparse=False")
+        self.sparse = sparse
+        self.projection = projection
+        self.n_components = n_components
+        if projection == 'hashing':
+            self.vectorizer = make_pipeline(HashingVectorizer(n_features=n_components, alternate_sign=False,
+                                                              norm=None),
+                                            TfidfTransformer())
+        elif projection == 'svd':
+            self.vectorizer = make_pipeline(TfidfVectorizer(min_df=1),
+                                            TruncatedSVD(n_components=n_components))
+        else:
+            self.vectorizer = TfidfVectorizer(min_df=1)
 
     def fit(self, documents):
         """
@@ -40,11 +85,14 @@ class SimpleEmbeddingModel(BaseEstimator):
             documents (list of str): The text documents to be embedded.
 
         Returns:
-            numpy.ndarray: The embedding vectors for the input documents.
+            numpy.ndarray: The embedding vectors for the input documents, or
+            a scipy.sparse.csr_matrix if sparse=True
         """
         documents = ensure_list(documents)
         X = self.vectorizer.transform(documents)
-        embedding_vectors = X.toarray()
+        if self.sparse:
+            return sp.csr_matrix(X)
+        embedding_vectors = X.toarray() if sp.issparse(X) else X
         return embedding_vectors
 
     @property
@@ -55,4 +103,82 @@ class SimpleEmbeddingModel(BaseEstimator):
         Returns:
             int: The number of features in the embedding vectors.
         """
+        if self.projection is not None:
+            return self.n_components
         return len(self.vectorizer.vocabulary_)
+
+
+def is_sparse(embedding):
+    """ return True if embedding is a sparse vector or matrix
+
+    Args:
+        embedding (obj): a scipy.sparse matrix, a dict(indices=, values=, size=)
+           as returned by sparse_to_dict(), or a dense vector
+
+    .. versionadded:: NEXT
+    """
+    return sp.issparse(embedding) or (isinstance(embedding, dict) and 'indices' in embedding)
+
+
+def sparse_to_dict(embedding):
+    """ convert a sparse vector to a dict(indices=, values=, size=)
+
+    Args:
+        embedding (obj): a scipy.sparse matrix of one row, a dict, or a dense vector
+
+    Returns:
+        dict(indices=list of int, values=list of float, size=int)
+
+    .. versionadded:: NEXT
+    """
+    if isinstance(embedding, dict):
+        return embedding
+    row = sp.csr_matrix(embedding if sp.issparse(embedding) else np.atleast_2d(embedding))
+    if row.shape[0] != 1:
+        raise ValueError(f'expected a single vector, got a matrix of shape {row.shape}')
+    row.sum_duplicates()
+    return {
+        'indices': row.indices.tolist(),
+        'values': row.data.astype(float).tolist(),
+        'size': int(row.shape[1]),
+    }
+
+
+def sparse_matrix(embeddings, dtype=np.float32):
+    """ stack embeddings into a scipy.sparse.csr_matrix
+
+    Args:
+        embeddings (list): a list of sparse or dense vectors, or dicts as
+           returned by sparse_to_dict()
+
+    Returns:
+        scipy.sparse.csr_matrix of shape (len(embeddings), max. size of embeddings)
+
+    .. versionadded:: NEXT
+    """
+    rows = []
+    for embedding in embeddings:
+        if isinstance(embedding, dict):
+            row = sp.csr_matrix((embedding['values'], embedding['indices'], [0, len(embedding['indices'])]),
+                                shape=(1, embedding['size']), dtype=dtype)
+        else:
+            row = sp.csr_matrix(embedding if sp.issparse(embedding) else np.atleast_2d(embedding), dtype=dtype)
+        rows.append(row)
+    if not rows:
+        return sp.csr_matrix((0, 0), dtype=dtype)
+    size = max(row.shape[1] for row in rows)
+    # vectors of different size can occur when the vocabulary of a model grows, missing terms are zero
+    rows = [row if row.shape[1] == size else sp.csr_matrix((row.data, row.indices, row.indptr),
+                                                           shape=(row.shape[0], size))
+            for row in rows]
+    return sp.vstack(rows, format='csr', dtype=dtype)
+
+
+def dense_vector(embedding):
+    """ return embedding as a dense list of float
+
+    .. versionadded:: NEXT
+    """
+    if is_sparse(embedding):
+        return sparse_matrix([embedding], dtype=np.float64).toarray()[0].tolist()
+    return embedding
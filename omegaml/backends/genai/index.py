@@ -1,7 +1,11 @@
+import time
 import warnings
-from itertools import tee, islice
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import chain, tee, islice
 from markitdown import MarkItDown
 from pathlib import Path
+from threading import Lock
 from types import GeneratorType, NoneType
 
 from omegaml.backends.basedata import BaseDataBackend
@@ -53,6 +57,19 @@ class VectorStore:
     def embeddings(self, name):
         raise NotImplementedError
 
+    def insert_documents(self, name, documents, **kwargs):
+        """ insert many documents
+
+        Args:
+            name (str): the name of the vector store
+            documents (list): list of (chunks, embeddings, attributes) tuples,
+               one for each document
+
+        .. versionadded:: NEXT
+        """
+        for chunks, embeddings, attributes in documents:
+            self.insert_chunks(chunks, name, embeddings, attributes, **kwargs)
+
 
 class VectorStoreBackend(VectorStore, BaseDataBackend):
     KIND = 'vector.conx'
@@ -197,20 +214,59 @@ class DocumentIndex:
     def __repr__(self):
         return f'DocumentIndex({self.name})'
 
-    def build(self, documents, append=False, loader=None, chunker=None):
+    def build(self, documents, append=False, loader=None, chunker=None, n_jobs=None, batch_size=None,
+              in_flight=None):
+        """ build the index from documents
+
+        Documents are processed by a pipeline of three stages:
+
+        1. convert and chunk documents, in a pool of n_jobs processes
+        2. embed the chunks of many documents in batches of batch_size
+           chunks, with up to in_flight concurrent calls to the embedding model
+        3. insert the documents of each batch into the vector store in bulk
+
+        The stages are connected by bounded queues, i.e. at most in_flight
+        batches and queue_size documents are held in memory at any time.
+
+        Args:
+            documents (list|generator): the documents, each document is a path,
+               a text, a tuple of (text, attributes), (chunks, embeddings[, attributes])
+               or a dict(chunks=, embeddings=, attributes=)
+            append (bool): if False clear the index first
+            loader (callable): optional, called with each document, returns the document
+            chunker (callable): optional, called with the text of each document,
+               returns the list of chunks
+            n_jobs (int): the number of processes to convert and chunk documents,
+               use 1 to process in the current process
+            batch_size (int): the number of chunks to embed in one call
+            in_flight (int): the max. number of concurrent calls to embed
+
+        Returns:
+            dict of per-stage throughput, e.g. {'convert': {'documents': n,
+            'seconds': s, 'per_second': n/s}, 'embed': {...}, 'insert': {...}}
+
+        .. versionchanged:: NEXT
+            documents are converted, embedded and inserted by a concurrent pipeline.
+            Configure defaults by OMEGA_DOCUMENT_PIPELINE
+        """
         assert self._type_of_obj(documents) == 'documents', f"{type(documents)} is not iterable as documents"
         if not append:
             self.clear()
-        loader = loader or DocumentLoader()
-        for document in documents:
-            if callable(loader):
-                document = loader(document)
-            self.insert(document, chunker=chunker)
-
-    def load_from(self, path, chunker=None, loader=None):
-        loader = loader or DocumentLoader()
-        for document in loader.load(path):
-            self.insert(document, chunker=chunker)
+        settings = self._pipeline_settings()
+        pipeline = _DocumentPipeline(self,
+                                     n_jobs=n_jobs or settings.get('n_jobs', 4),
+                                     batch_size=batch_size or settings.get('batch_size', 64),
+                                     in_flight=in_flight or settings.get('in_flight', 4),
+                                     queue_size=settings.get('queue_size', 16))
+        return pipeline.run(documents, loader=loader, chunker=chunker)
+
+    def load_from(self, path, chunker=None, loader=None, **kwargs):
+        """ build the index from all files in path, see build()
+
+        .. versionchanged:: NEXT
+            files are processed by the build() pipeline
+        """
+        return self.build([path], append=True, chunker=chunker, loader=loader, **kwargs)
 
     def insert(self, document, loader=None, chunker=None):
         self._insert_document(document, chunker=chunker, loader=loader)
@@ -238,7 +294,18 @@ class DocumentIndex:
     def attributes(self, key=None):
         return self.store.attributes(self.name, key=key)
 
-    def _type_of_obj(self, obj):
+    def _pipeline_settings(self):
+        # use the defaults of the vector store's omega instance, fall back to global settings
+        store = getattr(self.store, 'data_store', None) or getattr(self.store, 'model_store', None)
+        if store is not None:
+            defaults = store.defaults
+        else:
+            from omegaml import settings
+            defaults = settings()
+        return getattr(defaults, 'OMEGA_DOCUMENT_PIPELINE', None) or {}
+
+    @staticmethod
+    def _type_of_obj(obj):
         if isinstance(obj, GeneratorType):
             # enable probing of generator up to the first element
             obj, probe = tee(obj, 2)
@@ -270,9 +337,6 @@ class DocumentIndex:
         raise ValueError(f'Cannot process obj of type {type(obj)}, it must be one of {TYPES.keys()}')
 
     def _insert_document(self, document, chunker=None, loader=None):
-        # default chunker splits by double newlines (roughly, paragraphs in markdown)
-        # this is not a good chunker: document.split('\n\n') if isinstance(document, str) else [document]
-        _default_chunker = lambda document: [document]
         chunker = chunker or _default_chunker
         doc_type = self._type_of_obj(document)
         if doc_type == 'embedded_tuple':
@@ -313,6 +377,152 @@ class DocumentIndex:
         self.store.insert_chunks(chunks, self.name, embeddings, attributes)
 
 
+def _default_chunker(document):
+    # default chunker splits by double newlines (roughly, paragraphs in markdown)
+    # this is not a good chunker: document.split('\n\n') if isinstance(document, str) else [document]
+    return [document]
+
+
+def _prepare_document(document, loader=None, chunker=None):
+    # convert and chunk a document, runs in a worker process of _DocumentPipeline
+    # -- returns a list of (chunks, embeddings, attributes), embeddings is None if not embedded yet
+    chunker = chunker or _default_chunker
+    doc_type = DocumentIndex._type_of_obj(document)
+    if doc_type == 'embedded_tuple':
+        chunks, embeddings, *attributes = document
+        attributes = attributes[0] if attributes and isinstance(attributes[0], dict) else {'tags': attributes}
+        if isinstance(chunks, str):
+            chunks = [chunks]
+            embeddings = [embeddings]
+        return [(chunks, embeddings, attributes)]
+    elif doc_type == 'embedded_dict':
+        return [(document['chunks'], document['embeddings'], document.get('attributes'))]
+    elif doc_type == 'text_tuple':
+        text, attributes = document
+        return [(chunker(text), None, attributes)]
+    elif doc_type == 'text':
+        return [(chunker(document), None, None)]
+    elif doc_type == 'loader':
+        return _prepare_document(document(document), chunker=chunker)
+    elif doc_type == 'documents':
+        return [item for doc in document for item in _prepare_document(doc, loader=loader, chunker=chunker)]
+    elif doc_type == 'pathlike':
+        loader = loader if hasattr(loader, 'load') else DocumentLoader()
+        return [item for doc in loader.load(document) for item in _prepare_document(doc, chunker=chunker)]
+    return []
+
+
+def _timed_prepare_document(document, **kwargs):
+    t0 = time.monotonic()
+    prepared = _prepare_document(document, **kwargs)
+    return time.monotonic() - t0, prepared
+
+
+class _DocumentPipeline:
+    # staged pipeline to build a DocumentIndex, see DocumentIndex.build()
+    def __init__(self, index, n_jobs=4, batch_size=64, in_flight=4, queue_size=16):
+        self.index = index
+        self.n_jobs = n_jobs
+        self.batch_size = batch_size
+        self.in_flight = in_flight
+        self.queue_size = max(queue_size, n_jobs)
+        self.stats = {stage: {'documents': 0, 'chunks': 0, 'calls': 0, 'seconds': 0.0}
+                      for stage in ('convert', 'embed', 'insert')}
+        # _embed runs in up to in_flight threads
+        self._stats_lock = Lock()
+
+    def run(self, documents, loader=None, chunker=None):
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.in_flight) as embedder:
+            pending, batch = deque(), []
+            for prepared in self._convert(documents, loader=loader, chunker=chunker):
+                batch.append(prepared)
+                if sum(len(chunks) for chunks, _, _ in batch) >= self.batch_size:
+                    pending.append(embedder.submit(self._embed, batch))
+                    batch = []
+                while len(pending) >= self.in_flight:
+                    self._insert(pending.popleft().result())
+            pending.append(embedder.submit(self._embed, batch)) if batch else None
+            while pending:
+                self._insert(pending.popleft().result())
+        return self._report(time.monotonic() - started)
+
+    def _expand(self, documents, loader=None):
+        # yield single documents, expanding directories into files
+        for document in documents:
+            if callable(loader):
+                document = loader(document)
+            if (DocumentIndex._type_of_obj(document) == 'pathlike' and not str(document).startswith('http')
+                    and Path(document).is_dir()):
+                yield from (str(fn) for fn in sorted(Path(document).glob('**/*')) if fn.is_file())
+            else:
+                yield document
+
+    def _convert(self, documents, loader=None, chunker=None):
+        # stage 1: convert and chunk, yield (chunks, embeddings, attributes) in order of documents
+        # -- files are converted in a pool of processes, other documents in this process
+        stats = self.stats['convert']
+        executor = None
+        futures = deque()
+        for document in chain(self._expand(documents, loader=loader), [None]):
+            if document is not None:
+                if self.n_jobs > 1 and DocumentIndex._type_of_obj(document) == 'pathlike':
+                    if executor is None:
+                        from joblib.externals.loky import get_reusable_executor
+                        executor = get_reusable_executor(max_workers=self.n_jobs)
+                    future = executor.submit(_timed_prepare_document, document, loader=loader, chunker=chunker)
+                else:
+                    future = Future()
+                    future.set_result(_timed_prepare_document(document, loader=loader, chunker=chunker))
+                futures.append(future)
+            while futures and (document is None or len(futures) >= self.queue_size or futures[0].done()):
+                seconds, prepared = futures.popleft().result()
+                stats['seconds'] += seconds
+                stats['documents'] += len(prepared)
+                stats['chunks'] += sum(len(chunks) for chunks, _, _ in prepared)
+                yield from prepared
+
+    def _embed(self, batch):
+        # stage 2: embed the chunks of all documents in the batch, in calls of batch_size chunks
+        stats = self.stats['embed']
+        t0 = time.monotonic()
+        texts = [text for chunks, embeddings, _ in batch if embeddings is None for text in chunks]
+        if texts:
+            assert self.index.model is not None, "need an embedding model to insert raw text"
+            computed, calls = [], 0
+            for start in range(0, len(texts), self.batch_size):
+                computed.extend(self.index.model.embed(texts[start:start + self.batch_size]))
+                calls += 1
+            computed = iter(computed)
+            batch = [(chunks, embeddings if embeddings is not None else list(islice(computed, len(chunks))),
+                      attributes) for chunks, embeddings, attributes in batch]
+        else:
+            calls = 0
+        with self._stats_lock:
+            stats['calls'] += calls
+            stats['documents'] += len(batch)
+            stats['chunks'] += len(texts)
+            stats['seconds'] += time.monotonic() - t0
+        return batch
+
+    def _insert(self, batch):
+        # stage 3: insert all documents of the batch at once
+        stats = self.stats['insert']
+        t0 = time.monotonic()
+        self.index.store.insert_documents(self.index.name, batch)
+        stats['calls'] += 1
+        stats['documents'] += len(batch)
+        stats['chunks'] += sum(len(chunks) for chunks, _, _ in batch)
+        stats['seconds'] += time.monotonic() - t0
+
+    def _report(self, seconds):
+        report = {}
+        for stage, stats in self.stats.items():
+            report[stage] = dict(stats, per_second=stats['documents'] / stats['seconds'] if stats['seconds'] else 0)
+        report['total'] = {'documents': self.stats['insert']['documents'], 'seconds': seconds}
+        return report
+
+
 class DocumentLoader:
     def __init__(self, path=None):
         self.path = path
@@ -330,6 +540,13 @@ class DocumentLoader:
     def __iter__(self):
         return self._from_path(self.path)
 
+    def __getstate__(self):
+        # support pickling to worker processes, see DocumentIndex.build()
+        return {'path': self.path}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
     def _from_path(self, path):
         path = Path(path)
         files = path.glob('**/*') if path.is_dir() else [path]
@@ -2,7 +2,9 @@ from collections import Counter
 
 import numpy as np
 import re
+import scipy.sparse as sp
 
+from omegaml.backends.genai.embedding import is_sparse, sparse_matrix
 from omegaml.backends.genai.index import VectorStoreBackend
 
 INMEMORY_VECTOR_STORE = {}
@@ -54,39 +56,54 @@ class InMemoryVectorStore(VectorStoreBackend):
         for text, embedding in zip(chunks, embeddings):
             self.chunks[doc_id].append(text)
             self.embeddings[doc_id].append(embedding)
+        self._invalidate_matrix(name)
 
     def find_similar(self, name, obj, top=5, filter=None, distance=None, max_distance=None, **kwargs):
-        # Calculate distances and find the top similar documents
+        """ find the top most similar chunks
+
+        Args:
+            name (str): the name of the index
+            obj (list|np.ndarray|sparse): the query embedding, or a 2-D list or array
+               of query embeddings to search for multiple queries at once. A
+               sparse embedding is a scipy.sparse matrix of one row, a sparse
+               matrix of more than one row is multiple queries
+            top (int): the number of results per query
+            filter (dict): optional, attributes to filter documents by
+            distance (str): the distance metric, 'l2' (default) or 'cos'
+            max_distance (float): optional, only return results with a distance
+               less than max_distance
+
+        Returns:
+            list of dict(id, source, attributes, text, distance) for a single
+            query, or a list of such lists for multiple queries
+
+        .. versionchanged:: NEXT
+            distances are calculated for all chunks at once, using a matrix
+            of all embeddings that is kept in memory. Multiple queries can be
+            passed at once. Sparse embeddings are stored as sparse vectors and
+            kept in a sparse matrix.
+        """
         distance = distance or 'l2'
-        distances = []
-        all_match = lambda filter: all(
-            set(value).issubset(self.documents[doc_id]['attributes'][key]) for key, value in filter.items())
-        any_match = lambda filter: any(
-            str(value) == str(self.documents[doc_id]['attributes'][key]) for key, value in filter.items())
-        for doc_id, embeddings in self.embeddings.items():
-            if filter and not (all_match(filter) or any_match(filter)):
-                continue
-            for embedding in embeddings:
-                dist = self._calculate_distance(obj, embedding, distance)
-                distances.append((doc_id, dist))
-
-        # Sort by distance and get the top results
-        distances.sort(key=lambda x: x[1])
-        top_results = distances[:top]
-
-        # Prepare the results
+        if distance not in ('l2', 'cos'):
+            raise ValueError(f"Unsupported distance metric: {distance}")
+        if is_sparse(obj) or (isinstance(obj, (list, tuple)) and any(is_sparse(q) for q in obj)):
+            batched = isinstance(obj, (list, tuple)) or (sp.issparse(obj) and obj.shape[0] > 1)
+            queries = sparse_matrix(obj if isinstance(obj, (list, tuple)) else [obj])
+        else:
+            queries = np.asarray(obj, dtype=np.float32)
+            batched = queries.ndim == 2
+            queries = np.atleast_2d(queries)
+        matrix, row_docs, norms = self._embeddings_matrix(name)
+        if not len(row_docs):
+            return [[] for _ in range(queries.shape[0])] if batched else []
+        queries = self._align(queries, matrix)
+        mask = self._filter_mask(name, filter, row_docs) if filter else None
         results = []
-        for doc_id, dist in top_results:
-            if (dist >= max_distance) if max_distance is not None else False:
-                continue
-            results.append({
-                'id': doc_id,
-                'source': self.documents[doc_id]['source'],
-                'attributes': self.documents[doc_id]['attributes'],
-                'text': ' '.join(self.chunks[doc_id]),
-                'distance': dist
-            })
-        return results
+        for dists in self._calculate_distances(queries, matrix, norms, distance):
+            if mask is not None:
+                dists = np.where(mask, dists, np.inf)
+            results.append(self._top_results(dists, row_docs, top, max_distance))
+        return results if batched else results[0]
 
     def delete(self, name, obj=None, filter=None, **kwargs):
         # Clear all stored documents and chunks
@@ -100,6 +117,7 @@ class InMemoryVectorStore(VectorStoreBackend):
             self.documents.clear()
             self.chunks.clear()
             self.embeddings.clear()
+        self._invalidate_matrix(name)
 
     def attributes(self, name, key=None):
         results = {}
@@ -112,10 +130,100 @@ class InMemoryVectorStore(VectorStoreBackend):
         results = {key: dict(counts) for key, counts in results.items()}
         return results
 
-    def _calculate_distance(self, vec1, vec2, metric):
+    def _embeddings_matrix(self, name):
+        # get the float32 matrix of all chunk embeddings, rebuilt after changes
+        # -- matrix is (n_chunks, dim), row_docs maps each row to its doc_id
+        # -- norms is the l2 norm of each row
+        store = INMEMORY_VECTOR_STORE.setdefault(name, {})
+        cached = store.get('matrix')
+        if cached is None:
+            rows = [(doc_id, embedding) for doc_id, embeddings in self.embeddings.items()
+                    for embedding in embeddings]
+            row_docs = np.array([doc_id for doc_id, _ in rows], dtype=np.int64)
+            if any(is_sparse(embedding) for _, embedding in rows):
+                # sparse embeddings, e.g. tf-idf vectors, are kept as a sparse matrix
+                matrix = sparse_matrix([embedding for _, embedding in rows])
+                norms = sp.linalg.norm(matrix, axis=1)
+            else:
+                matrix = np.ascontiguousarray([embedding for _, embedding in rows], dtype=np.float32)
+                matrix = matrix.reshape(len(rows), -1) if rows else np.zeros((0, 0), dtype=np.float32)
+                norms = np.linalg.norm(matrix, axis=1)
+            cached = store['matrix'] = {
+                'matrix': matrix,
+                'row_docs': row_docs,
+                'norms': norms,
+                'masks': {},
+            }
+        return cached['matrix'], cached['row_docs'], cached['norms']
+
+    def _filter_mask(self, name, filter, row_docs):
+        # get the boolean row mask of documents that match the filter
+        # -- a document matches if all values are in its attributes, or any value is equal
+        cached = INMEMORY_VECTOR_STORE[name]['matrix']
+        key = repr(sorted((k, str(v)) for k, v in filter.items()))
+        if key not in cached['masks']:
+            def matches(attributes):
+                all_match = all(set(value).issubset(attributes.get(key, ()))
+                                for key, value in filter.items())
+                any_match = any(str(value) == str(attributes.get(key))
+                                for key, value in filter.items())
+                return all_match or any_match
+
+            matching = [doc_id for doc_id, doc in self.documents.items() if matches(doc['attributes'])]
+            cached['masks'][key] = np.isin(row_docs, matching)
+        return cached['masks'][key]
+
+    def _invalidate_matrix(self, name):
+        INMEMORY_VECTOR_STORE.setdefault(name, {})['matrix'] = None
+
+    def _align(self, queries, matrix):
+        # convert queries to the type of matrix, i.e. dense or sparse
+        # -- sparse vectors of a smaller size are padded with zeros
+        if not sp.issparse(matrix):
+            return queries.toarray() if sp.issparse(queries) else queries
+        queries = sp.csr_matrix(queries, dtype=np.float32)
+        if queries.shape[1] != matrix.shape[1]:
+            queries.resize((queries.shape[0], matrix.shape[1]))
+        return queries
+
+    def _calculate_distances(self, queries, matrix, norms, metric):
+        # distances of all queries (n_queries, dim) to all rows in matrix (n_chunks, dim)
+        if sp.issparse(matrix):
+            # sparse dot products, only non-zero values are multiplied
+            dots = (matrix @ queries.T).T.toarray()
+            query_norms = sp.linalg.norm(queries, axis=1)[:, None]
+        else:
+            dots = queries @ matrix.T
+            query_norms = np.linalg.norm(queries, axis=1)[:, None]
         if metric == 'l2':
-            return np.linalg.norm(np.array(vec1) - np.array(vec2))
+            # ||q - x||^2 = ||q||^2 + ||x||^2 - 2 q.x
+            squared = query_norms ** 2 + norms[None, :] ** 2 - 2 * dots
+            return np.sqrt(np.maximum(squared, 0))
         elif metric == 'cos':
-            return 1 - np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return 1 - dots / (query_norms * norms[None, :])
         else:
             raise ValueError(f"Unsupported distance metric: {metric}")
+
+    def _top_results(self, dists, row_docs, top, max_distance):
+        # select the top rows by distance without sorting all distances
+        candidates = np.flatnonzero(np.isfinite(dists))
+        top = min(top, len(candidates))
+        if top <= 0:
+            return []
+        if top < len(candidates):
+            candidates = candidates[np.argpartition(dists[candidates], top - 1)[:top]]
+        candidates = candidates[np.argsort(dists[candidates], kind='stable')]
+        results = []
+        for row in candidates:
+            doc_id, dist = int(row_docs[row]), float(dists[row])
+            if max_distance is not None and dist >= max_distance:
+                continue
+            results.append({
+                'id': doc_id,
+                'source': self.documents[doc_id]['source'],
+                'attributes': self.documents[doc_id]['attributes'],
+                'text': ' '.join(self.chunks[doc_id]),
+                'distance': dist
+            })
+        return results
@@ -1,19 +1,69 @@
+import threading
+import time
 from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 
 import re
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 
+from omegaml.backends.genai.annindex import IVFIndex
+from omegaml.backends.genai.embedding import dense_vector, is_sparse, sparse_to_dict
 from omegaml.backends.genai.index import VectorStoreBackend
 from omegaml.util import mongo_compatible
 
+# process-local cache of ANN indexes, see MongoDBVectorStore._ann_index()
+ANN_INDEXES = {}
+ANN_LOCK = threading.RLock()
+# ann write leases held by this process, see MongoDBVectorStore._ann_lease()
+ANN_LEASES = {}
+
 
 class MongoDBVectorStore(VectorStoreBackend):
     """
     MongoDB vector store for storing documents and their embeddings.
+
+    By default, find_similar() calculates the distance of the query to
+    every chunk in the database. For larger collections, specify ann=True
+    to use an approximate nearest neighbour index instead::
+
+        om.datasets.put('vector://', 'mydocs', ann=True)
+        om.datasets.put('vector://', 'mydocs', ann={'nlist': 100, 'nprobe': 8})
+
+    The index is an IVFIndex that is kept in memory and persisted to
+    GridFS as a series of segments, each of which records the chunks added
+    or deleted by insert_chunks() and delete(). On find_similar() only the
+    nearest chunk ids are retrieved from the database.
+
+    Writes to the index are serialized across processes by a lease, i.e. a
+    document in the vecdb_<name>_ann_lease collection that is acquired by
+    find_one_and_update(). The lease holder first applies all segments
+    written by other processes, then writes its segment or snapshot. Thus a
+    snapshot never drops the segments of another process. A lease expires
+    after ANN_LEASE_TTL seconds, e.g. if its process was terminated.
+
+    Sparse embeddings, e.g. of SimpleEmbeddingModel(sparse=True), are stored
+    as dict(indices=, values=, size=) and scored by a sparse dot product of
+    the query and each chunk. The ann option requires dense embeddings.
+
+    .. versionchanged:: NEXT
+        added the ann option. Attribute filters are applied to documents
+        before chunks are joined to their documents.
+
+    .. versionchanged:: NEXT
+        added support for sparse embeddings
     """
     KIND = 'vector.conx'
     PROMOTE = 'metadata'
 
+    #: number of segments after which the ann index is rewritten as a snapshot
+    ANN_MAX_SEGMENTS = 100
+    #: seconds after which an ann write lease expires
+    ANN_LEASE_TTL = 300
+    #: max. seconds to wait for the ann write lease
+    ANN_LEASE_TIMEOUT = 60
+
     @classmethod
     def supports(cls, obj, name, insert=False, data_store=None, model_store=None, *args, **kwargs):
         return bool(re.match(r'^vector(\+mongodb)?://', str(obj)))  # Supports vector:// or vector+mongodb://
@@ -36,53 +86,96 @@ class MongoDBVectorStore(VectorStoreBackend):
                 for doc in docs]
 
     def insert_chunks(self, chunks, name, embeddings, attributes=None, **kwargs):
-        attributes = attributes or {}
-        source = attributes.get('source', '')
-        attributes.setdefault('source', source)
-        attributes.setdefault('tags', [])
-
-        # Insert the document metadata
-        doc_id = self._documents(name).insert_one({
-            'source': source,
-            'attributes': attributes,
-        }).inserted_id
-
-        # Insert the chunks and their embeddings
-        for text, embedding in zip(chunks, embeddings):
-            self._chunks(name).insert_one({
+        self.insert_documents(name, [(chunks, embeddings, attributes)], **kwargs)
+
+    def insert_documents(self, name, documents, **kwargs):
+        # insert the documents' metadata and all chunks in bulk
+        docs = []
+        for chunks, embeddings, attributes in documents:
+            attributes = attributes or {}
+            source = attributes.get('source', '')
+            attributes.setdefault('source', source)
+            attributes.setdefault('tags', [])
+            docs.append({
+                'source': source,
+                'attributes': attributes,
+            })
+        if not docs:
+            return
+        if self._ann_options(name) is None:
+            self._insert_documents(name, docs, documents)
+            return
+        # validate and take the lease before inserting, so that a failure does not leave orphaned documents
+        if any(is_sparse(embedding) for _, embeddings, _ in documents for embedding in embeddings):
+            raise ValueError('ann requires dense embeddings, use e.g. SimpleEmbeddingModel(projection="svd")')
+        with ANN_LOCK, self._ann_lease(name):
+            # load the index before inserting, so that new chunks are not indexed twice
+            index = self._ann_index(name)
+            self._insert_documents(name, docs, documents, index=index)
+
+    def _insert_documents(self, name, docs, documents, index=None):
+        # insert documents and their chunks, and add the chunks to the ann index
+        # -- if any step fails, the documents and chunks inserted so far are removed
+        doc_ids = self._documents(name).insert_many(docs).inserted_ids
+        try:
+            chunks = [{
                 'document_id': doc_id,
                 'text': text,
-                'embedding': mongo_compatible(embedding),
-            })
+                'embedding': self._embedding_value(embedding),
+            } for doc_id, (texts, embeddings, _) in zip(doc_ids, documents)
+                for text, embedding in zip(texts, embeddings)]
+            if not chunks:
+                return
+            chunk_ids = self._chunks(name).insert_many(chunks).inserted_ids
+            if index is not None:
+                ids = [str(chunk_id) for chunk_id in chunk_ids]
+                trained = index.add(ids, [str(chunk['document_id']) for chunk in chunks],
+                                    [chunk['embedding'] for chunk in chunks])
+                self._ann_write(name, index, None if trained else index.added(ids))
+        except Exception:
+            self._chunks(name).delete_many({'document_id': {'$in': doc_ids}})
+            self._documents(name).delete_many({'_id': {'$in': doc_ids}})
+            raise
 
     def find_similar(self, name, obj, top=5, filter=None, distance='l2', max_distance=None, **kwargs):
+        distance = distance or 'l2'
+        # apply the filter to documents before joining chunks to documents
+        doc_ids = self._filtered_document_ids(name, filter) if filter else None
+        if self._ann_options(name) is not None:
+            return self._find_similar_ann(name, dense_vector(obj), top=top, doc_ids=doc_ids, distance=distance,
+                                          max_distance=max_distance)
         # Create a pipeline to calculate distances
-        obj = mongo_compatible(obj)
-        lookup = [
-            {
-                '$lookup': {
-                    'from': self._documents(name).name,
-                    'localField': 'document_id',
-                    'foreignField': '_id',
-                    'as': 'document'
-                }
-            },
-            {
-                '$unwind': '$document'
-            },
-        ]
-        if filter:
-            match = [{
-                '$match': {
-                    '$or': [
-                        {f'document.attributes.{key}':
-                             {'$in': values if isinstance(filter, list) else [values]}
-                         for key, values in filter.items()}
-                    ]
-                }
-            }]
+        match = [{
+            '$match': {
+                'document_id': {'$in': doc_ids},
+            }
+        }] if doc_ids is not None else []
+        if is_sparse(obj):
+            distance_expr = self._sparse_distance(sparse_to_dict(obj), distance)
         else:
-            match = []
+            obj = mongo_compatible(obj)
+            distance_expr = {
+                '$sqrt': {
+                    '$sum': {
+                        '$map': {
+                            'input': {
+                                '$range': [0, len(obj)],
+                            },
+                            'as': 'i',
+                            'in': {
+                                '$pow': [
+                                    {'$subtract': [
+                                        {'$arrayElemAt': ['$embedding', '$$i']},
+                                        {'$arrayElemAt': [{'$literal': obj}, '$$i']}
+                                    ]},
+                                    2
+                                ]
+                            }
+                        }
+                    }
+                }
+            }
+        lookup = self._lookup_documents(name)
         project = [{
             '$project': {
                 'document_id': 1,
@@ -90,27 +183,7 @@ class MongoDBVectorStore(VectorStoreBackend):
                 'embedding': 1,
                 'source': '$document.source',
                 'attributes': '$document.attributes',
-                'distance': {
-                    '$sqrt': {
-                        '$sum': {
-                            '$map': {
-                                'input': {
-                                    '$range': [0, len(obj)],
-                                },
-                                'as': 'i',
-                                'in': {
-                                    '$pow': [
-                                        {'$subtract': [
-                                            {'$arrayElemAt': ['$embedding', '$$i']},
-                                            {'$arrayElemAt': [{'$literal': obj}, '$$i']}
-                                        ]},
-                                        2
-                                    ]
-                                }
-                            }
-                        }
-                    }
-                },
+                'distance': distance_expr,
             }
         }]
         sort = [
@@ -128,7 +201,7 @@ class MongoDBVectorStore(VectorStoreBackend):
                 }
             }
         ] if max_distance is not None else []
-        pipeline = lookup + match + project + sort + subset
+        pipeline = match + lookup + project + sort + subset
         # Execute the aggregation pipeline
         results = list(self._chunks(name).aggregate(pipeline))[0:top]
         return results
@@ -144,11 +217,249 @@ class MongoDBVectorStore(VectorStoreBackend):
             filter.update({'_id': ObjectId(str(obj))})
         elif obj is not None:
             raise ValueError("Object must be a dict with 'id', or a string matching source")
-        doc_ids = self._documents(name).find(filter, {'_id': 1})
+        doc_ids = [doc['_id'] for doc in self._documents(name).find(filter, {'_id': 1})]
         self._documents(name).delete_many(filter)
         self._chunks(name).delete_many({
-            'document_id': {'$in': [doc['_id'] for doc in doc_ids]}
+            'document_id': {'$in': doc_ids}
         })
+        if self._ann_options(name) is None:
+            return
+        with ANN_LOCK, self._ann_lease(name):
+            if not filter:
+                self._ann_drop(name)
+            elif doc_ids:
+                index = self._ann_index(name)
+                doc_ids = [str(doc_id) for doc_id in doc_ids]
+                index.remove(doc_ids=doc_ids)
+                self._ann_write(name, index, index.removed(doc_ids=doc_ids))
+
+    def _lookup_documents(self, name):
+        return [
+            {
+                '$lookup': {
+                    'from': self._documents(name).name,
+                    'localField': 'document_id',
+                    'foreignField': '_id',
+                    'as': 'document'
+                }
+            },
+            {
+                '$unwind': '$document'
+            },
+        ]
+
+    def _embedding_value(self, embedding):
+        # sparse embeddings are stored as dict(indices=, values=, size=), dense embeddings as a list
+        return sparse_to_dict(embedding) if is_sparse(embedding) else mongo_compatible(embedding)
+
+    def _sparse_distance(self, query, metric):
+        # aggregation expression of the distance of a sparse query to a chunk's sparse embedding
+        # -- the dot product only multiplies the values at indices that are in both vectors
+        query_sq = sum(value ** 2 for value in query['values'])
+        dot = {
+            '$sum': {
+                '$map': {
+                    'input': {'$range': [0, {'$size': '$embedding.indices'}]},
+                    'as': 'i',
+                    'in': {
+                        '$let': {
+                            'vars': {
+                                'j': {'$indexOfArray': [{'$literal': query['indices']},
+                                                        {'$arrayElemAt': ['$embedding.indices', '$$i']}]},
+                            },
+                            'in': {
+                                '$cond': [
+                                    {'$gte': ['$$j', 0]},
+                                    {'$multiply': [
+                                        {'$arrayElemAt': ['$embedding.values', '$$i']},
+                                        {'$arrayElemAt': [{'$literal': query['values']}, '$$j']},
+                                    ]},
+                                    0,
+                                ]
+                            },
+                        }
+                    },
+                }
+            }
+        }
+        chunk_sq = {
+            '$sum': {
+                '$map': {
+                    'input': '$embedding.values',
+                    'as': 'v',
+                    'in': {'$multiply': ['$$v', '$$v']},
+                }
+            }
+        }
+        if metric == 'l2':
+            # ||q - x|| = sqrt(||q||^2 + ||x||^2 - 2 q.x)
+            distance = {'$sqrt': {'$max': [0, {'$subtract': [
+                {'$add': [query_sq, '$$chunk_sq']},
+                {'$multiply': [2, '$$dot']},
+            ]}]}}
+        elif metric == 'cos':
+            distance = {'$cond': [
+                {'$or': [{'$eq': ['$$chunk_sq', 0]}, {'$eq': [query_sq, 0]}]},
+                1.0,
+                {'$subtract': [1, {'$divide': ['$$dot', {'$multiply': [query_sq ** .5, {'$sqrt': '$$chunk_sq'}]}]}]},
+            ]}
+        else:
+            raise ValueError(f"Unsupported distance metric: {metric}")
+        return {
+            '$let': {
+                'vars': {'dot': dot, 'chunk_sq': chunk_sq},
+                'in': distance,
+            }
+        }
+
+    def _filtered_document_ids(self, name, filter):
+        query = {
+            '$or': [
+                {f'attributes.{key}':
+                     {'$in': values if isinstance(filter, list) else [values]}
+                 for key, values in filter.items()}
+            ]
+        }
+        return [doc['_id'] for doc in self._documents(name).find(query, {'_id': 1})]
+
+    def _find_similar_ann(self, name, obj, top=5, doc_ids=None, distance='l2', max_distance=None):
+        with ANN_LOCK:
+            index = self._ann_index(name)
+            doc_ids = [str(doc_id) for doc_id in doc_ids] if doc_ids is not None else None
+            hits = index.search(obj, top=top, metric=distance, doc_ids=doc_ids)
+        hits = {ObjectId(chunk_id): dist for chunk_id, dist in hits
+                if max_distance is None or dist <= max_distance}
+        if not hits:
+            return []
+        pipeline = [{
+            '$match': {
+                '_id': {'$in': list(hits)},
+            }
+        }] + self._lookup_documents(name) + [{
+            '$project': {
+                'document_id': 1,
+                'text': 1,
+                'embedding': 1,
+                'source': '$document.source',
+                'attributes': '$document.attributes',
+            }
+        }]
+        results = list(self._chunks(name).aggregate(pipeline))
+        for chunk in results:
+            chunk['distance'] = hits[chunk['_id']]
+        return sorted(results, key=lambda chunk: chunk['distance'])
+
+    def _ann_options(self, name):
+        # get the ann options as specified in om.datasets.put(..., ann=True|dict)
+        meta = self.data_store.metadata(name)
+        options = meta.kind_meta.get('kwargs', {}).get('ann') if meta is not None else None
+        if not options:
+            return None
+        return options if isinstance(options, dict) else {}
+
+    def _ann_filename(self, name):
+        return f'vecdb_{name}_ann'
+
+    def _ann_key(self, name):
+        return self.data_store.mongo_url.rsplit('@', 1)[-1], self.data_store.bucket, self._ann_filename(name)
+
+    def _ann_index(self, name):
+        # get the ann index, applying all segments not yet seen by this process
+        # -- segments are stored in gridfs in the order written
+        # -- a snapshot segment replaces all previous segments
+        # -- if no segments exist, the index is built from the existing chunks
+        # -- call while holding ANN_LOCK
+        fs = self.data_store.fs
+        key = self._ann_key(name)
+        index, applied = ANN_INDEXES.get(key) or (None, [])
+        segments = list(fs.find({'filename': self._ann_filename(name)}, sort=[('uploadDate', 1), ('_id', 1)]))
+        if index is None or not set(applied).issubset(segment._id for segment in segments):
+            # first load, or segments have been compacted by another process
+            index, applied = IVFIndex(**self._ann_options(name)), []
+        for segment in segments:
+            if segment._id in applied:
+                continue
+            if index.apply(segment.read()) == 'snapshot':
+                applied = []
+            applied.append(segment._id)
+        ANN_INDEXES[key] = index, applied
+        if not segments:
+            with self._ann_lease(name):
+                # another process may have built the index while we waited for the lease
+                if fs.find_one({'filename': self._ann_filename(name)}) is not None:
+                    return self._ann_index(name)
+                chunks = list(self._chunks(name).find({}, {'document_id': 1, 'embedding': 1}))
+                if chunks:
+                    index.add([str(chunk['_id']) for chunk in chunks],
+                              [str(chunk['document_id']) for chunk in chunks],
+                              [chunk['embedding'] for chunk in chunks])
+                    self._ann_write(name, index)
+        return index
+
+    @contextmanager
+    def _ann_lease(self, name):
+        # acquire the write lease of the ann index, shared by all processes
+        # -- the lease is a document {_id: 'ann', owner:, expires:}, acquired if it has
+        #    no owner or has expired. If another process holds the lease, the conditional
+        #    upsert fails with a duplicate key error, and we retry until ANN_LEASE_TIMEOUT
+        # -- the lease is reentrant within this process
+        # -- call while holding ANN_LOCK
+        key = self._ann_key(name)
+        if key in ANN_LEASES:
+            ANN_LEASES[key][1] += 1
+            try:
+                yield
+            finally:
+                ANN_LEASES[key][1] -= 1
+            return
+        leases = self.data_store.collection(f'{self._ann_filename(name)}_lease')
+        owner = ObjectId()
+        deadline = time.monotonic() + self.ANN_LEASE_TIMEOUT
+        while True:
+            now = datetime.utcnow()
+            try:
+                leases.find_one_and_update({
+                    '_id': 'ann',
+                    '$or': [{'owner': None}, {'expires': {'$lt': now}}],
+                }, {
+                    '$set': {'owner': owner, 'expires': now + timedelta(seconds=self.ANN_LEASE_TTL)},
+                }, upsert=True)
+                break
+            except DuplicateKeyError:
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f'could not acquire the ann write lease of {name}')
+                time.sleep(.05)
+        ANN_LEASES[key] = [owner, 1]
+        try:
+            yield
+        finally:
+            del ANN_LEASES[key]
+            leases.update_one({'_id': 'ann', 'owner': owner}, {'$set': {'owner': None}})
+
+    def _ann_write(self, name, index, segment=None):
+        # write a segment, or a snapshot if segment is None or if there are too many segments
+        # -- a snapshot replaces all previous segments
+        # -- call while holding ANN_LOCK and the ann lease, after applying all segments
+        fs = self.data_store.fs
+        key = self._ann_key(name)
+        _, applied = ANN_INDEXES.get(key) or (None, [])
+        if segment is None or len(applied) >= self.ANN_MAX_SEGMENTS:
+            fileid = fs.put(index.snapshot(), filename=self._ann_filename(name))
+            for previous in applied:
+                fs.delete(previous)
+            applied = []
+        else:
+            fileid = fs.put(segment, filename=self._ann_filename(name))
+        ANN_INDEXES[key] = index, applied + [fileid]
+
+    def _ann_drop(self, name):
+        # remove the ann index and its lease
+        # -- call while holding ANN_LOCK and the ann lease
+        fs = self.data_store.fs
+        for segment in fs.find({'filename': self._ann_filename(name)}):
+            fs.delete(segment._id)
+        ANN_INDEXES.pop(self._ann_key(name), None)
+        self.data_store.collection(f'{self._ann_filename(name)}_lease').drop()
 
     def attributes(self, name, key=None):
         """
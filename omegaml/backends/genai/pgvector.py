@@ -3,6 +3,7 @@ from collections import Counter
 import json
 import logging
 import re
+from hashlib import sha256
 from pgvector.sqlalchemy import Vector
 from sqlalchemy import Column, Integer, String, text, ForeignKey, select, Index, LargeBinary, and_
 from sqlalchemy.dialects.postgresql import JSONB
@@ -10,19 +11,60 @@ from sqlalchemy.engine import RowMapping
 from sqlalchemy.orm import Session, relationship, declarative_base
 
 from omegaml.backends.genai.dbmigrate import DatabaseMigrator
+from omegaml.backends.genai.embedding import dense_vector
 from omegaml.backends.genai.index import VectorStoreBackend
-from omegaml.util import tryOr
+from omegaml.util import tryOr, ProcessLocal, grouper
 
 logger = logging.getLogger(__name__)
 
+#: process-local sqlalchemy engines by connection string, see PGVectorBackend._get_engine()
+PGVECTOR_ENGINES = ProcessLocal()
+#: process-local (Document, Chunk) models of collections that have been set up
+PGVECTOR_COLLECTIONS = ProcessLocal()
+
 
 class PGVectorBackend(VectorStoreBackend):
     """
     docker run pgvector/pgvector:pg16
+
+    Each collection is stored in two tables, <collection>_docs and
+    <collection>_docs_chunks. The tables and indexes are created on the
+    first use of a collection, and the schema is recorded in the metadata,
+    so that later processes do not repeat the setup. The indexes are
+    configured by distance metric, see OMEGA_PGVECTOR, or per vector store::
+
+        om.datasets.put('pgvector://...', 'mydocs', indexes={
+            'l2': {'method': 'hnsw', 'm': 16, 'ef_construction': 64, 'ef_search': 100},
+            'cos': {'method': 'ivfflat', 'lists': 100, 'probes': 10},
+        })
+
+    The method is 'hnsw' (build parameters m, ef_construction; search parameter
+    ef_search) or 'ivfflat' (build parameter lists; search parameter probes).
+    The search parameters can also be passed to find_similar(), e.g.
+    om.datasets.get('mydocs', document='...', distance='cos', probes=20).
+    Changing the index configuration rebuilds the changed indexes on next use.
+    Note an ivfflat index computes its lists from the data at build time, thus
+    change its options to rebuild it once the collection has data.
+
+    .. versionchanged:: NEXT
+        engines are pooled per process, the schema is set up once per collection,
+        inserts are batched, and indexes are configurable by distance metric
     """
     KIND = 'pgvector.conx'
     PROMOTE = 'metadata'
     _attributes_keys = ('tags', 'source', 'type')
+    #: version of the table schema, collections set up with another version are set up again
+    SCHEMA_VERSION = 1
+    #: index operator classes by distance metric
+    INDEX_OPS = {
+        'l2': 'vector_l2_ops',
+        'cos': 'vector_cosine_ops',
+    }
+    #: index parameters by method, as (build parameters, {search parameter: setting})
+    INDEX_PARAMS = {
+        'hnsw': (('m', 'ef_construction'), {'ef_search': 'hnsw.ef_search'}),
+        'ivfflat': (('lists',), {'probes': 'ivfflat.probes'}),
+    }
 
     @classmethod
     def supports(cls, obj, name, insert=False, data_store=None, model_store=None, meta=None, *args, **kwargs):
@@ -30,19 +72,40 @@ class PGVectorBackend(VectorStoreBackend):
         return valid_types or _is_valid_url(obj)
 
     def insert_chunks(self, chunks, name, embeddings, attributes, data=None, **kwargs):
+        self._insert(name, [(chunks, embeddings, attributes, data)], **kwargs)
+
+    def insert_documents(self, name, documents, **kwargs):
+        self._insert(name, [(chunks, embeddings, attributes, None)
+                            for chunks, embeddings, attributes in documents], **kwargs)
+
+    def _insert(self, name, documents, **kwargs):
+        # insert documents and their chunks by multi-row inserts, in one transaction
+        # -- document ids are allocated from the id sequence in one statement, so that
+        #    chunks can reference their document without a round trip per document
         collection, vector_size, model = self._get_collection(name)
         Document, Chunk = self._create_collection(name, collection, vector_size, **kwargs)
+        batch_size = int(self._settings().get('batch_size') or 1000)
         Session = self._get_connection(name, session=True)
         with Session as session:
-            attributes = attributes or {}
-            source = attributes.get('source', '')
-            attributes.setdefault('source', source)
-            attributes.setdefault('tags', [])
-            doc = Document(source=source, attributes=attributes, data=data)
-            session.add(doc)
-            for text, embedding in zip(chunks, embeddings):
-                chunk = Chunk(document=doc, text=text, embedding=embedding)
-                session.add(chunk)
+            table = session.get_bind().dialect.identifier_preparer.format_table(Document.__table__)
+            for batch in grouper(batch_size, documents):
+                batch = list(batch)
+                doc_ids = session.execute(text("SELECT nextval(pg_get_serial_sequence(:table, 'id')) "
+                                               "FROM generate_series(1, :n)"),
+                                          {'table': table, 'n': len(batch)}).scalars().all()
+                doc_rows, chunk_rows = [], []
+                for doc_id, (chunks, embeddings, attributes, data) in zip(doc_ids, batch):
+                    attributes = attributes or {}
+                    source = attributes.get('source', '')
+                    attributes.setdefault('source', source)
+                    attributes.setdefault('tags', [])
+                    doc_rows.append({'id': doc_id, 'source': source, 'attributes': attributes, 'data': data})
+                    chunk_rows.extend({'document_id': doc_id, 'text': chunk, 'embedding': dense_vector(embedding)}
+                                      for chunk, embedding in zip(chunks, embeddings))
+                if doc_rows:
+                    session.execute(Document.__table__.insert(), doc_rows)
+                for rows in grouper(batch_size, chunk_rows):
+                    session.execute(Chunk.__table__.insert(), list(rows))
             session.commit()
 
     def list(self, name):
@@ -62,7 +125,8 @@ class PGVectorBackend(VectorStoreBackend):
             data = list(result.mappings().all())
         return data
 
-    def find_similar(self, name, obj, top=5, filter=None, distance=None, max_distance=None, **kwargs):
+    def find_similar(self, name, obj, top=5, filter=None, distance=None, max_distance=None, ef_search=None,
+                     probes=None, **kwargs):
         """ Find similar documents in a collection based on the provided object.
 
         Args:
@@ -75,11 +139,18 @@ class PGVectorBackend(VectorStoreBackend):
                 'attributes' key in the filter dictionary.
             distance (str): The distance metric to use ('l2' or 'cos'). Defaults to 'l2'.
             max_distance (float): Optional maximum distance to filter results.
+            ef_search (int): Optional, the size of the candidate list of a hnsw index search, defaults to
+               the ef_search parameter of the index
+            probes (int): Optional, the number of lists searched in an ivfflat index, defaults to the
+               probes parameter of the index
             **kwargs: Additional keyword arguments, if filter is not provided, kwargs will be used as
                filter.
 
         Returns:
             list: A list of dictionaries containing the similar documents and their attributes.
+
+        .. versionchanged:: NEXT
+            added ef_search and probes
         """
         collection, vector_size, model = self._get_collection(name)
         Document, Chunk = self._create_collection(name, collection, vector_size)
@@ -90,7 +161,11 @@ class PGVectorBackend(VectorStoreBackend):
         }
         metric = distance or 'l2'
         filter = filter or kwargs
+        obj = dense_vector(obj)
         with Session as session:
+            # search parameters apply to the current transaction only
+            for setting, value in self._search_settings(name, metric, ef_search=ef_search, probes=probes).items():
+                session.execute(text(f'SET LOCAL {setting} = {value}'))
             distance_fn = METRIC_MAP[metric]
             query = (select(Document.id,
                             Document.source,
@@ -209,6 +284,7 @@ class PGVectorBackend(VectorStoreBackend):
             with Session as session:
                 Chunk.__table__.drop(session.get_bind(), checkfirst=False)
                 Document.__table__.drop(session.get_bind(), checkfirst=False)
+            self._forget_collection(name, collection)
             return
         with Session as session:
             # get documents
@@ -227,8 +303,35 @@ class PGVectorBackend(VectorStoreBackend):
             session.commit()
 
     def _create_collection(self, name, collection, vector_size, **kwargs):
-        Base = declarative_base()
+        # get the Document, Chunk models of a collection, set up tables and indexes on first use
+        # -- the setup is recorded in the collection's metadata, so that it is done once
+        # -- the setup is repeated if the schema version, vector size or indexes change
         collection = collection or self._default_collection(name)
+        indexes = self._index_options(name)
+        schema = {
+            'version': self.SCHEMA_VERSION,
+            'vector_size': vector_size,
+            'indexes': indexes,
+        }
+        key = self._connection_key(name), collection, json.dumps(schema, sort_keys=True)
+        try:
+            return PGVECTOR_COLLECTIONS[key]
+        except KeyError:
+            pass
+        Document, Chunk = self._collection_models(collection, vector_size)
+        meta = self.data_store.metadata(name)
+        collection_meta = meta.kind_meta.setdefault('collections', {}).setdefault(collection, {})
+        if collection_meta.get('schema') != schema:
+            previous = (collection_meta.get('schema') or {}).get('indexes')
+            created = self._setup_collection(name, Document, Chunk, indexes, previous=previous)
+            # only record the indexes that exist, so that a failed index is retried
+            collection_meta['schema'] = dict(schema, indexes=created)
+            meta.save()
+        PGVECTOR_COLLECTIONS[key] = Document, Chunk
+        return Document, Chunk
+
+    def _collection_models(self, collection, vector_size):
+        Base = declarative_base()
         docs_table = f'{collection}_docs'
         chunks_table = f'{docs_table}_chunks'
 
@@ -249,37 +352,122 @@ class PGVectorBackend(VectorStoreBackend):
             document = relationship('Document')
             # attributes = Column(String)
 
+        return Document, Chunk
+
+    def _setup_collection(self, name, Document, Chunk, indexes, previous=None):
+        # create tables, run migrations and create (or rebuild) indexes
+        # -- returns the indexes that exist after the setup, by metric
         with self._get_connection(name, session=True) as session:
             session.execute(text('CREATE EXTENSION IF NOT EXISTS vector'))
             session.commit()
-            Base.metadata.create_all(session.get_bind())
+            Document.metadata.create_all(session.get_bind())
             session.commit()
             migrator = DatabaseMigrator(session.connection())
             migrator.run_migrations([Document, Chunk])
+        previous = dict(previous or {})
         with self._get_connection(name, session=True) as session:
-            try:
-                index = Index(
-                    'l2_index',
-                    Chunk.embedding,
-                    postgresql_using='hnsw',
-                    postgresql_with={'m': 16, 'ef_construction': 64},
-                    postgresql_ops={'embedding': 'vector_l2_ops'}
-                )
-                index.create(session.get_bind())
-            except Exception as e:
-                pass
+            bind = session.get_bind()
+            if not previous:
+                self._drop_legacy_index(session, Chunk)
+            existing = dict(previous)
+            for metric in set(previous) | set(indexes):
+                try:
+                    if metric in previous and previous[metric] != indexes.get(metric):
+                        # the index was removed or its parameters changed
+                        self._index(Chunk, metric, previous[metric]).drop(bind, checkfirst=True)
+                        existing.pop(metric)
+                    if metric in indexes:
+                        self._index(Chunk, metric, indexes[metric]).create(bind, checkfirst=True)
+                        existing[metric] = indexes[metric]
+                except Exception as e:
+                    logger.warning(f'could not create {metric} index for {Chunk.__tablename__}: {e}')
             session.commit()
-        return Document, Chunk
+        return existing
 
-    def _get_connection(self, name, session=False):
-        from sqlalchemy import create_engine
+    def _drop_legacy_index(self, session, Chunk):
+        # collections created by previous versions have an hnsw index named l2_index
+        # -- the name is unique per schema, drop it only if it is on this collection's table
+        legacy = session.execute(text(
+            "SELECT 1 FROM pg_indexes WHERE indexname = 'l2_index' AND tablename = :table"
+            " AND schemaname = current_schema()"), {'table': Chunk.__tablename__}).first()
+        if legacy:
+            session.execute(text('DROP INDEX IF EXISTS l2_index'))
+            session.commit()
+
+    def _index(self, Chunk, metric, options):
+        if metric not in self.INDEX_OPS:
+            raise ValueError(f'unsupported distance metric {metric}, use one of {list(self.INDEX_OPS)}')
+        method = (options or {}).get('method', 'hnsw')
+        build_params, _ = self.INDEX_PARAMS[method]
+        # the index name must be unique per schema and at most 63 characters
+        table_hash = sha256(Chunk.__tablename__.encode('utf8')).hexdigest()[:16]
+        return Index(
+            f'ix_{table_hash}_{metric}',
+            Chunk.embedding,
+            postgresql_using=method,
+            postgresql_with={k: v for k, v in (options or {}).items() if k in build_params},
+            postgresql_ops={'embedding': self.INDEX_OPS[metric]}
+        )
+
+    def _index_options(self, name):
+        # get the index options by metric, as specified in om.datasets.put(..., indexes=), or the defaults
+        meta = self.data_store.metadata(name)
+        indexes = meta.kind_meta.get('kwargs', {}).get('indexes') if meta is not None else None
+        return indexes if indexes is not None else self._settings().get('indexes', {})
+
+    def _search_settings(self, name, metric, **params):
+        # get the settings for the index search parameters, e.g. {'hnsw.ef_search': 100}
+        # -- params passed to find_similar() take precedence over the index options
+        options = self._index_options(name).get(metric) or {}
+        settings = {}
+        for method, (_, search_params) in self.INDEX_PARAMS.items():
+            for param, setting in search_params.items():
+                value = params.get(param)
+                if value is None and options.get('method', 'hnsw') == method:
+                    value = options.get(param)
+                if value is not None:
+                    settings[setting] = int(value)
+        return settings
+
+    def _forget_collection(self, name, collection):
+        # remove the setup record of a collection, e.g. after its tables were dropped
+        collection = collection or self._default_collection(name)
+        connection_key = self._connection_key(name)
+        for key in list(PGVECTOR_COLLECTIONS.keys()):
+            if key[:2] == (connection_key, collection):
+                PGVECTOR_COLLECTIONS.pop(key, None)
+        meta = self.data_store.metadata(name)
+        meta.kind_meta.get('collections', {}).get(collection, {}).pop('schema', None)
+        meta.save()
+
+    def _settings(self):
+        return getattr(self.data_store.defaults, 'OMEGA_PGVECTOR', None) or {}
+
+    def _connection_str(self, name):
         meta = self.data_store.metadata(name)
         connection_str = meta.kind_meta['connection']
-        connection_str = connection_str.replace('pgvector', 'postgresql').replace('sqla+', '')
+        return connection_str.replace('pgvector', 'postgresql').replace('sqla+', '')
+
+    def _connection_key(self, name):
+        # the key is a hash of the connection string, which includes any secrets
+        return sha256(self._connection_str(name).encode('utf8')).hexdigest()
+
+    def _get_engine(self, name):
+        # get the engine of a connection string, engines are kept per process to pool connections
+        # -- create_engine() must be called per-process, PGVECTOR_ENGINES is cleared in a forked process
+        from sqlalchemy import create_engine
         import sqlalchemy
-        # https://docs.sqlalchemy.org/en/14/changelog/migration_20.html
-        kwargs = {} if sqlalchemy.__version__.startswith('2.') else dict(future=True)
-        engine = create_engine(connection_str, **kwargs)
+        key = self._connection_key(name)
+        try:
+            engine = PGVECTOR_ENGINES[key]
+        except KeyError:
+            # https://docs.sqlalchemy.org/en/14/changelog/migration_20.html
+            kwargs = {} if sqlalchemy.__version__.startswith('2.') else dict(future=True)
+            engine = PGVECTOR_ENGINES[key] = create_engine(self._connection_str(name), **kwargs)
+        return engine
+
+    def _get_connection(self, name, session=False):
+        engine = self._get_engine(name)
         if session:
             connection = Session(bind=engine)
         else:
@@ -4,6 +4,7 @@ import os
 import re
 from collections import namedtuple
 from copy import deepcopy
+from functools import lru_cache
 from getpass import getuser
 from pprint import pformat
 from urllib.parse import parse_qs, urljoin, urlsplit
@@ -14,6 +15,8 @@ import requests
 from jinja2.sandbox import SandboxedEnvironment
 from openai import OpenAI
 
+from omegaml.backends.genai.convcache import conversation_cache
+from omegaml.backends.genai.embcache import EmbeddingCache
 from omegaml.backends.genai.index import DocumentIndex
 from omegaml.backends.genai.models import GenAIBaseBackend, GenAIModel
 from omegaml.backends.tracking import OmegaSimpleTracker, NoTrackTracker
@@ -199,7 +202,7 @@ class TextModelBackend(GenAIBaseBackend):
             model = TextModel(base_url, model, api_key=creds, prompt=prompt, template=template,
                               data_store=data_store, pipeline=pipeline, tools=tools,
                               tracking=self.tracking, provider=provider, documents=documents,
-                              strategy=strategy,
+                              strategy=strategy, embedding_cache=EmbeddingCache.from_store(data_store),
                               **params)
         return model
 
@@ -325,7 +328,7 @@ class TextModel(GenAIModel):
 
     def __init__(self, base_url, model, api_key=None, template=None, prompt=None, data_store=None,
                  tracking=None, pipeline=None, provider='openai', tools=None, documents=None,
-                 strategy=None, trace=None, **kwargs):
+                 strategy=None, trace=None, embedding_cache=None, **kwargs):
         super().__init__()
         self.base_url = base_url
         self.model = model
@@ -344,6 +347,7 @@ class TextModel(GenAIModel):
         self.tools = tools
         self.tools_specs = [self._get_function_spec(tool) for tool in tools] if tools else None
         self.documents = documents
+        self.embedding_cache = embedding_cache
         self.strategy = strategy or {
             # kwargs to pass to DocumentIndex.retrieve()
             'retrieve': {
@@ -387,7 +391,33 @@ class TextModel(GenAIModel):
         return self
 
     def embed(self, documents, dimensions=None, raw=False, conversation_id=None, **kwargs):
+        """ embed documents
+
+        Args:
+            documents (str|list): the document or list of documents (chunks) to embed
+            dimensions (int): optional, the number of dimensions, defaults to the model's
+               dimensions parameter, or 256
+            raw (bool): optional, if True return the provider's response
+            conversation_id (str): optional, the conversation id to track usage
+            **kwargs: passed to the provider
+
+        Returns:
+            list of embeddings, or the provider's response if raw=True
+
+        .. versionchanged:: NEXT
+            if the model has an embedding cache, only documents not in the cache
+            are sent to the provider, see EmbeddingCache
+        """
         dimensions = dimensions or self.kwargs.get('dimensions', 256)
+        if self.embedding_cache is not None and not raw and not kwargs:
+            model_key = self.embedding_cache.model_key(provider=type(self.provider).__name__,
+                                                       base_url=self.base_url, model=self.model,
+                                                       dimensions=dimensions, params=self.kwargs)
+            embed_fn = lambda texts: self._embed(texts, dimensions=dimensions, conversation_id=conversation_id)
+            return self.embedding_cache.embed(model_key, ensure_list(documents), embed_fn)
+        return self._embed(documents, dimensions=dimensions, raw=raw, conversation_id=conversation_id, **kwargs)
+
+    def _embed(self, documents, dimensions=None, raw=False, conversation_id=None, **kwargs):
         response = self.provider.embed(documents, dimensions=dimensions, model=self.model,
                                        **kwargs)
         conversation_id = conversation_id or uuid4().hex
@@ -497,34 +527,46 @@ class TextModel(GenAIModel):
         assert self.tracking, "chat requires a tracking instance, use with om.runtime.experiment(): ... "
         conversation_id = conversation_id or uuid4().hex
         # if the client sends in messages, don't recall past conversations (they are already in messages)
-        messages = messages or self.conversation(conversation_id, raw=True)
+        # -- past conversations are kept in the conversation cache, loaded from tracking on a miss
+        if messages:
+            conversation_cache.invalidate(self, conversation_id)
+        else:
+            messages = conversation_cache.get(self, conversation_id,
+                                              lambda: self.conversation(conversation_id, raw=True))
         system_message_missing = not any(m.get('role') == 'system' for m in messages)
         empty = lambda d: d.empty if isinstance(d, pd.DataFrame) else not d
+        logged = []
         if empty(messages) or system_message_missing:
             # no message history, insert the system message to start off the conversation)
             messages = [self._system_message(self.prompt, conversation_id=conversation_id)] + (
                 messages if messages else [])
             self._log_events('conversation', conversation_id, messages)
-        responses = self._do_complete(prompt, messages=messages, conversation_id=conversation_id, data=data,
-                                      use_tools=use_tools, raw=raw, stream=stream, **kwargs)
-        to_store = []
-        for response in responses:
-            response, prompt_message, response_message, raw_response = response
-            finish_reason = response_message.get('finish_reason')
-            consolidated = finish_reason == 'stop.consolidated'
-            if not stream or (stream and consolidated):
-                # only store consolidated responses
-                # -- if streaming, response_message is merged from all choices[0].delta
-                # -- if not streaming, response_message is the choices[0].message
-                # wrapping in deepcopy() to avoid modification by the data store (e.g. adding _id)
-                to_store.extend([
-                    deepcopy(prompt_message),
-                    deepcopy(response_message)
-                ])
-            if not consolidated:
-                # the stop.consolidated message is internal to TextModel, do not return it
-                yield conversation_id, response, prompt_message, response_message, raw_response
-        self._log_events('conversation', conversation_id, to_store)
+            logged.extend(deepcopy(messages))
+        try:
+            responses = self._do_complete(prompt, messages=messages, conversation_id=conversation_id, data=data,
+                                          use_tools=use_tools, raw=raw, stream=stream, flush=False, **kwargs)
+            to_store = []
+            for response in responses:
+                response, prompt_message, response_message, raw_response = response
+                finish_reason = response_message.get('finish_reason')
+                consolidated = finish_reason == 'stop.consolidated'
+                if not stream or (stream and consolidated):
+                    # only store consolidated responses
+                    # -- if streaming, response_message is merged from all choices[0].delta
+                    # -- if not streaming, response_message is the choices[0].message
+                    # wrapping in deepcopy() to avoid modification by the data store (e.g. adding _id)
+                    to_store.extend([
+                        deepcopy(prompt_message),
+                        deepcopy(response_message)
+                    ])
+                if not consolidated:
+                    # the stop.consolidated message is internal to TextModel, do not return it
+                    yield conversation_id, response, prompt_message, response_message, raw_response
+            self._log_events('conversation', conversation_id, to_store)
+            conversation_cache.append(self, conversation_id, logged + to_store)
+        finally:
+            # write all events of this turn at once, also if the responses are not fully consumed
+            self.tracking.flush()
 
     def _call_tools(self, tool_calls, conversation_id):
         # process tool calls
@@ -595,7 +637,7 @@ class TextModel(GenAIModel):
         }
 
     def _do_complete(self, prompt, messages=None, conversation_id=None, data=None, stream=False,
-                     use_tools=False, raw=False, **kwargs):
+                     use_tools=False, raw=False, flush=True, **kwargs):
         conversation_id = conversation_id or uuid4().hex
         messages = messages or []
         kwargs.update(self.strategy.get('complete', {}))
@@ -810,31 +852,35 @@ class TextModel(GenAIModel):
             chunks.append(raw_response)
             return response, prompt_message, response_message, raw_response
 
-        if stream:
-            chunks = []
-            consolidated_response = {}
-            finalized = False
-            for chunk in response:
+        try:
+            if stream:
+                chunks = []
+                consolidated_response = {}
+                finalized = False
+                for chunk in response:
+                    try:
+                        self._track_usage(chunk, conversation_id)
+                        resolved = resolve_chunk(response, chunk, chunks, prompt_message, consolidated_response,
+                                                 use_tools=use_tools)
+                    except Exception as e:
+                        logger.warning(f"could not process chunk {chunk.get('id')} due to {e}")
+                        self._log_events('error', conversation_id, [chunk])
+                    else:
+                        if not finalized:
+                            yield resolved
+                    finalized = consolidated_response.get('intermediate_results') is not None
+                consolidated_response['finish_reason'] = 'stop.consolidated'
+                yield response, prompt_message, consolidated_response, chunks[-1] if chunks else {}
+            else:
                 try:
-                    self._track_usage(chunk, conversation_id)
-                    resolved = resolve_chunk(response, chunk, chunks, prompt_message, consolidated_response,
-                                             use_tools=use_tools)
+                    self._track_usage(response, conversation_id)
+                    yield resolve_response(response, prompt_message, use_tools=use_tools)
                 except Exception as e:
-                    logger.warning(f"could not process chunk {chunk.get('id')} due to {e}")
-                    self._log_events('error', conversation_id, [chunk])
-                else:
-                    if not finalized:
-                        yield resolved
-                finalized = consolidated_response.get('intermediate_results') is not None
-            consolidated_response['finish_reason'] = 'stop.consolidated'
-            yield response, prompt_message, consolidated_response, chunks[-1] if chunks else {}
-        else:
-            try:
-                self._track_usage(response, conversation_id)
-                yield resolve_response(response, prompt_message, use_tools=use_tools)
-            except Exception as e:
-                logger.warning(f"Could not process chunk {response.get('id')} due to {e}")
-                self._log_events('error', conversation_id, [response])
+                    logger.warning(f"Could not process chunk {response.get('id')} due to {e}")
+                    self._log_events('error', conversation_id, [response])
+        finally:
+            # write usage, toolcall and error events, unless _do_chat() flushes at the end of the turn
+            self.tracking.flush() if flush and self.tracking else None
 
     def _parsed_completion(self, response):
         return response['choices'][0]['message'].get('content')
@@ -915,9 +961,7 @@ class TextModel(GenAIModel):
         return self._resolve_template(template, **context)
 
     def _resolve_template(self, template, **context):
-        env = SandboxedEnvironment()
-        template = env.from_string(template)
-        return template.render(**context).strip()
+        return _compiled_template(template).render(**context).strip()
 
     def _augment_message(self, message, documents: DocumentIndex = None, query=None, template=None):
         augmented = self._augment_prompt(message.get('content', ''), documents=documents, query=query,
@@ -926,9 +970,9 @@ class TextModel(GenAIModel):
         return message
 
     def _log_events(self, event, conversation_id, data):
+        # events are buffered by the tracking provider, _do_chat() and _do_complete() flush once per call
         if self.tracking:
             self.tracking.log_events(event, conversation_id, ensure_list(data))
-            self.tracking.flush()
 
     def _track_usage(self, response, conversation_id):
         data = ensure_dict(response)
@@ -937,6 +981,18 @@ class TextModel(GenAIModel):
                 self.tracking.log_event('usage', metric, value, conversation_id=conversation_id)
 
 
+@lru_cache(maxsize=256)
+def _compiled_template(template):
+    # compile templates once, keyed by the template text
+    # -- the environment is shared, rendering is thread-safe
+    return _template_env().from_string(template)
+
+
+@lru_cache(maxsize=1)
+def _template_env():
+    return SandboxedEnvironment()
+
+
 class Provider:
     URL_REGEX = None
 
@@ -5,6 +5,7 @@ from datetime import datetime
 from itertools import pairwise, product
 
 from omegaml.backends.monitoring.alerting import AlertRule
+from omegaml.backends.monitoring.sketches import SnapshotSketch
 from omegaml.backends.monitoring.stats import DriftStats, DriftStatsCalc
 from omegaml.util import dict_merge, tryOr
 
@@ -373,6 +374,77 @@ class DriftMonitorBase:
             }
         return snapshot
 
+    def _do_snapshot_chunked(self, chunks, columns=None, name=None, kind=None, info=None, prefix=None,
+                             postfix=None, catcols=None, correlate=False, groupby=None):
+        """ calculate a snapshot of the data, chunk by chunk
+
+        Same as _do_snapshot, however the statistics are accumulated for each chunk using
+        mergeable sketches, so that memory use is bounded by the chunk size. Percentiles,
+        median and histograms are approximate, calculated from a t-digest. Spearman correlations
+        are not available and are returned as None.
+
+        Args:
+            chunks (iterable): an iterable of pd.DataFrame
+            groupby (str|list): optional, the columns to group by. If specified, returns a
+              tuple (snapshot, dict of group => snapshot)
+            ...: see _do_snapshot
+
+        Returns:
+            dict: the snapshot, in the same format as _do_snapshot
+
+        .. versionadded:: NEXT
+        """
+        new_sketch = lambda: SnapshotSketch(columns=columns, catcols=catcols, correlate=correlate,
+                                            max_corr_columns=self.max_corr_columns)
+        sketch = new_sketch()
+        groups = {}
+        for df in chunks:
+            sketch.update(df)
+            for g, gdf in (df.groupby(groupby) if groupby else []):
+                groups.setdefault(g, new_sketch()).update(gdf)
+        snapshot = self._snapshot_from_sketch(sketch, name=name, kind=kind, info=info, prefix=prefix,
+                                              postfix=postfix)
+        if groupby:
+            group_snapshots = {}
+            for g, gsketch in groups.items():
+                g_postfix = ':'.join(str(v) for v in g) if isinstance(groupby, (list, tuple)) else g
+                group_snapshots[g] = self._snapshot_from_sketch(gsketch, name=name, kind=kind, info=info,
+                                                                prefix=prefix, postfix=g_postfix)
+            return snapshot, group_snapshots
+        return snapshot
+
+    def _snapshot_from_sketch(self, sketch, name=None, kind=None, info=None, prefix=None, postfix=None):
+        # build a snapshot from a SnapshotSketch, same format as _do_snapshot
+        assert sketch.len, f'dataset {name} is empty, cannot take a snapshot'
+        extra_info = dict(info or {})
+        extra_info.update({
+            'len': sketch.len,
+        })
+        snapshot = {}
+        stats = snapshot.setdefault('stats', {})
+        info = snapshot.setdefault('info', self._snapshot_info(name, kind, **extra_info))
+        prefixed = lambda col: f'{prefix}_{col}' if prefix else col
+        postfixed = lambda col: f'{col}_{postfix}' if postfix else col
+        pre_or_post_fixed = lambda col: (postfixed(prefixed(col)) if isinstance(col, str)
+                                         else [postfixed(prefixed(c)) for c in col])
+        info['num_columns'] = pre_or_post_fixed(sketch.numeric_columns)
+        info['cat_columns'] = pre_or_post_fixed(sketch.cat_columns)
+        correlations = {'pearson': None, 'spearman': None}
+        if sketch.correlations is not None:
+            correlations['pearson'] = tryOr(lambda: sketch.correlations.corr(), None)
+        elif sketch.correlate:
+            warnings.warn(f'too many columns for correlation calculation, max columns = {self.max_corr_columns}')
+        probs = [0.05, 0.1, 0.25, 0.5, 0.75, 0.9, .95]
+        for col in sketch.numeric_columns:
+            col_sketch = sketch.sketches[col]
+            bins = 10 if col_sketch.count < 1000 else 100
+            stats[pre_or_post_fixed(col)] = col_stats = col_sketch.stats(probs, bins)
+            col_stats['corr'] = {method: tryOr(lambda: correlations[method][col], None)
+                                 for method in correlations}
+        for col in sketch.cat_columns:
+            stats[pre_or_post_fixed(col)] = sketch.sketches[col].stats()
+        return snapshot
+
     def _log_snapshot(self, snapshot):
         self.tracking.use()  # ensure we have an active run
         self.tracking.log_event('snapshot', self._resource, snapshot, kind=snapshot['info']['kind'])
@@ -711,3 +783,28 @@ class DriftMonitorBase:
         if rename:
             df.columns = [rename.get(col, col) for col in df.columns]
         return df
+
+    def _dataset_as_chunks(self, dataset, chunksize, rename=None, filter=None, **query):
+        # yield the dataset as DataFrames of chunksize rows
+        # -- stored pandas.dfrows datasets are read by MDataFrame.iterchunks()
+        # -- other stored datasets are read by store.get(..., chunksize=)
+        # -- in-memory objects are split into chunks
+        # -- an iterable of DataFrames is used as is
+        query = filter or query or self._query
+        meta = self.store.metadata(dataset) if isinstance(dataset, str) else None
+        assert meta is not None or not isinstance(dataset, str), f'dataset {dataset} does not exist'
+        if meta is not None and meta.kind == 'pandas.dfrows':
+            chunks = self.store.get(dataset, lazy=True, **query).iterchunks(chunksize=chunksize)
+        elif meta is not None:
+            chunks = self.store.get(dataset, chunksize=chunksize, **query)
+            chunks = [chunks] if isinstance(chunks, pd.DataFrame) else chunks
+        elif isinstance(dataset, (list, np.ndarray, pd.DataFrame, pd.Series)):
+            df = self._dataset_as_dataframe(dataset, filter=filter, **query)
+            chunks = (df.iloc[i:i + chunksize] for i in range(0, len(df), chunksize))
+        else:
+            chunks = dataset
+        for chunk in chunks:
+            chunk = chunk if isinstance(chunk, pd.DataFrame) else self._dataset_as_dataframe(chunk)
+            if rename:
+                chunk = chunk.rename(columns=rename)
+            yield chunk
@@ -17,7 +17,10 @@ class DataDriftMonitor(DriftMonitorBase):
 
         Args:
             dataset (str|pd.DataFrame|np.ndarray): the dataset to snapshot
-            chunksize (int): the chunksize to use for reading the dataset
+            chunksize (int): the chunksize to use for reading the dataset. If specified, the
+               dataset is processed chunk by chunk, using bounded memory. The dataset can also
+               be an iterable of DataFrames. Percentiles, median and histograms are approximate,
+               spearman correlations are not calculated.
             columns (list): the columns to snapshot, defaults to all columns
             prefix (str): prefix to apply to all columns
             kind (str): the kind of the snapshot (model, data)
@@ -40,12 +43,23 @@ class DataDriftMonitor(DriftMonitorBase):
                     - stats (dict): the statistics of the snapshot data
                     - hist (dict): the histograms of the snapshot data
                     - groups (dict): the histograms of the snapshot data by group
+
+        .. versionchanged:: NEXT
+            chunksize is supported
         """
-        # TODO: for chunksizes need to combine hist for multiple chunks
-        # -- https://stackoverflow.com/a/57884457/890242
         kind = kind or self._kind
         dataset = dataset if dataset is not None else self._resource
         name = name or (dataset if isinstance(dataset, str) else f'{kind}:{type(dataset)}')
+        if chunksize:
+            chunks = self._dataset_as_chunks(dataset, int(chunksize), rename=rename, filter=filter, **query)
+            snapshot = self._do_snapshot_chunked(chunks, columns=columns, name=name, kind=kind,
+                                                 prefix=prefix, catcols=catcols, correlate=correlate,
+                                                 groupby=groupby)
+            if groupby:
+                snapshot, groups = snapshot
+                snapshot = self._combine_snapshots([snapshot, *groups.values()])
+            self._log_snapshot(snapshot) if logged else None
+            return snapshot
         df = self._dataset_as_dataframe(dataset, rename=rename, filter=filter, **query)
         snapshot = self._do_snapshot(df, columns=columns, name=name, kind=kind, prefix=prefix, catcols=catcols,
                                      correlate=correlate)
@@ -0,0 +1,284 @@
+import numpy as np
+import pandas as pd
+
+
+class QuantileDigest:
+    """ mergeable approximate quantiles, a simplified merging t-digest
+
+    Values are summarized by at most ~``compression`` weighted centroids.
+    Centroids are smaller towards the tails of the distribution, so extreme
+    quantiles are more accurate than with equal-sized buckets. Digests of
+    different chunks of data can be merged.
+
+    .. versionadded:: NEXT
+    """
+
+    def __init__(self, compression=200):
+        self.compression = compression
+        self.means = np.array([], dtype=float)
+        self.weights = np.array([], dtype=float)
+        self.min = np.inf
+        self.max = -np.inf
+
+    @property
+    def count(self):
+        return self.weights.sum()
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.min = min(self.min, values.min())
+            self.max = max(self.max, values.max())
+            self._compress(np.concatenate([self.means, values]),
+                           np.concatenate([self.weights, np.ones(len(values))]))
+        return self
+
+    def merge(self, other):
+        if len(other.means):
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+            self._compress(np.concatenate([self.means, other.means]),
+                           np.concatenate([self.weights, other.weights]))
+        return self
+
+    def quantile(self, probs):
+        positions, values = self._cdf_points()
+        return np.interp(probs, positions, values)
+
+    def cdf(self, x):
+        positions, values = self._cdf_points()
+        return np.interp(x, values, positions)
+
+    def _cdf_points(self):
+        # cumulative probability at each centroid's center, including min and max
+        total = self.weights.sum()
+        centers = (np.cumsum(self.weights) - self.weights / 2) / total
+        return (np.concatenate([[0], centers, [1]]),
+                np.concatenate([[self.min], self.means, [self.max]]))
+
+    def _compress(self, means, weights):
+        # merge adjacent centroids that fall into the same bucket of the k1 scale function
+        # -- k(q) = compression / (2 pi) * arcsin(2q - 1), giving smaller buckets at the tails
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        q = (np.cumsum(weights) - weights / 2) / total
+        k = self.compression / (2 * np.pi) * np.arcsin(np.clip(2 * q - 1, -1, 1))
+        buckets = np.floor(k - k.min()).astype(int)
+        _, starts = np.unique(buckets, return_index=True)
+        sum_weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / sum_weights
+        self.weights = sum_weights
+
+
+class NumericSketch:
+    """ mergeable statistics of a numeric column
+
+    Uses Welford's algorithm for mean and variance, and a QuantileDigest for
+    percentiles and histograms.
+
+    .. versionadded:: NEXT
+    """
+
+    def __init__(self, dtype=None, compression=200):
+        self.dtype = dtype
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.missing = 0
+        self.digest = QuantileDigest(compression=compression)
+
+    def update(self, series):
+        values = pd.Series(series).dropna().values.astype(float)
+        other = NumericSketch(dtype=self.dtype, compression=self.digest.compression)
+        other.missing = len(series) - len(values)
+        if len(values):
+            other.count = len(values)
+            other.mean = values.mean()
+            other.m2 = ((values - other.mean) ** 2).sum()
+            other.digest.update(values)
+        return self.merge(other)
+
+    def merge(self, other):
+        # Chan et al. parallel variance
+        count = self.count + other.count
+        if count:
+            delta = other.mean - self.mean
+            self.mean += delta * other.count / count
+            self.m2 += other.m2 + delta ** 2 * self.count * other.count / count
+        self.count = count
+        self.missing += other.missing
+        self.digest.merge(other.digest)
+        return self
+
+    def stats(self, probs, bins):
+        """ return the statistics in the same format as a DataFrame snapshot """
+        var = self.m2 / self.count if self.count else np.nan
+        counts, edges = self._histogram(bins)
+        widths = np.diff(edges)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            density = counts / (counts.sum() * widths)
+        return {
+            'dtype': self.dtype,
+            'probs': probs,
+            'bins': bins,
+            'hist': (counts, edges),
+            'pdf': (density, edges),
+            'std': np.sqrt(var),
+            'var': var,
+            'mean': self.mean if self.count else np.nan,
+            'median': self.digest.quantile(0.5),
+            'min': self.digest.min,
+            'max': self.digest.max,
+            'percentiles': [self.digest.quantile(probs), probs],
+            'missing': self.missing,
+        }
+
+    def _histogram(self, bins):
+        # approximate histogram with the same edges as np.histogram(values, bins)
+        # -- the cumulative counts are rounded, so that bins add up to the number of values
+        if not self.count:
+            return np.zeros(bins, dtype=int), np.linspace(0, 1, bins + 1)
+        lo, hi = self.digest.min, self.digest.max
+        if lo == hi:
+            # all values are equal, they fall into the middle bin
+            edges = np.linspace(lo - 0.5, hi + 0.5, bins + 1)
+            counts = np.zeros(bins, dtype=int)
+            counts[min(np.searchsorted(edges, lo, side='right') - 1, bins - 1)] = self.count
+            return counts, edges
+        edges = np.linspace(lo, hi, bins + 1)
+        cumulative = np.round(self.digest.cdf(edges) * self.count)
+        cumulative[0], cumulative[-1] = 0, self.count
+        return np.diff(cumulative).astype(int), edges
+
+
+class CategoricalSketch:
+    """ mergeable exact value counts of a categorical column
+
+    .. versionadded:: NEXT
+    """
+
+    def __init__(self, dtype=None):
+        self.dtype = dtype
+        self.counts = pd.Series(dtype=float)
+        self.missing = 0
+
+    def update(self, series):
+        series = pd.Series(series)
+        self.counts = self.counts.add(series.value_counts(), fill_value=0)
+        self.missing += int(series.isna().sum())
+        return self
+
+    def merge(self, other):
+        self.counts = self.counts.add(other.counts, fill_value=0)
+        self.missing += other.missing
+        return self
+
+    def stats(self):
+        """ return the statistics in the same format as a DataFrame snapshot """
+        counts = self.counts.astype(int).sort_values(ascending=False, kind='stable')
+        return {
+            'dtype': self.dtype,
+            'groups': counts.to_dict(),
+            'pmf': (counts / counts.sum()).to_dict(),
+            'missing': self.missing,
+        }
+
+
+class CorrelationSketch:
+    """ mergeable pairwise pearson correlations
+
+    Accumulates the sums and cross-products for each pair of columns, using
+    only rows where both values are present, i.e. same as DataFrame.corr().
+
+    .. versionadded:: NEXT
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        k = len(self.columns)
+        self.n = np.zeros((k, k))
+        self.sx = np.zeros((k, k))
+        self.sxx = np.zeros((k, k))
+        self.sxy = np.zeros((k, k))
+
+    def update(self, df):
+        values = df[self.columns].values.astype(float)
+        present = (~np.isnan(values)).astype(float)
+        values = np.nan_to_num(values)
+        self.n += present.T @ present
+        self.sx += values.T @ present
+        self.sxx += (values ** 2).T @ present
+        self.sxy += values.T @ values
+        return self
+
+    def merge(self, other):
+        for attr in ('n', 'sx', 'sxx', 'sxy'):
+            setattr(self, attr, getattr(self, attr) + getattr(other, attr))
+        return self
+
+    def corr(self):
+        """ return the correlations as a dict, same as DataFrame.corr().to_dict() """
+        # sx[i, j] is the sum of column i for rows where both i and j are present
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = self.n * self.sxy - self.sx * self.sx.T
+            var = (self.n * self.sxx - self.sx ** 2) * (self.n * self.sxx - self.sx ** 2).T
+            corr = cov / np.sqrt(var)
+        corr[self.n < 2] = np.nan
+        return pd.DataFrame(np.clip(corr, -1, 1), index=self.columns, columns=self.columns).to_dict()
+
+
+class SnapshotSketch:
+    """ mergeable statistics of a DataFrame, computed chunk by chunk
+
+    The column types are determined by the first chunk.
+
+    .. versionadded:: NEXT
+    """
+
+    def __init__(self, columns=None, catcols=None, correlate=False, max_corr_columns=50):
+        self.columns = columns
+        self.catcols = catcols
+        self.correlate = correlate
+        self.max_corr_columns = max_corr_columns
+        self.numeric_columns = None
+        self.cat_columns = None
+        self.sketches = {}
+        self.correlations = None
+        self.len = 0
+
+    def update(self, df):
+        df = df[self.columns] if self.columns else df
+        if self.numeric_columns is None:
+            self._init_columns(df)
+        for col, sketch in self.sketches.items():
+            sketch.update(df[col])
+        if self.correlations is not None:
+            self.correlations.update(df)
+        self.len += len(df)
+        return self
+
+    def merge(self, other):
+        if self.numeric_columns is None:
+            self.numeric_columns, self.cat_columns = other.numeric_columns, other.cat_columns
+            self.sketches, self.correlations, self.len = other.sketches, other.correlations, other.len
+            return self
+        for col, sketch in self.sketches.items():
+            sketch.merge(other.sketches[col])
+        if self.correlations is not None:
+            self.correlations.merge(other.correlations)
+        self.len += other.len
+        return self
+
+    def _init_columns(self, df):
+        catcols = [c for c in self.catcols if c in df.columns] if self.catcols else []
+        self.numeric_columns = list(set(df.select_dtypes(include='number').columns) - set(catcols))
+        self.cat_columns = list(set(df.columns) - set(self.numeric_columns))
+        for col in self.numeric_columns:
+            self.sketches[col] = NumericSketch(dtype=str(df.dtypes[col]))
+        for col in self.cat_columns:
+            self.sketches[col] = CategoricalSketch(dtype=str(df.dtypes[col]))
+        corr_columns = self.correlate if isinstance(self.correlate, (list, tuple)) else self.numeric_columns
+        if self.correlate and len(self.numeric_columns) <= self.max_corr_columns:
+            self.correlations = CorrelationSketch(corr_columns)
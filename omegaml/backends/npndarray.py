@@ -1,9 +1,16 @@
+import hashlib
+import logging
+import os
+import threading
 from io import BytesIO
+from pathlib import Path
 
 import numpy as np
 
 from omegaml.backends.basedata import BaseDataBackend
 
+logger = logging.getLogger(__name__)
+
 
 class NumpyNDArrayBackend(BaseDataBackend):
     """
@@ -12,6 +19,32 @@ class NumpyNDArrayBackend(BaseDataBackend):
     The NDArray is serialized to a byte string and stored as a BLOB.
     Thus it can have arbitrary size and dimensions, ideal for image
     data and Tensors.
+
+    Usage::
+
+        om.datasets.put(arr, 'myarray')
+        om.datasets.get('myarray')
+        => np.ndarray
+
+        # read only some rows, fetches only the required chunks of the file
+        lazy = om.datasets.get('myarray', lazy=True)
+        lazy[1000:2000]
+        => np.ndarray
+
+    If the local cache is enabled, get() keeps a copy of the stored array
+    on local disk, and returns a read-only memory map of the cached copy.
+    This avoids reading and allocating large arrays that are reused by
+    many tasks on the same worker::
+
+        # in config.yml or om.defaults
+        OMEGA_NDARRAY_CACHE:
+            enabled: true
+            path: /tmp/omegaml/ndarray
+            maxbytes: 10737418240
+
+    .. versionchanged:: NEXT
+        get(lazy=True) returns a LazyNDArray for partial reads, get() returns a
+        read-only np.memmap if OMEGA_NDARRAY_CACHE is enabled
     """
     KIND = 'ndarray.bin'
 
@@ -23,14 +56,15 @@ class NumpyNDArrayBackend(BaseDataBackend):
 
     def put(self, obj, name, attributes=None, allow_pickle=False, **kwargs):
         # TODO associate meta.gridfile with actual fs file
+        buf = BytesIO()
+        np.save(buf, obj, allow_pickle=allow_pickle)
         kind_meta = {
             'dtype': obj.dtype.name,
             'shape': obj.shape,
             'save_method': self._save_method,
             'allow_pickle': allow_pickle,
+            'md5': hashlib.md5(buf.getbuffer()).hexdigest(),
         }
-        buf = BytesIO()
-        np.save(buf, obj, allow_pickle=allow_pickle)
         buf.seek(0)
         fn = self.data_store.object_store_key(name, 'np', hashed=True)
         gridfile = self._store_to_file(self.data_store, buf, fn)
@@ -45,7 +79,11 @@ class NumpyNDArrayBackend(BaseDataBackend):
         fin = meta.gridfile
         if meta.kind_meta.get('save_method') == self._save_method:
             allow_pickle = meta.kind_meta.get('allow_pickle')
-            loaded = self._load_from_npsave(fin, allow_pickle)
+            if lazy:
+                return LazyNDArray(fin, allow_pickle=allow_pickle)
+            loaded = self._load_from_cache(meta)
+            if loaded is None:
+                loaded = self._load_from_npsave(fin, allow_pickle)
         else:
             dtype_name = meta.kind_meta['dtype']
             dtype = getattr(np, dtype_name, None)
@@ -62,3 +100,166 @@ class NumpyNDArrayBackend(BaseDataBackend):
         fin.close()
         buf.seek(0)
         return np.load(buf, allow_pickle=allow_pickle)
+
+    def _load_from_cache(self, meta):
+        # return a read-only memory map of the locally cached file, None if not cached
+        settings = getattr(self.data_store.defaults, 'OMEGA_NDARRAY_CACHE', None) or {}
+        md5 = meta.kind_meta.get('md5')
+        if not settings.get('enabled') or not md5 or meta.kind_meta.get('allow_pickle'):
+            return None
+        cache = NDArrayFileCache(settings['path'], settings.get('maxbytes'))
+        try:
+            path = cache.get(md5, meta.gridfile)
+            return np.load(path, mmap_mode='r') if path else None
+        except Exception as e:
+            logger.warning(f'could not use local cache for {meta.name} due to {e}')
+            return None
+
+
+class LazyNDArray:
+    """ a stored array that reads only the requested rows
+
+    Indexing by an integer or a slice on the first axis reads only the byte
+    range of the requested rows, i.e. only the gridfs chunks that cover this
+    range are fetched from the database. Any other indexing reads the full
+    array.
+
+    Usage::
+
+        lazy = om.datasets.get('myarray', lazy=True)
+        lazy.shape, lazy.dtype
+        lazy[1000:2000]  # rows 1000 to 1999
+        lazy[5, :10]     # row 5, first 10 columns
+        np.asarray(lazy) # full array
+
+    .. versionadded:: NEXT
+    """
+
+    def __init__(self, fin, allow_pickle=False):
+        self.fin = fin
+        self.allow_pickle = allow_pickle
+        self._lock = threading.Lock()
+        fin.seek(0)
+        version = np.lib.format.read_magic(fin)
+        read_header = (np.lib.format.read_array_header_1_0 if version == (1, 0)
+                       else np.lib.format.read_array_header_2_0)
+        self.shape, self.fortran_order, self.dtype = read_header(fin)
+        self.offset = fin.tell()
+
+    def __len__(self):
+        return self.shape[0] if self.shape else 0
+
+    def __repr__(self):
+        return f'LazyNDArray(shape={self.shape}, dtype={self.dtype})'
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    def __array__(self, dtype=None, copy=None):
+        arr = self.load()
+        return arr.astype(dtype) if dtype is not None else arr
+
+    def __getitem__(self, key):
+        first, rest = (key[0], key[1:]) if isinstance(key, tuple) and key else (key, ())
+        partial = (self.ndim and not self.fortran_order and not self.dtype.hasobject
+                   and isinstance(first, (int, np.integer, slice)))
+        if not partial:
+            return self.load()[key]
+        if isinstance(first, slice):
+            indices = range(*first.indices(len(self)))
+            if not len(indices):
+                return self._read_rows(0, 0)[(slice(None),) + rest]
+            # read the contiguous range of rows, then apply the step
+            lo, hi = min(indices[0], indices[-1]), max(indices[0], indices[-1]) + 1
+            rows = self._read_rows(lo, hi)[indices[0] - lo::indices.step]
+            return rows[(slice(None),) + rest] if rest else rows
+        index = int(first) + len(self) if first < 0 else int(first)
+        if not 0 <= index < len(self):
+            raise IndexError(f'index {first} is out of bounds for axis 0 with size {len(self)}')
+        row = self._read_rows(index, index + 1)[0]
+        return row[rest] if rest else row
+
+    def load(self):
+        """ read the full array """
+        with self._lock:
+            self.fin.seek(0)
+            return np.load(BytesIO(self.fin.read()), allow_pickle=self.allow_pickle)
+
+    def _read_rows(self, start, stop):
+        rowshape = self.shape[1:]
+        rowbytes = int(np.prod(rowshape, dtype=int)) * self.dtype.itemsize
+        count = max(stop - start, 0)
+        with self._lock:
+            self.fin.seek(self.offset + start * rowbytes)
+            data = self.fin.read(count * rowbytes) if count else b''
+        return np.frombuffer(data, dtype=self.dtype).reshape((count,) + tuple(rowshape))
+
+
+class NDArrayFileCache:
+    """ local content-addressed disk cache of stored arrays
+
+    Files are stored as ``<path>/<md5>.npy``, where md5 is the digest of the
+    file's contents. A file is downloaded only if it does not exist in the
+    cache, and is validated against the md5 digest on download. The total
+    size of cached files is limited to ``maxbytes``, least recently used
+    files are removed first.
+
+    .. versionadded:: NEXT
+    """
+    chunksize = 4 * 1024 * 1024
+
+    def __init__(self, path, maxbytes=None):
+        self.path = Path(path)
+        self.maxbytes = int(maxbytes) if maxbytes else None
+
+    def get(self, md5, fin):
+        """ return the path of the cached file, downloading from fin if required
+
+        Args:
+            md5 (str): the md5 digest of the file
+            fin (file-like): the stored file, must support seek() and read()
+
+        Returns:
+            path of the cached file, None if the downloaded file does not match md5
+        """
+        path = self.path / f'{md5}.npy'
+        length = getattr(fin, 'length', None)
+        if path.exists() and (length is None or path.stat().st_size == length):
+            os.utime(path)
+            return str(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path / f'.{md5}.{os.getpid()}.{threading.get_ident()}.tmp'
+        digest = hashlib.md5()
+        fin.seek(0)
+        with open(tmp_path, 'wb') as fout:
+            while data := fin.read(self.chunksize):
+                digest.update(data)
+                fout.write(data)
+        if digest.hexdigest() != md5:
+            logger.warning(f'md5 mismatch for cached file {path}, not using cache')
+            tmp_path.unlink(missing_ok=True)
+            return None
+        os.replace(tmp_path, path)
+        self.evict(keep=path)
+        return str(path)
+
+    def evict(self, keep=None):
+        """ remove least recently used files until the total size is within maxbytes """
+        if not self.maxbytes:
+            return
+        files = []
+        for fn in self.path.glob('*.npy'):
+            try:
+                files.append((fn.stat().st_mtime, fn.stat().st_size, fn))
+            except FileNotFoundError:
+                pass
+        total = sum(size for _, size, _ in files)
+        for _, size, fn in sorted(files, key=lambda v: v[0]):
+            if total <= self.maxbytes:
+                break
+            if fn == keep:
+                continue
+            # memory maps of removed files remain valid until they are closed
+            fn.unlink(missing_ok=True)
+            total -= size
@@ -0,0 +1,184 @@
+import logging
+import threading
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class _Batch:
+    # the requests collected for one call to model.predict()
+    def __init__(self):
+        self.items = []
+        self.rows = 0
+        self.closed = False
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.results = None
+        self.error = None
+
+
+class PredictBatcher:
+    """ dynamic micro-batching of concurrent predict requests
+
+    Concurrent requests to predict the same model are collected for up to
+    ``window`` seconds, or until ``max_batch_size`` rows are collected. The
+    first request of a batch (the leader) then calls model.predict() once for
+    all rows, and each request receives the slice of the result that belongs
+    to its rows.
+
+    Usage::
+
+        # enable in config.yml or om.defaults
+        OMEGA_PREDICT_BATCHING:
+            enabled: true
+            window: 0.01
+            max_batch_size: 1024
+
+        # in a resource, instead of om.runtime.model(name).predict(df).get()
+        result = predict_batcher.predict(om, name, df)
+
+        # get batch size metrics
+        predict_batcher.stats()
+        => {'batches': 10, 'requests': 42, 'rows': 84, 'errors': 0,
+            'mean_batch_size': 4.2, 'max_batch_size': 8, 'sizes': {1: 2, 4: 3, ...}}
+
+    Notes:
+        * batching applies to requests of the same user, with the same model,
+          store and columns
+        * the model must return one result per input row, in the same order,
+          as e.g. scikit-learn estimators do. If the result length does not
+          match, every request of the batch fails
+        * each request waits up to window seconds longer than without batching.
+          Batching trades latency for throughput and is disabled by default
+        * the batch is run with the leader's Omega instance
+
+    .. versionadded:: NEXT
+    """
+
+    def __init__(self, window=None, max_batch_size=None):
+        self._lock = threading.Lock()
+        self._window = window
+        self._max_batch_size = max_batch_size
+        self._open = {}
+        self._reset_counters()
+
+    def _reset_counters(self):
+        self.batches = 0
+        self.requests = 0
+        self.rows = 0
+        self.errors = 0
+        self.sizes = Counter()
+
+    def _settings(self, om):
+        settings = getattr(om.defaults, 'OMEGA_PREDICT_BATCHING', None) or {}
+        window = float(self._window if self._window is not None else settings.get('window', 0.01))
+        max_batch_size = int(self._max_batch_size or settings.get('max_batch_size', 1024))
+        return bool(settings.get('enabled', False)), window, max_batch_size
+
+    def _key(self, om, name, df):
+        # requests of different users are never batched, even for the same database and bucket
+        # -- the mongo_url includes the credentials
+        store = om.models
+        userid = getattr(om.defaults, 'OMEGA_USERID', None)
+        return store.mongo_url, userid, store.bucket, name, tuple(df.columns)
+
+    def enabled(self, om):
+        return self._settings(om)[0]
+
+    def predict(self, om, name, df):
+        """ predict df by the model, batched with concurrent requests
+
+        Args:
+            om (Omega): the omega instance
+            name (str): the name of the model
+            df (pd.DataFrame): the data to predict
+
+        Returns:
+            the model's predictions for df
+        """
+        enabled, window, max_batch_size = self._settings(om)
+        if not enabled or not isinstance(df, pd.DataFrame):
+            return om.runtime.model(name).predict(df).get()
+        key = self._key(om, name, df)
+        with self._lock:
+            batch = self._open.get(key)
+            is_leader = batch is None
+            if is_leader:
+                batch = self._open[key] = _Batch()
+            index = len(batch.items)
+            batch.items.append(df)
+            batch.rows += len(df)
+            if batch.rows >= max_batch_size:
+                # close the batch, next request starts a new batch
+                self._close(key, batch)
+        if is_leader:
+            batch.full.wait(window)
+            with self._lock:
+                self._close(key, batch)
+            self._run(om, name, batch)
+        else:
+            batch.done.wait()
+        if batch.error is not None:
+            raise batch.error
+        return batch.results[index]
+
+    def _close(self, key, batch):
+        # requires self._lock
+        batch.closed = True
+        batch.full.set()
+        if self._open.get(key) is batch:
+            del self._open[key]
+
+    def _run(self, om, name, batch):
+        # predict all rows of the batch at once, scatter results to requests
+        try:
+            data = pd.concat(batch.items, ignore_index=True) if len(batch.items) > 1 else batch.items[0]
+            result = om.runtime.model(name).predict(data).get()
+            if len(result) != len(data):
+                raise ValueError(f'model {name} returned {len(result)} results for {len(data)} rows')
+            offsets = np.cumsum([0] + [len(df) for df in batch.items])
+            # pandas slices are indexed from 0, as the result of an unbatched request
+            take = ((lambda s, e: result.iloc[s:e].reset_index(drop=True)) if hasattr(result, 'iloc')
+                    else (lambda s, e: result[s:e]))
+            batch.results = [take(start, end) for start, end in zip(offsets[:-1], offsets[1:])]
+        except Exception as e:
+            batch.error = e
+        finally:
+            with self._lock:
+                self.batches += 1
+                self.requests += len(batch.items)
+                self.rows += batch.rows
+                self.errors += int(batch.error is not None)
+                self.sizes[len(batch.items)] += 1
+            logger.debug(f'predict batch {name}: {len(batch.items)} requests, {batch.rows} rows')
+            batch.done.set()
+
+    def clear(self):
+        """ reset counters """
+        with self._lock:
+            self._reset_counters()
+
+    def stats(self):
+        """ return batching metrics
+
+        Returns:
+            dict of batches, requests, rows, errors, mean_batch_size (requests
+            per batch), max_batch_size, sizes (number of batches by size)
+        """
+        with self._lock:
+            return {
+                'batches': self.batches,
+                'requests': self.requests,
+                'rows': self.rows,
+                'errors': self.errors,
+                'mean_batch_size': self.requests / self.batches if self.batches else 0,
+                'max_batch_size': max(self.sizes) if self.sizes else 0,
+                'sizes': dict(sorted(self.sizes.items())),
+            }
+
+
+#: the process-local predict batcher
+predict_batcher = PredictBatcher()
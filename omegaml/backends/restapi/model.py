@@ -3,6 +3,7 @@ import logging
 import numpy as np
 import pandas as pd
 
+from omegaml.backends.restapi.batching import predict_batcher
 from omegaml.backends.restapi.streamable import StreamableResourceMixin
 from omegaml.util import ensure_json_serializable
 
@@ -43,6 +44,9 @@ class GenericModelResource(StreamableResourceMixin):
 
         Returns:
             dict(model: id, result: dict)
+
+        .. versionchanged:: NEXT
+            concurrent requests are batched if OMEGA_PREDICT_BATCHING is enabled
         """
         data = (payload or {}).get('data')
         dataset = query.get('datax')
@@ -55,6 +59,8 @@ class GenericModelResource(StreamableResourceMixin):
                 col = columns[0]
                 df[col] = df[col].apply(lambda v: np.array(v).reshape(shape))
                 df = np.stack(df[col])
+            if not self.is_async and predict_batcher.enabled(self.om):
+                return self.prepare_result(predict_batcher.predict(self.om, model_id, df), resource_name=model_id)
             promise = self.om.runtime.model(model_id).predict(df)
         elif dataset:
             promise = self.om.runtime.model(model_id).predict(dataset)
@@ -0,0 +1,215 @@
+import logging
+import os
+import pickle
+import sys
+import threading
+
+import cachetools
+
+logger = logging.getLogger(__name__)
+
+
+class _LRUModelCache(cachetools.LRUCache):
+    # LRUCache that counts evictions
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.evictions = 0
+
+    def popitem(self):
+        item = super().popitem()
+        self.evictions += 1
+        return item
+
+
+class ModelCache:
+    """ process-local cache of deserialized models for inference
+
+    Keeps recently used model objects in memory so that repeated predictions
+    by the same worker process do not need to read and deserialize the model
+    from the store on every call. The cache is keyed by the store's database,
+    bucket and prefix and the model's name. Every access validates the cached
+    model against the model's current metadata (its modified timestamp and
+    gridfile id), that is a model that is updated by models.put() or dropped
+    by models.drop() is never served from the cache.
+
+    The total size of cached models is limited to ``maxbytes``, using the size
+    of the serialized model as an estimate of its size in memory. For models
+    that are not stored as a file (e.g. stored in the metadata, or by a virtual
+    object backend) the size is estimated by the length of the pickled model,
+    or sys.getsizeof() if the model cannot be pickled. Least recently used
+    models are evicted first.
+
+    Usage::
+
+        # enable in config.yml or om.defaults
+        OMEGA_MODEL_CACHE:
+            enabled: true
+            maxbytes: 1073741824
+
+        # or by environment variables (sets OMEGA_MODEL_CACHE['enabled'], ['maxbytes'])
+        OMEGA_MODEL_CACHE_ENABLED=1
+        OMEGA_MODEL_CACHE_MAXBYTES=1073741824
+
+        # in a backend, instead of model_store.get(name)
+        model = model_cache.get(self.model_store, name)
+
+        # get hit/miss counters
+        model_cache.stats()
+
+    Notes:
+        * only use the cache for inference, i.e. for methods that do not
+          modify the model object (predict, transform, score etc.). Cached
+          models are shared by all callers in the same process
+        * the cache is cleared in a forked child process
+
+    .. versionadded:: NEXT
+    """
+
+    def __init__(self, maxbytes=None):
+        self._lock = threading.RLock()
+        self._pid = os.getpid()
+        self._maxbytes = maxbytes
+        self._cache = None
+        self._reset_counters()
+
+    def _reset_counters(self):
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _settings(self, store):
+        settings = getattr(store.defaults, 'OMEGA_MODEL_CACHE', None) or {}
+        return bool(settings.get('enabled', False)), int(self._maxbytes or settings.get('maxbytes', 0))
+
+    def _get_cache(self, maxbytes):
+        # get the cache for this process, reinitialize if maxbytes has changed
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._cache = None
+            self._reset_counters()
+        if self._cache is None or self._cache.maxsize != maxbytes:
+            self._cache = _LRUModelCache(maxsize=maxbytes, getsizeof=lambda entry: entry[2])
+        return self._cache
+
+    def _key(self, store, name):
+        return store.mongo_url.rsplit('@', 1)[-1], store.bucket, store.prefix, name
+
+    def _token(self, meta):
+        gridfile_id = getattr(meta.gridfile, 'grid_id', None)
+        return str(meta.id), str(meta.modified), str(gridfile_id), str(meta.uri or '')
+
+    def _size(self, meta, model):
+        # size of the serialized model, or an estimate if the model is not stored as a file
+        try:
+            size = int(getattr(meta.gridfile, 'length', 0) or 0)
+        except Exception:
+            size = 0
+        if not size:
+            try:
+                size = len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))
+            except Exception:
+                size = sys.getsizeof(model)
+        return size
+
+    def enabled(self, store):
+        return self._settings(store)[0]
+
+    def get(self, store, name, **kwargs):
+        """ get a model from the cache, loading it from the store on a miss
+
+        Args:
+            store (OmegaStore): the model store
+            name (str): the name of the model
+            **kwargs: passed to store.get() on a miss
+
+        Returns:
+            the model object, or None if the model does not exist
+        """
+        enabled, maxbytes = self._settings(store)
+        if not enabled:
+            return store.get(name, **kwargs)
+        meta = store.metadata(name)
+        if meta is None:
+            self.invalidate(store, name)
+            return None
+        key, token = self._key(store, name), self._token(meta)
+        with self._lock:
+            cache = self._get_cache(maxbytes)
+            entry = cache.get(key)
+            if entry is not None and entry[1] == token:
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        model = store.get(name, **kwargs)
+        self.put(store, name, model, meta=meta)
+        return model
+
+    def put(self, store, name, model, meta=None):
+        """ add a model to the cache
+
+        Args:
+            store (OmegaStore): the model store
+            name (str): the name of the model
+            model (object): the model object
+            meta (Metadata): optional, the model's metadata, defaults to
+              store.metadata(name)
+        """
+        enabled, maxbytes = self._settings(store)
+        if not enabled:
+            return
+        meta = meta or store.metadata(name)
+        size = self._size(meta, model)
+        with self._lock:
+            cache = self._get_cache(maxbytes)
+            key = self._key(store, name)
+            if size > maxbytes:
+                # too large to cache, make sure we don't keep a stale entry
+                cache.pop(key, None)
+                return
+            cache[key] = model, self._token(meta), size
+
+    def invalidate(self, store, name=None):
+        """ remove a model or all models of the given store from the cache
+
+        Args:
+            store (OmegaStore): the model store
+            name (str): optional, the name of the model. If not specified all
+              models of the store are removed
+        """
+        with self._lock:
+            if self._cache is None:
+                return
+            key = self._key(store, name)
+            keys = [k for k in self._cache.keys() if (k == key if name else k[0:3] == key[0:3])]
+            for k in keys:
+                self._cache.pop(k, None)
+                self.invalidations += 1
+
+    def clear(self):
+        """ remove all models from the cache and reset counters """
+        with self._lock:
+            self._cache.clear() if self._cache is not None else None
+            self._reset_counters()
+
+    def stats(self):
+        """ return cache statistics
+
+        Returns:
+            dict of hits, misses, evictions, invalidations, count (number
+            of models cached), size (bytes), maxbytes
+        """
+        with self._lock:
+            cache = self._cache
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': cache.evictions if cache is not None else 0,
+                'invalidations': self.invalidations,
+                'count': len(cache) if cache is not None else 0,
+                'size': cache.currsize if cache is not None else 0,
+                'maxbytes': cache.maxsize if cache is not None else self._maxbytes,
+            }
+
+
+#: the process-local model cache
+model_cache = ModelCache()
@@ -1,4 +1,56 @@
+import logging
+
+from omegaml.backends.runtime.modelcache import model_cache
+
+logger = logging.getLogger(__name__)
+
+
 class RuntimeModelPreloader:
-    """ preload models into the runtime """
+    """ preload models into the runtime
+
+    Loads models into the process-local model cache so that the first
+    prediction does not have to pay for reading and deserializing the model.
+    This requires the model cache to be enabled, see ModelCache.
+
+    Usage::
+
+        # preload specific models
+        RuntimeModelPreloader(om).preload(['mymodel', 'othermodel'])
+
+        # preload models listed in om.defaults.OMEGA_MODEL_PRELOAD
+        RuntimeModelPreloader(om).preload()
+
+    .. versionchanged:: NEXT
+        implemented using the process-local model cache
+    """
+
+    def __init__(self, om, cache=None):
+        self.om = om
+        self.cache = cache or model_cache
+
+    def preload(self, items=None):
+        """ preload models
 
+        Args:
+            items (list): optional, list of model names or patterns, defaults
+               to om.defaults.OMEGA_MODEL_PRELOAD
 
+        Returns:
+            dict of model name => True if loaded, False otherwise
+        """
+        store = self.om.models
+        if not self.cache.enabled(store):
+            logger.warning('model cache is not enabled, not preloading models')
+            return {}
+        items = items if items is not None else getattr(self.om.defaults, 'OMEGA_MODEL_PRELOAD', None)
+        names = []
+        for item in items or []:
+            names.extend(store.list(item) if '*' in item else [item])
+        loaded = {}
+        for name in names:
+            try:
+                loaded[name] = self.cache.get(store, name) is not None
+            except Exception as e:
+                logger.error(f'could not preload model {name} due to {e}')
+                loaded[name] = False
+        return loaded
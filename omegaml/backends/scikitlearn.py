@@ -12,6 +12,7 @@ import joblib
 from sklearn.model_selection import GridSearchCV
 
 from omegaml.backends.basemodel import BaseModelBackend
+from omegaml.backends.runtime.modelcache import model_cache
 from omegaml.documents import MDREGISTRY
 from omegaml.util import reshaped, gsreshaped
 
@@ -83,6 +84,7 @@ class ScikitLearnBackendV1(BaseModelBackend):
         """
         Packages a model using joblib and stores in GridFS
         """
+        model_cache.invalidate(self.model_store, name)
         zipfname = self._v1_package_model(obj, name)
         with open(zipfname, 'rb') as fzip:
             gridfile = self.model_store.fs.put(
@@ -135,7 +137,7 @@ class ScikitLearnBackendV2(ScikitLearnBackendV1):
     def predict(
             self, modelname, Xname, rName=None, pure_python=True, **kwargs):
         data = self._resolve_input_data('predict', Xname, 'X', **kwargs)
-        model = self.model_store.get(modelname)
+        model = self._get_cached_model(modelname)
 
         def store(result):
             return self._prepare_result('predict', result, rName=rName,
@@ -149,7 +151,7 @@ class ScikitLearnBackendV2(ScikitLearnBackendV1):
     def predict_proba(
             self, modelname, Xname, rName=None, pure_python=True, **kwargs):
         data = self._resolve_input_data('predict', Xname, 'X', **kwargs)
-        model = self.model_store.get(modelname)
+        model = self._get_cached_model(modelname)
 
         def store(result):
             return self._prepare_result('predict', result, rName=rName,
@@ -185,7 +187,7 @@ class ScikitLearnBackendV2(ScikitLearnBackendV1):
     def score(
             self, modelname, Xname, Yname=None, rName=None, pure_python=True,
             **kwargs):
-        model = self.model_store.get(modelname)
+        model = self._get_cached_model(modelname)
         X = self.data_store.get(Xname)
         Y = self.data_store.get(Yname)
 
@@ -228,7 +230,7 @@ class ScikitLearnBackendV2(ScikitLearnBackendV1):
         return result if rName else model_meta
 
     def transform(self, modelname, Xname, rName=None, pure_python=True, **kwargs):
-        model = self.model_store.get(modelname)
+        model = self._get_cached_model(modelname)
         X = self.data_store.get(Xname)
 
         def store(result):
@@ -245,7 +247,7 @@ class ScikitLearnBackendV2(ScikitLearnBackendV1):
         return result
 
     def decision_function(self, modelname, Xname, rName=None, pure_python=True, **kwargs):
-        model = self.model_store.get(modelname)
+        model = self._get_cached_model(modelname)
         X = self.data_store.get(Xname)
 
         def store(result):
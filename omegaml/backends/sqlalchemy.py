@@ -2,9 +2,13 @@ from logging import warning
 
 import logging
 import os
+import queue
 import sqlalchemy
 import string
+import threading
 import warnings
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
 from getpass import getuser
 from hashlib import sha256
 from packaging.version import Version
@@ -305,7 +309,7 @@ class SQLAlchemyBackend(BaseDataBackend):
 
     def put(self, obj, name, sql=None, copy=False, append=True, chunksize=None,
             transform=None, table=None, attributes=None, insert=False,
-            secrets=None, *args, **kwargs):
+            secrets=None, partition_column=None, partitions=None, *args, **kwargs):
         """ store sqlalchemy connection or insert data into an existing connection
 
         Args:
@@ -328,6 +332,10 @@ class SQLAlchemyBackend(BaseDataBackend):
             append (bool): if True the data is appended if exists already
             chunksize (int): number of records to query in each chunk
             transform (callable): passed as DataFrame.to_sql(method=)
+            partition_column (str): optional, a numeric or datetime column to
+                split the query into ranges that are read concurrently
+            partitions (int): the number of ranges, defaults to
+                ``om.defaults.OMEGA_SQL_COPY['partitions']``
 
         Returns:
             metadata of the inserted dataframe
@@ -358,6 +366,8 @@ class SQLAlchemyBackend(BaseDataBackend):
                                              sql=sql, chunksize=chunksize,
                                              append=append, transform=transform,
                                              secrets=secrets,
+                                             partition_column=partition_column,
+                                             partitions=partitions,
                                              **kwargs)
         elif meta is not None:
             table = self._default_table(table or meta.kind_meta.get('table') or name)
@@ -466,20 +476,127 @@ class SQLAlchemyBackend(BaseDataBackend):
         return connection
 
     def copy_from_sql(self, sql, connstr, name, chunksize=10000,
-                      append=False, transform=None, secrets=None, **kwargs):
+                      append=False, transform=None, secrets=None,
+                      partition_column=None, partitions=None, bounds=None, n_jobs=None,
+                      **kwargs):
+        """ copy the result of a sql query into a dataset
+
+        Args:
+            sql (str): the sql query
+            connstr (str): the sqlalchemy connection string
+            name (str): the name of the dataset
+            chunksize (int): the number of rows to read in each chunk
+            append (bool): if True append to the dataset, else replace
+            transform (callable): optional, called with every chunk, returns the
+               DataFrame to insert
+            secrets (dict): optional, the secrets to format connstr
+            partition_column (str): optional, a numeric or datetime column. If
+               specified, the query is split into ranges of this column that
+               are read concurrently. Note the rows are inserted in the
+               order they are read
+            partitions (int): the number of ranges, defaults to
+               ``om.defaults.OMEGA_SQL_COPY['partitions']``
+            bounds (tuple): optional, the (min, max) values of partition_column,
+               queried from the database if not specified
+            n_jobs (int): the number of ranges read concurrently, defaults to
+               partitions
+            **kwargs: passed to pd.read_sql
+
+        Returns:
+            Metadata of the dataset
+
+        .. versionchanged:: NEXT
+            chunks are inserted by a pool of writer threads, and the Metadata
+            is saved once. Added partition_column, partitions, bounds, n_jobs
+        """
+        settings = getattr(self.data_store.defaults, 'OMEGA_SQL_COPY', None) or {}
         connection = self._get_connection(name, connstr, secrets=secrets)
         chunksize = chunksize or 10000  # avoid None
-        pditer = pd.read_sql(sql, connection, chunksize=chunksize, **kwargs)
-        with tqdm_if_interactive().tqdm(unit='rows') as pbar:
-            meta = self._chunked_insert(pditer, name, append=append,
-                                        transform=transform, pbar=pbar)
-        connection.close()
+        try:
+            if partition_column:
+                partitions = partitions or settings.get('partitions', 4)
+                pditer = self._read_partitioned(sql, connection, partition_column, partitions=partitions,
+                                                bounds=bounds, n_jobs=n_jobs, chunksize=chunksize, **kwargs)
+            else:
+                pditer = pd.read_sql(sql, connection, chunksize=chunksize, **kwargs)
+            with tqdm_if_interactive().tqdm(unit='rows') as pbar:
+                meta = self._chunked_insert(pditer, name, append=append,
+                                            transform=transform, pbar=pbar)
+        finally:
+            connection.close()
         return meta
 
-    def _chunked_to_sql(self, df, table, connection, if_exists='append', chunksize=None, pbar=True, **kwargs):
+    def _read_partitioned(self, sql, connection, column, partitions=4, bounds=None, n_jobs=None,
+                          chunksize=10000, params=None, **kwargs):
+        # split the query into ranges of column, read concurrently by pooled connections of the engine
+        # -- returns an iterator of chunks in the order they are read
+        engine = connection.engine
+        quoted = engine.dialect.identifier_preparer.quote(column)
+        source = f'SELECT * FROM ({sql}) _om_source'
+        params = dict(params or {})
+        if bounds is None:
+            stmt = sqlalchemy.text(f'SELECT MIN({quoted}), MAX({quoted}) FROM ({sql}) _om_source')
+            bounds = tuple(connection.execute(stmt, params).fetchone())
+        if bounds[0] is None:
+            # no rows, or no values to partition by
+            return pd.read_sql(sqlalchemy.text(sql), connection, params=params, chunksize=chunksize, **kwargs)
+        edges = _partition_edges(*bounds, partitions)
+        queries = [(f'{source} WHERE {quoted} >= :om_lo AND {quoted} {"<" if i < len(edges) - 2 else "<="} :om_hi',
+                    {**params, 'om_lo': lo, 'om_hi': hi})
+                   for i, (lo, hi) in enumerate(zip(edges[:-1], edges[1:]))]
+        queries.append((f'{source} WHERE {quoted} IS NULL', params))
+        n_jobs = n_jobs or len(queries)
+        chunks = queue.Queue(maxsize=2 * n_jobs)
+        stop = threading.Event()
+        done = object()
+
+        def put(item):
+            # put to the queue unless the reader was stopped
+            while not stop.is_set():
+                try:
+                    chunks.put(item, timeout=.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def read(stmt, stmt_params):
+            try:
+                with engine.connect() as conn:
+                    for chunk in pd.read_sql(sqlalchemy.text(stmt), conn, params=stmt_params,
+                                             chunksize=chunksize, **kwargs):
+                        if len(chunk) and not put(chunk):
+                            break
+            except Exception as e:
+                put(e)
+            finally:
+                put(done)
+
+        def iter_chunks():
+            with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+                [pool.submit(read, stmt, stmt_params) for stmt, stmt_params in queries]
+                pending = len(queries)
+                try:
+                    while pending:
+                        item = chunks.get()
+                        if item is done:
+                            pending -= 1
+                        elif isinstance(item, Exception):
+                            raise item
+                        else:
+                            yield item
+                finally:
+                    stop.set()
+
+        return iter_chunks()
+
+    def _chunked_to_sql(self, df, table, connection, if_exists='append', chunksize=None, pbar=True,
+                        method=None, **kwargs):
         # insert large df in chunks and with a progress bar
         # from https://stackoverflow.com/a/39495229
+        # -- use the dialect's bulk insert method unless specified
         chunksize = chunksize if chunksize is not None else 10000
+        method = method or _bulk_insert_method(connection)
 
         def chunker(seq, size):
             return (seq.iloc[pos:pos + size] for pos in range(0, len(seq), size))
@@ -487,7 +604,7 @@ class SQLAlchemyBackend(BaseDataBackend):
         def to_sql(df, table, connection, pbar=None):
             for i, cdf in enumerate(chunker(df, chunksize)):
                 exists_action = if_exists if i == 0 else "append"
-                cdf.to_sql(table, con=connection, if_exists=exists_action, **kwargs)
+                cdf.to_sql(table, con=connection, if_exists=exists_action, method=method, **kwargs)
                 if pbar:
                     pbar.update(len(cdf))
                 else:
@@ -498,17 +615,25 @@ class SQLAlchemyBackend(BaseDataBackend):
 
     def _chunked_insert(self, pditer, name, append=True, transform=None, pbar=None):
         # insert into om dataset
-        for i, df in enumerate(pditer):
-            if pbar is not None:
-                pbar.update(len(df))
-            should_append = (i > 0) or append
-            if transform:
-                df = transform(df)
-            try:
-                meta = self.data_store.put(df, name, append=should_append)
-            except Exception as e:
-                rows = df.iloc[0:10].to_dict()
-                raise ValueError("{e}: {rows}".format(**locals()))
+        # -- chunks are inserted by a pool of writer threads while the next chunks are read
+        from omegaml.store.fastinsert import pipelined_insert
+
+        settings = getattr(self.data_store.defaults, 'OMEGA_SQL_COPY', None) or {}
+
+        def chunks():
+            for df in pditer:
+                if pbar is not None:
+                    pbar.update(len(df))
+                yield transform(df) if transform else df
+
+        try:
+            meta = pipelined_insert(self.data_store, chunks(), name, append=append,
+                                    n_jobs=settings.get('writers', 4),
+                                    queue_size=settings.get('queue_size'))
+        except Exception as e:
+            chunkdf = getattr(e, 'chunkdf', None)
+            rows = chunkdf.iloc[0:10].to_dict() if chunkdf is not None else {}
+            raise ValueError("{e}: {rows}".format(**locals())) from e
         return meta
 
     def _is_valid_url(self, url):
@@ -604,6 +729,56 @@ class SQLAlchemyBackend(BaseDataBackend):
         return stmt
 
 
+def _partition_edges(lo, hi, partitions):
+    # the edges of equal-width ranges from lo to hi, for numeric or datetime values
+    import numpy as np
+    if isinstance(lo, str) or isinstance(hi, str):
+        raise ValueError(f'partition column must be numeric or datetime, got {lo!r}, {hi!r}')
+    if isinstance(lo, (datetime, date)):
+        edges = pd.date_range(pd.Timestamp(lo), pd.Timestamp(hi), periods=partitions + 1)
+        edges = [edge.to_pydatetime() if isinstance(lo, datetime) else edge.date() for edge in edges]
+    elif isinstance(lo, (int, np.integer)) and isinstance(hi, (int, np.integer)):
+        edges = [int(edge) for edge in np.linspace(lo, hi, partitions + 1).round()]
+    else:
+        edges = [float(edge) for edge in np.linspace(float(lo), float(hi), partitions + 1)]
+    # remove empty ranges, e.g. if there are fewer distinct values than partitions
+    return sorted(set(edges)) if len(set(edges)) > 1 else [edges[0], edges[-1]]
+
+
+def _bulk_insert_method(connection):
+    # the DataFrame.to_sql(method=) for the connection's dialect, None to use executemany
+    dialect = connection.engine.dialect
+    if dialect.name == 'postgresql' and dialect.driver in ('psycopg2', 'psycopg'):
+        return _pg_copy_insert
+    return None
+
+
+def _pg_copy_insert(table, conn, keys, data_iter):
+    # insert rows by COPY FROM STDIN, see DataFrame.to_sql(method=)
+    # adopted from https://pandas.pydata.org/docs/user_guide/io.html#insertion-method
+    import csv
+    from io import StringIO
+    buf = StringIO()
+    # csv.writer writes None and '' the same, thus None is written as \N, the NULL marker of the COPY
+    # -- an empty string is stored as an empty string, not NULL, as by executemany()
+    null = '\\N'
+    csv.writer(buf).writerows([null if v is None else v for v in row] for row in data_iter)
+    quote = lambda v: '"{}"'.format(v.replace('"', '""'))
+    columns = ', '.join(quote(k) for k in keys)
+    table_name = f'{quote(table.schema)}.{quote(table.name)}' if table.schema else quote(table.name)
+    stmt = f"COPY {table_name} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '{null}')"
+    dbapi_conn = conn.connection
+    with dbapi_conn.cursor() as cur:
+        if hasattr(cur, 'copy_expert'):
+            # psycopg2
+            buf.seek(0)
+            cur.copy_expert(sql=stmt, file=buf)
+        else:
+            # psycopg 3
+            with cur.copy(stmt) as copy:
+                copy.write(buf.getvalue())
+
+
 def _is_valid_url(url):
     # check if we have a valid url with a registered backend
     import sqlalchemy
@@ -0,0 +1,229 @@
+import atexit
+import logging
+import os
+import queue
+import random
+import threading
+import weakref
+
+logger = logging.getLogger(__name__)
+
+#: all active flushers, flushed at interpreter exit
+_FLUSHERS = weakref.WeakSet()
+#: shared flushers by key, see shared_flusher()
+_SHARED = {}
+_SHARED_LOCK = threading.Lock()
+
+
+class BackgroundFlusher:
+    """ Write log events in a background thread
+
+    Events are added to a bounded queue by put(), and written in batches
+    by a background thread that calls writer(events). This takes writing
+    to the store off the caller's thread, e.g. a model's predict().
+
+    If the queue is full, the policy determines what happens to new events:
+
+        * 'block': put() waits until there is space in the queue
+        * 'drop-oldest': the oldest event in the queue is dropped
+        * 'sample': once the queue is more than half full, only a fraction
+          of events (sample_rate) is queued, if full the new event is dropped
+
+    Usage::
+
+        flusher = BackgroundFlusher(writer, maxsize=10000, policy='drop-oldest')
+        flusher.put(event)
+        flusher.flush()  # wait for all events to be written
+        flusher.stats()  # counters
+
+    Notes:
+        * all flushers are flushed at interpreter exit
+        * use shared_flusher() to share one flusher, i.e. one background
+          thread, among all writers to the same dataset
+        * in a forked child process, the queue is reset and a new background
+          thread is started
+
+    .. versionadded:: NEXT
+    """
+    POLICIES = ('block', 'drop-oldest', 'sample')
+
+    def __init__(self, writer, maxsize=10000, policy='block', batchsize=100, interval=1.0, sample_rate=0.1):
+        assert policy in self.POLICIES, f'policy must be one of {self.POLICIES}, got {policy}'
+        self.writer = writer
+        self.maxsize = int(maxsize)
+        self.policy = policy
+        self.batchsize = int(batchsize)
+        self.interval = float(interval)
+        self.sample_rate = float(sample_rate)
+        self._lock = threading.Lock()
+        self._counts_lock = threading.Lock()
+        self._pid = None
+        self._thread = None
+        self._queue = None
+        self._stopped = threading.Event()
+        self._reset_counters()
+        _FLUSHERS.add(self)
+
+    def _reset_counters(self):
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def _count(self, enqueued=0, written=0, dropped=0, errors=0):
+        # put() is called from any thread, while _run() writes
+        with self._counts_lock:
+            self.enqueued += enqueued
+            self.written += written
+            self.dropped += dropped
+            self.errors += errors
+
+    def _ensure_started(self):
+        # start the background thread, restart in a forked child process
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self.maxsize)
+                self._reset_counters()
+                self._pid = os.getpid()
+                self._thread = None
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped.clear()
+                self._thread = threading.Thread(target=self._run, name='omegaml-tracking-flusher', daemon=True)
+                self._thread.start()
+
+    def put(self, event):
+        """ queue an event for writing, applying the backpressure policy """
+        self._ensure_started()
+        q = self._queue
+        if self.policy == 'block':
+            q.put(event)
+        elif self.policy == 'drop-oldest':
+            while True:
+                try:
+                    q.put_nowait(event)
+                    break
+                except queue.Full:
+                    self._drop_oldest(q)
+        elif self.policy == 'sample':
+            sampled_out = q.qsize() > self.maxsize // 2 and random.random() >= self.sample_rate
+            try:
+                if sampled_out:
+                    raise queue.Full
+                q.put_nowait(event)
+            except queue.Full:
+                self._count(dropped=1)
+                return
+        self._count(enqueued=1)
+
+    def _drop_oldest(self, q):
+        try:
+            q.get_nowait()
+        except queue.Empty:
+            return
+        q.task_done()
+        self._count(dropped=1)
+
+    def flush(self, timeout=None):
+        """ wait until all queued events are written
+
+        Args:
+            timeout (float): optional, maximum seconds to wait
+
+        Returns:
+            True if all events were written, False on timeout
+        """
+        if self._queue is None or self._pid != os.getpid():
+            return True
+        self._ensure_started()
+        if timeout is None:
+            self._queue.join()
+            return True
+        done = threading.Event()
+        waiter = threading.Thread(target=lambda: (self._queue.join(), done.set()), daemon=True)
+        waiter.start()
+        return done.wait(timeout)
+
+    def stop(self, timeout=None):
+        """ flush all events and stop the background thread """
+        flushed = self.flush(timeout=timeout)
+        self._stopped.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout=timeout)
+        self._thread = None
+        return flushed
+
+    def stats(self):
+        """ return counters
+
+        Returns:
+            dict of queued (events currently in queue), enqueued (total),
+            written, dropped, errors
+        """
+        with self._counts_lock:
+            return {
+                'queued': self._queue.qsize() if self._queue is not None else 0,
+                'enqueued': self.enqueued,
+                'written': self.written,
+                'dropped': self.dropped,
+                'errors': self.errors,
+            }
+
+    def _run(self):
+        q = self._queue
+        while not self._stopped.is_set():
+            try:
+                batch = [q.get(timeout=self.interval)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batchsize:
+                try:
+                    batch.append(q.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.writer(batch)
+                self._count(written=len(batch))
+            except Exception as e:
+                self._count(errors=1)
+                logger.error(f'could not write {len(batch)} tracking events due to {e}')
+            finally:
+                for _ in batch:
+                    q.task_done()
+
+
+def shared_flusher(key, writer, **options):
+    """ return the BackgroundFlusher of key, create it on first use
+
+    All callers of the same key share one flusher and its background thread,
+    e.g. every tracker instance of an experiment in a serving process. The
+    writer and options of the first call are used.
+
+    Args:
+        key (tuple): a hashable key, e.g. (store, dataset name)
+        writer (callable): the writer, called as writer(events). This should
+           not refer to the caller, as the flusher is kept for the lifetime of
+           the process
+        **options: kwargs to BackgroundFlusher
+
+    Returns:
+        BackgroundFlusher
+
+    .. versionadded:: NEXT
+    """
+    key = (key, tuple(sorted(options.items())))
+    with _SHARED_LOCK:
+        flusher = _SHARED.get(key)
+        if flusher is None:
+            flusher = _SHARED[key] = BackgroundFlusher(writer, **options)
+        return flusher
+
+
+@atexit.register
+def _flush_all():
+    for flusher in list(_FLUSHERS):
+        try:
+            flusher.stop(timeout=10)
+        except Exception as e:
+            logger.error(f'could not flush tracking events at exit due to {e}')
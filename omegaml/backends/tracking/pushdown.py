@@ -0,0 +1,166 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from omegaml.backends.monitoring.sketches import QuantileDigest
+from omegaml.mongoshim import server_version
+from omegaml.store.filtered import FilteredCollection
+from omegaml.util import signature
+
+logger = logging.getLogger(__name__)
+
+
+class StatisticsPushdown:
+    """ calculate ExperimentStatistics by MongoDB aggregation
+
+    Instead of reading all events into pandas, the statistics are calculated
+    by the database. Percentiles of metrics use $percentile on MongoDB >= 7.0.
+    For earlier versions, metric percentiles are calculated by streaming the
+    values into a t-digest (exact for up to exact_limit values per group).
+    Latency, throughput and utilization are calculated per group by the
+    database (i.e. one value per run or time slot), and described by pandas.
+
+    All methods return a DataFrame in the same format as the corresponding
+    ExperimentStatistics method, or None if the tracker's data cannot be
+    aggregated.
+
+    .. versionadded:: NEXT
+    """
+    exact_limit = 10000
+
+    def __init__(self, tracker):
+        self.tracker = tracker
+
+    def collection(self, **kwargs):
+        """ return the FilteredCollection for the given exp.data() filter arguments, or None """
+        tracker = self.tracker
+        if not hasattr(tracker, '_data_filter'):
+            return None
+        tracker.flush()
+        filter = tracker._data_filter(**kwargs)
+        collection = tracker._store.collection(tracker._data_name)
+        return FilteredCollection(collection, query=filter, trusted=signature(filter))
+
+    def metrics(self, groupby, percentiles=None, **kwargs):
+        coll = self.collection(**kwargs)
+        if coll is None:
+            return None
+        labels, probs = self._percentile_labels(percentiles)
+        group_id = {col: f'$data.{col}' for col in groupby}
+        stats = {
+            'count': {'$sum': 1},
+            'mean': {'$avg': '$data.value'},
+            'std': {'$stdDevSamp': '$data.value'},
+            'min': {'$min': '$data.value'},
+            'max': {'$max': '$data.value'},
+        }
+        use_percentile = server_version(coll) >= (7, 0)
+        if use_percentile:
+            stats['percentiles'] = {'$percentile': {'input': '$data.value', 'p': probs, 'method': 'approximate'}}
+        pipeline = [
+            {'$match': {'data.value': {'$type': 'number'}}},
+            {'$group': {'_id': group_id, **stats}},
+        ]
+        rows = list(coll.aggregate(pipeline))
+        if not rows:
+            return None
+        quantiles = (self._digest_quantiles(coll, groupby, probs) if not use_percentile
+                     else {self._group_key(row['_id'], groupby): row['percentiles'] for row in rows})
+        records = []
+        for row in rows:
+            key = self._group_key(row['_id'], groupby)
+            record = dict(zip(groupby, key))
+            record.update({k: row[k] for k in ('count', 'mean', 'std', 'min', 'max')})
+            record.update(zip(labels, quantiles[key]))
+            records.append(record)
+        columns = ['count', 'mean', 'std', 'min'] + labels + ['max']
+        df = pd.DataFrame.from_records(records).set_index(groupby).sort_index()
+        return df[columns].astype(float)
+
+    def group_durations(self, groupby, **kwargs):
+        """ return the duration in seconds between the first and last event of each group """
+        coll = self.collection(**kwargs)
+        if coll is None:
+            return None
+        pipeline = [
+            {'$group': {'_id': f'$data.{groupby}',
+                        'first': {'$min': '$data.dt'},
+                        'last': {'$max': '$data.dt'}}},
+            {'$project': {'duration': {'$divide': [{'$subtract': ['$last', '$first']}, 1000]}}},
+        ]
+        rows = list(coll.aggregate(pipeline))
+        if not rows:
+            return None
+        durations = pd.Series({row['_id']: row['duration'] for row in rows}, dtype=float).sort_index()
+        durations.index.name = groupby
+        return durations
+
+    def slot_throughput(self, tp_unit, **kwargs):
+        """ return the effective throughput of events in equal time slots
+
+        Same as ExperimentStatistics.utilization, the events are cut into equal-width
+        time slots, where the number of slots is 10% of the number of events. Requires
+        MongoDB >= 5.0 ($setWindowFields). Returns the throughput for each non-empty slot.
+        """
+        coll = self.collection(**kwargs)
+        if coll is None or server_version(coll) < (5, 0):
+            return None
+        unbounded = {'documents': ['unbounded', 'unbounded']}
+        pipeline = [
+            {'$setWindowFields': {'output': {
+                'first': {'$min': '$data.dt', 'window': unbounded},
+                'last': {'$max': '$data.dt', 'window': unbounded},
+                'n': {'$count': {}, 'window': unbounded},
+            }}},
+            {'$project': {
+                'dt': '$data.dt',
+                'slots': {'$ceil': {'$multiply': ['$n', .1]}},
+                'pos': {'$divide': [{'$subtract': ['$data.dt', '$first']},
+                                    {'$max': [{'$subtract': ['$last', '$first']}, 1]}]},
+            }},
+            {'$group': {
+                '_id': {'$min': [{'$floor': {'$multiply': ['$pos', '$slots']}}, {'$subtract': ['$slots', 1]}]},
+                'count': {'$sum': 1},
+                'first': {'$min': '$dt'},
+                'last': {'$max': '$dt'},
+            }},
+            {'$project': {
+                'throughput': {'$divide': [
+                    {'$floor': {'$divide': ['$count', 2]}},
+                    {'$max': [{'$multiply': [{'$divide': [{'$subtract': ['$last', '$first']}, 1000]}, tp_unit]},
+                              1]}]},
+            }},
+        ]
+        rows = list(coll.aggregate(pipeline))
+        return pd.Series([row['throughput'] for row in rows], dtype=float) if rows else None
+
+    def _digest_quantiles(self, coll, groupby, probs):
+        # stream the values of each group, calculate exact quantiles for small groups, else use a t-digest
+        projection = {f'data.{col}': 1 for col in groupby + ['value']}
+        values, digests = {}, {}
+        cursor = coll.find({'data.value': {'$type': 'number'}}, projection=projection)
+        for doc in cursor:
+            data = doc.get('data', {})
+            key = tuple(data.get(col) for col in groupby)
+            group = values.setdefault(key, [])
+            group.append(data['value'])
+            if len(group) >= self.exact_limit:
+                digests.setdefault(key, QuantileDigest()).update(group)
+                group.clear()
+        quantiles = {}
+        for key, group in values.items():
+            if key in digests:
+                quantiles[key] = digests[key].update(group).quantile(probs)
+            else:
+                quantiles[key] = np.quantile(group, probs)
+        return quantiles
+
+    def _group_key(self, group_id, groupby):
+        return tuple((group_id or {}).get(col) for col in groupby)
+
+    def _percentile_labels(self, percentiles):
+        # the percentile labels and probabilities, same as pd.Series.describe()
+        probs = sorted(set(percentiles if percentiles is not None else [.25, .5, .75]) | {.5})
+        labels = list(pd.Series([0.0]).describe(percentiles=probs).index)[4:-1]
+        return labels, probs
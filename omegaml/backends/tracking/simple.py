@@ -8,8 +8,11 @@ import pymongo
 import warnings
 from base64 import b64encode, b64decode
 from datetime import date
+from functools import partial
 from itertools import chain
+from omegaml import settings
 from omegaml.backends.tracking.base import TrackingProvider
+from omegaml.backends.tracking.flusher import shared_flusher
 from omegaml.documents import Metadata
 from omegaml.util import _raise, ensure_index, batched, signature, tryOr, ensurelist
 from typing import Iterable
@@ -59,25 +62,50 @@ class OmegaSimpleTracker(TrackingProvider):
             ...
             exp.log_metric('accuracy', .78)
 
+    Asynchronous logging::
+
+        # events are written by a background thread, shared by all
+        # instances of the experiment in this process
+        with om.runtime.experiment('myexp', async_flush=True) as exp:
+            ...
+
+        # specify the queue size and backpressure policy, see BackgroundFlusher
+        om.runtime.experiment('myexp', async_flush={'maxsize': 1000, 'policy': 'drop-oldest'})
+
+        # get counters of queued, written and dropped events
+        exp.flush_stats()
+
     .. versionchanged:: 0.17
         any extra
 
+    .. versionchanged:: NEXT
+        async_flush enables writing events in a background thread, defaults
+        to om.defaults.OMEGA_TRACKING_ASYNC
     """
     _provider = 'simple'
     _experiment = None
     _startdt = None
     _stopdt = None
     _autotrack = False
+    _async_flush = None
+    _flusher = None
 
     _ensure_active = lambda self, r: r if r is not None else _raise(
         ValueError('no active run, call .start() or .use() '))
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, async_flush=None, **kwargs):
         super().__init__(*args, **kwargs)
         self.log_buffer = []
         self.max_buffer = 10
+        self._async_flush = async_flush
         self._initialize_dataset()
 
+    def __getstate__(self):
+        # the background flusher is local to the process
+        state = dict(self.__dict__)
+        state.pop('_flusher', None)
+        return state
+
     def active_run(self, run=None):
         """ set the lastest run as the active run
 
@@ -166,6 +194,40 @@ class OmegaSimpleTracker(TrackingProvider):
             self._store.put(self.log_buffer, self._data_name,
                             noversion=True, as_many=True)
             self.log_buffer.clear()
+        if self._flusher is not None:
+            # wait for the background flusher to write all events
+            self._flusher.flush()
+
+    def flush_stats(self):
+        """ return the counters of the background flusher
+
+        Returns:
+            dict of queued, enqueued, written, dropped, errors, see BackgroundFlusher.stats().
+            If async_flush is not enabled, returns the number of events queued in the log buffer
+
+        .. versionadded:: NEXT
+        """
+        if self._flusher is not None:
+            return self._flusher.stats()
+        return {'queued': len(self.log_buffer)}
+
+    def _async_flusher(self):
+        # get the background flusher if async_flush is enabled, else None
+        if self._flusher is None:
+            defaults = getattr(self._store, 'defaults', None) or settings()
+            options = dict(getattr(defaults, 'OMEGA_TRACKING_ASYNC', None) or {})
+            if isinstance(self._async_flush, dict):
+                options.update(self._async_flush, enabled=True)
+            elif self._async_flush is not None:
+                options['enabled'] = bool(self._async_flush)
+            if not options.pop('enabled', False):
+                return None
+            # all trackers of the experiment in this process share one flusher
+            # -- the writer must not refer to self, the flusher outlives the tracker
+            store = self._store
+            key = (store.mongo_url, store.bucket, store.prefix, self._data_name)
+            self._flusher = shared_flusher(key, partial(_write_events, store, self._data_name), **options)
+        return self._flusher
 
     def clear(self, force=False):
         """ clear all data
@@ -219,6 +281,11 @@ class OmegaSimpleTracker(TrackingProvider):
         return data
 
     def _write_log(self, data, immediate=False):
+        flusher = self._async_flusher()
+        if flusher is not None:
+            flusher.put(data)
+            flusher.flush() if immediate else None
+            return
         self.log_buffer.append(data)
         if immediate or len(self.log_buffer) > self.max_buffer:
             self.flush()
@@ -449,28 +516,10 @@ class OmegaSimpleTracker(TrackingProvider):
         .. versionchanged:: 0.17
             enabled data(run=, start=, end=, since=), accepting range queries on run, dt and event#
         """
-        from functools import cache
-        experiment = experiment or self._experiment
         # -- flush all buffers before querying
         self.flush()
-        # -- build filter
-        if since is None:
-            run = run if run is not None else self._run
-            run = ensurelist(run) if not isinstance(run, str) and isinstance(run, Iterable) else run
-            # actual run
-            # -- run is 1-indexed, so we need to adjust for -1 indexing
-            #    e.g. -1 means the latest run, -2 the run before that
-            #    e.g. latest_run = 5, run=-1 means 5, run=-2 means 4 etc.
-            # -- run can be a list, in which case we adjust run < 0 for each element
-            # -- run can never be less than 1 (1-indexed), even if run << 0
-            last_run = cache(
-                lambda: int(self._latest_run or 0))  # PERF/consistency: memoize the last run per each .data() call
-            relative_run = lambda r: max(1, 1 + last_run() + r)
-            if isinstance(run, list) and any(r < 0 for r in run):
-                run = [(r if r >= 0 else relative_run(r)) for r in run]
-            elif isinstance(run, int) and run < 0:
-                run = relative_run(run)
-        filter = self._build_data_filter(experiment, run, event, step, key, since, end, extra)
+        filter = self._data_filter(experiment=experiment, run=run, event=event, step=step, key=key,
+                                   since=since, end=end, **extra)
 
         def read_data(cursor):
             data = pd.DataFrame.from_records(cursor)
@@ -504,6 +553,30 @@ class OmegaSimpleTracker(TrackingProvider):
             data = read_data(data) if data is not None and not lazy and not raw else data
         return data
 
+    def _data_filter(self, experiment=None, run=None, event=None, step=None, key=None, since=None, end=None,
+                     **extra):
+        # build the filter for data(), resolving relative runs
+        from functools import cache
+        experiment = experiment or self._experiment
+        # -- build filter
+        if since is None:
+            run = run if run is not None else self._run
+            run = ensurelist(run) if not isinstance(run, str) and isinstance(run, Iterable) else run
+            # actual run
+            # -- run is 1-indexed, so we need to adjust for -1 indexing
+            #    e.g. -1 means the latest run, -2 the run before that
+            #    e.g. latest_run = 5, run=-1 means 5, run=-2 means 4 etc.
+            # -- run can be a list, in which case we adjust run < 0 for each element
+            # -- run can never be less than 1 (1-indexed), even if run << 0
+            last_run = cache(
+                lambda: int(self._latest_run or 0))  # PERF/consistency: memoize the last run per each .data() call
+            relative_run = lambda r: max(1, 1 + last_run() + r)
+            if isinstance(run, list) and any(r < 0 for r in run):
+                run = [(r if r >= 0 else relative_run(r)) for r in run]
+            elif isinstance(run, int) and run < 0:
+                run = relative_run(run)
+        return self._build_data_filter(experiment, run, event, step, key, since, end, extra)
+
     def _build_data_filter(self, experiment, run, event, step, key, since, end, extra):
         # build a filter for the data query, suitable for OmegaStore.get()
         filter = {}
@@ -745,3 +818,7 @@ def dtrelative(delta, now=None, as_delta=False):
     else:
         raise ValueError(error_msg)
     return now + dtdelta if not as_delta else dtdelta
+
+
+def _write_events(store, name, events):
+    store.put(events, name, noversion=True, as_many=True)
@@ -1,10 +1,25 @@
+import logging
 import math
 import pandas as pd
 
+from omegaml.backends.tracking.pushdown import StatisticsPushdown
 from omegaml.util import tryOr
 
+logger = logging.getLogger(__name__)
+
 
 class ExperimentStatistics:
+    """ statistics of experiment data
+
+    By default, statistics are calculated by the database using aggregation
+    pipelines, see StatisticsPushdown. Set ``options.pushdown = False`` to
+    calculate statistics from batches of data in pandas.
+
+    .. versionchanged:: NEXT
+        statistics are calculated by the database, percentiles are calculated
+        across all events instead of per batch
+    """
+
     class options:
         time_events = ['start', 'stop']
         tp_unit = 60
@@ -12,9 +27,11 @@ class ExperimentStatistics:
         time_key = 'latency'
         percentiles = [.25, .5, .75]  # same default as pandas.DataFrame.describe()
         batchsize = 10000
+        pushdown = True
 
     def __init__(self, tracker):
         self.tracker = tracker
+        self.pushdown = StatisticsPushdown(tracker)
 
     def __repr__(self):
         return f"{self.__class__.__name__}({self.tracker})"
@@ -22,6 +39,16 @@ class ExperimentStatistics:
     def data(self, **kwargs):
         return self.tracker.data(**kwargs)
 
+    def _pushdown(self, method, *args, **kwargs):
+        # call StatisticsPushdown.<method>, return None if not enabled or not possible
+        if not self.options.pushdown:
+            return None
+        try:
+            return getattr(self.pushdown, method)(*args, **kwargs)
+        except Exception as e:
+            logger.debug(f'could not calculate {method} by aggregation due to {e}, using pandas')
+            return None
+
     def align_index(self, df, key=None):
         """ align the index of statistics DataFrames to event/key """
         df['event'] = 'metric'
@@ -99,6 +126,9 @@ class ExperimentStatistics:
         event = event or 'metric'
         groupby = [groupby or self.options.groupby] if groupby not in (0, '', -1) else []
         groups = dict.fromkeys(groupby + ['event', 'key'])
+        metrics = self._pushdown('metrics', list(groups), percentiles=percentiles, event=event, **kwargs)
+        if metrics is not None:
+            return metrics
 
         def stats(data):
             metrics = (data
@@ -146,6 +176,15 @@ class ExperimentStatistics:
         time_key = time_key or self.options.time_key
         time_events = time_events or self.options.time_events
         percentiles = None if not percentiles else (percentiles or self.options.percentiles)
+        durations = self._pushdown('group_durations', groupby, event=time_events,
+                                   **kwargs) if percentiles and not delta else None
+        if durations is not None:
+            duration = (durations
+                        .describe(percentiles=None if percentiles is True else percentiles)
+                        .to_frame()
+                        .T)
+            self.align_index(duration, time_key)
+            return duration
 
         def stats(time_data):
             if delta:
@@ -203,6 +242,14 @@ class ExperimentStatistics:
         time_key = time_key or self.options.time_key
         groupby = groupby or self.options.groupby
         tp_unit = tp_unit or self.options.tp_unit
+        durations = self._pushdown('group_durations', groupby, event=time_events, **kwargs)
+        if durations is not None:
+            throughput = ((tp_unit / durations.clip(lower=1))
+                          .describe(percentiles=percentiles)
+                          .to_frame()
+                          .T)
+            self.align_index(throughput, f'group_{time_key}')
+            return throughput
 
         def stats(time_data):
             throughput = (time_data
@@ -288,15 +335,18 @@ class ExperimentStatistics:
 
         tp_unit = tp_unit or self.options.tp_unit
         time_events = time_events or self.options.time_events
-        time_data = self.data(event=time_events, **kwargs)
-        time_slots = math.ceil(len(time_data) * .1)
-        bins = pd.cut(time_data['dt'], bins=time_slots)
         throughput = self.throughput(tp_unit=tp_unit, time_events=time_events, **kwargs)
-        throughput_eff = (time_data
-                          .groupby(bins, observed=False)
-                          .apply(lambda v: ((len(v) // 2) / max((v['dt'].max() - v['dt'].min())
-                                                                .total_seconds() * tp_unit, 1))
-                                 )
+        slot_throughput = self._pushdown('slot_throughput', tp_unit, event=time_events, **kwargs)
+        if slot_throughput is None:
+            time_data = self.data(event=time_events, **kwargs)
+            time_slots = math.ceil(len(time_data) * .1)
+            bins = pd.cut(time_data['dt'], bins=time_slots)
+            slot_throughput = (time_data
+                               .groupby(bins, observed=False)
+                               .apply(lambda v: ((len(v) // 2) / max((v['dt'].max() - v['dt'].min())
+                                                                     .total_seconds() * tp_unit, 1))
+                                      ))
+        throughput_eff = (slot_throughput
                           .describe(percentiles=percentiles)
                           .to_frame()
                           .T)
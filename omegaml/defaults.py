@@ -50,6 +50,8 @@ OMEGA_MONGO_SSL_KWARGS = {
     'connectTimeoutMS': OMEGA_MONGO_TIMEOUT,  # since 4.10
     'serverSelectionTimeoutMS': OMEGA_MONGO_TIMEOUT,
 }
+#: share MongoClients among Omega instances with the same host, credentials and kwargs
+OMEGA_MONGO_SHARED_CLIENTS = truefalse(os.environ.get('OMEGA_MONGO_SHARED_CLIENTS', True))
 #: if set forces eager execution of runtime tasks
 OMEGA_LOCAL_RUNTIME = truefalse(os.environ.get('OMEGA_LOCAL_RUNTIME', False))
 #: the celery broker name or URL
@@ -132,6 +134,7 @@ OMEGA_STORE_BACKENDS = {
     'script.ipynb': 'omegaml.notebook.jobs.NotebookBackend',
     'oci.registry': 'omegaml.backends.repository.OCIRegistryBackend',
     'python.model': 'omegaml.backends.genericmodel.GenericModelBackend',
+    'pandas.dfcolumnar': 'omegaml.backends.dfcolumnar.PandasColumnarBackend',
     # must be last backend listed as a catch-call
     'core.object': 'omegaml.backends.coreobjects.CoreObjectsBackend',
 }
@@ -174,6 +177,7 @@ if is_test_run:
 OMEGA_DISABLE_FRAMEWORKS = truefalse(os.environ.get('OMEGA_DISABLE_FRAMEWORKS'))
 #: storage mixins
 OMEGA_STORE_MIXINS = [
+    'omegaml.mixins.store.metacache.MetadataCacheMixin',
     'omegaml.mixins.store.ProjectedMixin',
     'omegaml.mixins.store.LazyGetMixin',
     'omegaml.mixins.store.virtualobj.VirtualObjectMixin',
@@ -200,6 +204,13 @@ OMEGA_STORE_MIXINS = [
 OMEGA_STORE_HASHEDNAMES = truefalse(os.environ.get('OMEGA_STORE_HASHEDNAMES', True))
 #: enable request caching for metadata
 OMEGA_STORE_CACHE = truefalse(os.environ.get('OMEGA_STORE_CACHE', False))
+#: process-level metadata cache, ttl in seconds, watch invalidates by a change stream (requires a replica set)
+OMEGA_METADATA_CACHE = {
+    'enabled': truefalse(os.environ.get('OMEGA_METADATA_CACHE', False)),
+    'ttl': int(os.environ.get('OMEGA_METADATA_CACHE_TTL', 30)),
+    'maxsize': 10000,
+    'watch': truefalse(os.environ.get('OMEGA_METADATA_CACHE_WATCH', False)),
+}
 #: runtimes mixins
 OMEGA_RUNTIME_MIXINS = [
     'omegaml.runtimes.mixins.ModelMixin',
@@ -246,6 +257,16 @@ OMEGA_TRACKING_PROVIDERS = {
     'profiling': 'omegaml.backends.tracking.OmegaProfilingTracker',
     'notrack': 'omegaml.backends.tracking.NoTrackTracker',
 }
+#: asynchronous tracking, see OmegaSimpleTracker(async_flush=) and BackgroundFlusher
+#: .. versionadded:: NEXT
+OMEGA_TRACKING_ASYNC = {
+    'enabled': truefalse(os.environ.get('OMEGA_TRACKING_ASYNC', False)),
+    'maxsize': 10000,
+    'policy': 'block',
+    'batchsize': 100,
+    'interval': 1.0,
+    'sample_rate': 0.1,
+}
 #: monitoring providers
 OMEGA_MONITORING_PROVIDERS = {
     'models': 'omegaml.backends.monitoring.ModelDriftMonitor',
@@ -261,6 +282,95 @@ OMEGA_SESSION_CACHE = {
     'maxsize': 5,  # max sessions cached
     'ttl': 60 * 30,  # keep it for 30 minutes
 }
+#: runtime model cache, keeps deserialized models in worker memory for inference
+#: (maxbytes is the max. total size of cached models, as serialized)
+OMEGA_MODEL_CACHE = {
+    'enabled': truefalse(os.environ.get('OMEGA_MODEL_CACHE_ENABLED', False)),
+    'maxbytes': int(os.environ.get('OMEGA_MODEL_CACHE_MAXBYTES', 1024 ** 3)),
+}
+#: micro-batching of concurrent REST API predict requests per model
+#: (window is the max. time in seconds to collect requests, max_batch_size the max. rows per batch)
+OMEGA_PREDICT_BATCHING = {
+    'enabled': truefalse(os.environ.get('OMEGA_PREDICT_BATCHING_ENABLED', False)),
+    'window': float(os.environ.get('OMEGA_PREDICT_BATCHING_WINDOW', 0.01)),
+    'max_batch_size': int(os.environ.get('OMEGA_PREDICT_BATCHING_MAXSIZE', 1024)),
+}
+#: models to preload into the model cache on worker start (list of names or patterns)
+OMEGA_MODEL_PRELOAD = [v for v in os.environ.get('OMEGA_MODEL_PRELOAD', '').split(',') if v]
+#: parallel cursors to read pandas.dfrows datasets by om.datasets.get()
+#: (n_jobs is the number of cursors, 1 to disable, for datasets of at least min_rows)
+OMEGA_DATAFRAME_READERS = {
+    'n_jobs': int(os.environ.get('OMEGA_DATAFRAME_READERS', 4)),
+    'min_rows': 100000,
+    'chunksize': 50000,
+}
+#: dataset revisions, store a snapshot every snapshot_interval revisions or snapshot_rows changed rows
+OMEGA_DATA_REVISIONS = {
+    'snapshot_interval': 10,
+    'snapshot_rows': 100000,
+    'upsert_chunksize': 1000,
+}
+#: om.datasets.read_csv() writer threads (n_jobs, 1 to disable) and max. number of parsed chunks queued
+OMEGA_READ_CSV = {
+    'n_jobs': int(os.environ.get('OMEGA_READ_CSV_JOBS', 4)),
+    'queue_size': 8,
+}
+#: copy_from_sql settings (partitions is the default number of ranges read concurrently if partition_column is given)
+OMEGA_SQL_COPY = {
+    'partitions': 4,
+    'writers': int(os.environ.get('OMEGA_SQL_COPY_WRITERS', 4)),
+    'queue_size': 8,
+}
+#: pool of Omega instances used by the REST API, by bucket and user (ttl is the max. idle time in seconds)
+OMEGA_RESTAPI_POOL = {
+    'enabled': truefalse(os.environ.get('OMEGA_RESTAPI_POOL_ENABLED', True)),
+    'maxsize': int(os.environ.get('OMEGA_RESTAPI_POOL_MAXSIZE', 32)),
+    'ttl': int(os.environ.get('OMEGA_RESTAPI_POOL_TTL', 60 * 5)),
+}
+#: local disk cache of ndarray.bin datasets, get() returns a read-only memory map of the cached file
+#: (maxbytes is the max. total size of cached files, least recently used files are removed first)
+OMEGA_NDARRAY_CACHE = {
+    'enabled': truefalse(os.environ.get('OMEGA_NDARRAY_CACHE_ENABLED', False)),
+    'path': os.environ.get('OMEGA_NDARRAY_CACHE_PATH', os.path.join(OMEGA_TMP, 'omegaml', 'ndarray')),
+    'maxbytes': int(os.environ.get('OMEGA_NDARRAY_CACHE_MAXBYTES', 10 * 1024 ** 3)),
+}
+#: MDataFrame apply cache, ttl in seconds since last access, maxbytes per database
+OMEGA_APPLY_CACHE = {
+    'ttl': int(os.environ.get('OMEGA_APPLY_CACHE_TTL', 24 * 60 * 60)),
+    'maxbytes': int(os.environ.get('OMEGA_APPLY_CACHE_MAXBYTES', 1024 ** 3)),
+    'sweep_interval': int(os.environ.get('OMEGA_APPLY_CACHE_SWEEP_INTERVAL', 5 * 60)),
+}
+#: genai DocumentIndex.build() pipeline (n_jobs processes convert and chunk documents,
+#: chunks are embedded in batches of batch_size with up to in_flight concurrent calls)
+OMEGA_DOCUMENT_PIPELINE = {
+    'n_jobs': int(os.environ.get('OMEGA_DOCUMENT_PIPELINE_JOBS', 4)),
+    'batch_size': int(os.environ.get('OMEGA_DOCUMENT_PIPELINE_BATCHSIZE', 64)),
+    'in_flight': int(os.environ.get('OMEGA_DOCUMENT_PIPELINE_INFLIGHT', 4)),
+    'queue_size': 16,
+}
+#: genai conversation cache, keeps the history of recent TextModel.chat() conversations in memory
+#: (maxsize is the max. number of conversations, ttl the max. idle time in seconds)
+OMEGA_CONVERSATION_CACHE = {
+    'enabled': truefalse(os.environ.get('OMEGA_CONVERSATION_CACHE_ENABLED', False)),
+    'maxsize': int(os.environ.get('OMEGA_CONVERSATION_CACHE_MAXSIZE', 1000)),
+    'ttl': int(os.environ.get('OMEGA_CONVERSATION_CACHE_TTL', 10 * 60)),
+}
+#: genai embedding cache, keeps embeddings of TextModel.embed() in the data store's database
+#: (maxbytes is the max. total size of cached embeddings)
+OMEGA_EMBEDDING_CACHE = {
+    'enabled': truefalse(os.environ.get('OMEGA_EMBEDDING_CACHE_ENABLED', False)),
+    'maxbytes': int(os.environ.get('OMEGA_EMBEDDING_CACHE_MAXBYTES', 1024 ** 3)),
+    'sweep_interval': int(os.environ.get('OMEGA_EMBEDDING_CACHE_SWEEP_INTERVAL', 5 * 60)),
+}
+#: genai pgvector indexes by distance metric (method is hnsw or ivfflat, with build parameters
+#: m, ef_construction or lists, and search parameters ef_search or probes), batch_size is the
+#: number of rows per insert statement
+OMEGA_PGVECTOR = {
+    'indexes': {
+        'l2': {'method': 'hnsw', 'm': 16, 'ef_construction': 64},
+    },
+    'batch_size': int(os.environ.get('OMEGA_PGVECTOR_BATCHSIZE', 1000)),
+}
 #: allow overrides from local env upon retrieving config from hub (disable in workers)
 OMEGA_ALLOW_ENV_CONFIG = truefalse(os.environ.get('OMEGA_ALLOW_ENV_CONFIG', '1'))
 #: dashboard cards
@@ -5,7 +5,7 @@ import datetime
 from mongoengine.base.fields import ObjectIdField
 from mongoengine.document import Document
 from mongoengine.fields import (
-    StringField, FileField, DictField, DateTimeField
+    StringField, FileField, DictField, DateTimeField, IntField
 )
 from mongoengine.pymongo_support import LEGACY_JSON_OPTIONS
 from pymongo.errors import OperationFailure
@@ -115,7 +115,14 @@ def make_Metadata(db_alias='omega', collection=None):
         def save(self, *args, **kwargs):
             assert self.name is not None, "a dataset name is needed before saving"
             self.modified = datetime.datetime.now()
-            return super(Metadata_base, self).save(*args, **kwargs)
+            result = super(Metadata_base, self).save(*args, **kwargs)
+            _invalidate_cached(self)
+            return result
+
+        def delete(self, *args, **kwargs):
+            result = super(Metadata_base, self).delete(*args, **kwargs)
+            _invalidate_cached(self)
+            return result
 
         def to_json(self, **kwargs):
             kwargs['json_options'] = kwargs.get('json_options',
@@ -137,11 +144,25 @@ def make_Metadata(db_alias='omega', collection=None):
     return Metadata
 
 
+def _invalidate_cached(meta):
+    # write-through invalidation of the process-level metadata cache, if any
+    from omegaml.store.metacache import MetadataCache
+    cache = MetadataCache.active()
+    cache.invalidate_document(meta) if cache is not None else None
+
+
 def make_QueryCache(db_alias='omega'):
     class QueryCache(Document):
         collection = StringField()
         key = StringField()
         value = DictField()
+        #: the version of the source collection, see ApplyCache.source_version()
+        version = StringField()
+        #: size of the result collection in bytes
+        size = IntField(default=0)
+        hits = IntField(default=0)
+        created = DateTimeField(default=datetime.datetime.now)
+        accessed = DateTimeField(default=datetime.datetime.now)
         meta = {
             'db_alias': db_alias,
             'indexes': [
@@ -952,8 +952,9 @@ class MDataFrame(object):
         """
         effective_filter = dict(self.filter_criteria)
         filter_criteria = self._get_filter_criteria(*args, **kwargs)
-        if '$and' in effective_filter:
-            effective_filter['$and'].extend(filter_criteria.get('$and'))
+        if '$and' in effective_filter and '$and' in filter_criteria:
+            # do not modify the list in self.filter_criteria
+            effective_filter['$and'] = effective_filter['$and'] + filter_criteria['$and']
         else:
             effective_filter.update(filter_criteria)
         coll = FilteredCollection(self.collection, query=effective_filter)
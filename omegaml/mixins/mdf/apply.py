@@ -1,5 +1,7 @@
+import datetime
 import hashlib
 import json
+import time
 from itertools import product
 from uuid import uuid4
 
@@ -7,9 +9,10 @@ import pandas as pd
 
 from omegaml.documents import make_QueryCache
 from omegaml.mdataframe import MDataFrame, MSeries
+from omegaml.mongoshim import server_version
 from omegaml.store import qops
 from omegaml.store.filtered import FilteredCollection
-from omegaml.util import make_tuple, extend_instance
+from omegaml.util import make_tuple, extend_instance, grouper, CacheCounters
 
 
 class ApplyMixin(object):
@@ -66,13 +69,13 @@ class ApplyMixin(object):
             the cache for the specific .apply operations
         :return:
         """
-        QueryCache = make_QueryCache(db_alias=self._db_alias)
+        cache = self.cache or ApplyCache(self._db_alias)
         if full:
-            QueryCache.objects.filter(value__collection=self.collection.name).delete()
+            cache.delete(collection=self.collection.name)
         else:
             pipeline = self._build_pipeline()
             key = self._make_cache_key(self.collection, pipeline)
-            QueryCache.objects.filter(key=key).delete()
+            cache.delete(key=key)
         return self
 
     def _make_cache_key(self, collection, pipeline):
@@ -122,7 +125,7 @@ class ApplyMixin(object):
         # generate a cache key
         pipeline = self._build_pipeline()
         key = self._make_cache_key(self.collection, pipeline)
-        outname = 'cache_{}'.format(uuid4().hex)
+        outname = ApplyCache.result_name()
         value = {
             'collection': self.collection.name,
             'result': outname,
@@ -137,7 +140,7 @@ class ApplyMixin(object):
         for v in cursor:
             pass
         # set cache
-        self.cache.set(key, value)
+        self.cache.set(key, value, source=self.collection)
         return key
 
     def set_index(self, columns):
@@ -208,7 +211,7 @@ class ApplyMixin(object):
         pipeline = pipeline or self._build_pipeline()
         if use_cache and self.cache:
             key = self._make_cache_key(self.collection, pipeline)
-            entry = self.cache.get(key)
+            entry = self.cache.get(key, source=self.collection)
             if entry is not None:
                 # read result
                 outname = entry.value['result']
@@ -779,32 +782,246 @@ class ApplyAccumulators(object):
 class ApplyCache(object):
     """
     A Cache that works on collections and pipelines
+
+    Each entry refers to a result collection (cache_<timestamp>_<uuid>) that
+    holds the result of a pipeline on a source collection. Entries are
+    managed as follows:
+
+    * an entry is valid as long as its source collection has not changed,
+      that is the number of documents and the most recent _id are the same
+      as when the entry was created, see source_version(). In-place updates
+      of documents are not detected, use mdf.reset_cache() in this case
+    * an entry expires ttl seconds after it was last accessed
+    * the total size of result collections in a database is limited to
+      maxbytes, least recently used entries are removed first
+    * result collections without an entry (orphans) are dropped
+
+    Stale and expired entries are removed on access, the size budget
+    and orphans are enforced by sweep(), which is called on persist()
+    at most every sweep_interval seconds.
+
+    Configure in config.yml or om.defaults::
+
+        OMEGA_APPLY_CACHE:
+            ttl: 86400
+            maxbytes: 1073741824
+            sweep_interval: 300
+
+    Usage::
+
+        om.datasets.apply_cache.stats()
+        om.datasets.apply_cache.sweep()
+
+    .. versionchanged:: NEXT
+        entries are invalidated if the source collection changes, expire
+        after ttl, and are limited to maxbytes. Result collections are
+        dropped when their entry is removed.
     """
+    #: minimum age of orphaned result collections before they are dropped,
+    #: to avoid dropping the result of a persist() in progress
+    orphan_grace = 60 * 60
 
-    def __init__(self, db_alias):
+    def __init__(self, db_alias, ttl=None, maxbytes=None, sweep_interval=None):
         self._db_alias = db_alias
+        settings = self._settings()
+        self.ttl = ttl if ttl is not None else settings.get('ttl')
+        self.maxbytes = maxbytes if maxbytes is not None else settings.get('maxbytes')
+        self.sweep_interval = sweep_interval if sweep_interval is not None else settings.get('sweep_interval', 300)
 
-    def set(self, key, value):
-        # https://stackoverflow.com/a/22003440/890242
-        QueryCache = make_QueryCache(self._db_alias)
-        QueryCache.objects(key=key).update_one(set__key="{}".format(key),
-                                               set__value=value, upsert=True)
+    def _settings(self):
+        from omegaml import settings
+        return getattr(settings(), 'OMEGA_APPLY_CACHE', None) or {}
 
-    def get(self, key):
-        QueryCache = make_QueryCache(self._db_alias)
+    @property
+    def _QueryCache(self):
+        return make_QueryCache(self._db_alias)
+
+    @property
+    def db(self):
+        from mongoengine.connection import get_db
+        return get_db(self._db_alias)
+
+    @classmethod
+    def result_name(cls):
+        """ return a new result collection name """
+        return 'cache_{}_{}'.format(int(time.time()), uuid4().hex)
+
+    def source_version(self, collection):
+        """ return the version of the source collection, as count:latest _id """
+        if collection is None:
+            return None
+        latest = collection.find_one(sort=[('_id', -1)], projection={'_id': 1}) or {}
+        return '{}:{}'.format(collection.estimated_document_count(), latest.get('_id'))
+
+    def set(self, key, value, source=None):
+        # https://stackoverflow.com/a/22003440/890242
+        now = datetime.datetime.now()
+        result = value.get('result')
+        size = self._collection_size(result) if result else 0
+        self._QueryCache.objects(key=key).update_one(set__key="{}".format(key),
+                                                     set__value=value,
+                                                     set__collection=value.get('collection'),
+                                                     set__version=self.source_version(source),
+                                                     set__size=size,
+                                                     set__hits=0,
+                                                     set__created=now,
+                                                     set__accessed=now,
+                                                     upsert=True)
+        self.sweep()
+
+    def get(self, key, source=None):
+        """ return the valid entry for key, or None
+
+        Args:
+            key (str): the cache key
+            source (Collection): optional, the source collection. If specified
+               and the source collection has changed, the entry is removed
+        """
         try:
-            result = QueryCache.objects.get(key=key)
-        except:
+            result = self._QueryCache.objects.get(key=key)
+        except Exception:
             result = None
+        if result is not None and not self._is_valid(result, source):
+            self._remove(result)
+            result = None
+        if result is None:
+            _counters.count(self._db_alias, misses=1)
+            return None
+        _counters.count(self._db_alias, hits=1)
+        self._QueryCache.objects(key=key).update_one(set__accessed=datetime.datetime.now(), inc__hits=1)
         return result
 
+    def delete(self, key=None, collection=None):
+        """ remove the entry of key, or all entries of a source collection, and their results """
+        QueryCache = self._QueryCache
+        entries = (QueryCache.objects.filter(key=key) if key is not None
+                   else QueryCache.objects.filter(value__collection=collection))
+        for entry in entries:
+            self._remove(entry)
+
+    def sweep(self, force=False):
+        """ remove expired entries, enforce the size budget and drop orphaned result collections
+
+        Args:
+            force (bool): if False, sweep at most every sweep_interval seconds
+
+        Returns:
+            number of entries and collections removed
+        """
+        now = time.time()
+        if not _counters.sweep_due(self._db_alias, self.sweep_interval, force=force):
+            return 0
+        removed = 0
+        QueryCache = self._QueryCache
+        # expired entries
+        if self.ttl:
+            expired = datetime.datetime.now() - datetime.timedelta(seconds=self.ttl)
+            for entry in QueryCache.objects.filter(accessed__lt=expired):
+                removed += self._remove(entry)
+        # size budget, least recently used first
+        if self.maxbytes:
+            entries = list(QueryCache.objects.order_by('-accessed').only('key', 'value', 'size'))
+            total = 0
+            for entry in entries:
+                total += entry.size or 0
+                if total > self.maxbytes:
+                    removed += self._remove(entry)
+        # orphaned result collections
+        results = {(entry.value or {}).get('result') for entry in QueryCache.objects.only('value')}
+        for name in self.db.list_collection_names(filter={'name': {'$regex': '^cache_'}}):
+            if name not in results and self._is_orphan_expired(name, now):
+                self.db.drop_collection(name)
+                removed += 1
+        return removed
+
+    def stats(self):
+        """ return cache statistics
+
+        Returns:
+            dict(entries, size, hits, misses), where size is the total size of
+            result collections in bytes. hits and misses are kept by the worker
+            process, see CacheCounters
+        """
+        entries = list(self._QueryCache.objects.only('size'))
+        return {
+            'entries': len(entries),
+            'size': sum(entry.size or 0 for entry in entries),
+            **_counters.get(self._db_alias),
+        }
+
+    def _is_valid(self, entry, source):
+        result = (entry.value or {}).get('result')
+        if self.ttl and entry.accessed and entry.accessed < datetime.datetime.now() - datetime.timedelta(
+                seconds=self.ttl):
+            return False
+        if source is not None and entry.version != self.source_version(source):
+            return False
+        return bool(result) and bool(self.db.list_collection_names(filter={'name': result}))
+
+    def _remove(self, entry):
+        result = (entry.value or {}).get('result')
+        if result and result.startswith('cache_'):
+            self.db.drop_collection(result)
+        entry.delete()
+        return 1
+
+    def _is_orphan_expired(self, name, now):
+        # cache_<timestamp>_<uuid>, older result collections have no timestamp
+        parts = name.split('_')
+        created = int(parts[1]) if len(parts) == 3 and parts[1].isdigit() else 0
+        return now - created > self.orphan_grace
+
+    def _collection_size(self, name):
+        try:
+            return int(self.db.command('collStats', name).get('size', 0))
+        except Exception:
+            return 0
+
+
+#: hit/miss counters and sweep times of ApplyCache, by db alias
+_counters = CacheCounters()
+
 
 class ApplyStatistics(object):
-    def quantile(self, q=.5):
+    #: number of documents per chunk for method='sketch'
+    sketch_chunksize = 10000
+
+    def quantile(self, q=.5, method=None):
+        """
+        calculate quantiles of all columns
+
+        Args:
+            q (float|list): the quantile or list of quantiles
+            method (str): the method to calculate quantiles,
+
+                * 'approximate' uses $percentile on the server, requires MongoDB >= 7.0
+                * 'sketch' streams all columns once into a t-digest per column, on
+                  every evaluation of the result (e.g. .value, inspect() or persist())
+                * 'exact' sorts the values of every column for every quantile on the server,
+                  this is limited to 16MB of values per column
+
+                defaults to 'approximate' if supported by the server, else 'sketch'
+
+        Returns:
+            MDataFrame, where .value is a DataFrame of index p<q> and one column for
+            each column
+
+        .. versionchanged:: NEXT
+            added method, approximate quantiles of all columns are calculated in one pass
+        """
+
         def preparefn(val):
             return val.pivot(columns='var', index='percentile', values='value')
 
-        return self.apply(self._percentile(q), preparefn=preparefn)
+        method = method or ('approximate' if server_version(self.collection) >= (7, 0) else 'sketch')
+        percentile = {
+            'approximate': self._percentile_approximate,
+            'sketch': self._percentile_sketch,
+            'exact': self._percentile,
+        }.get(method)
+        if percentile is None:
+            raise ValueError(f'method must be one of approximate, sketch or exact, got {method}')
+        return self.apply(percentile(q), preparefn=preparefn)
 
     def cov(self):
         def preparefn(val):
@@ -949,13 +1166,108 @@ class ApplyStatistics(object):
         }]
         return [facet, *unwinds, *expand]
 
+    def _percentile_list(self, pctls):
+        pctls = pctls or [.25, .5, .75]
+        if not isinstance(pctls, (list, tuple)):
+            pctls = [pctls]
+        return list(pctls)
+
+    def _percentile_expand(self, records):
+        # expand records into one document for each column + percentile combination
+        # -- records is an array expression of {var, percentile, value} documents
+        return [{
+            '$project': {
+                '_id': 0,
+                'value': records,
+            }
+        }, {
+            '$unwind': '$value'
+        }, {
+            '$replaceRoot': {
+                'newRoot': '$value'
+            }
+        }]
+
+    def _percentile_approximate(self, pctls=None):
+        """
+        calculate approximate percentiles for all columns using $percentile
+
+        All columns and percentiles are calculated in a single $group stage.
+        Requires MongoDB >= 7.0
+
+        .. versionadded:: NEXT
+        """
+        pctls = self._percentile_list(pctls)
+
+        def inner(ctx):
+            group = {
+                '$group': {
+                    '_id': None,
+                    **{col: {
+                        '$percentile': {
+                            'input': '$' + col,
+                            'p': pctls,
+                            'method': 'approximate',
+                        }
+                    } for col in ctx.columns}
+                }
+            }
+            records = [{
+                'var': {'$literal': col},
+                'percentile': {'$literal': 'p{}'.format(p)},
+                'value': {'$arrayElemAt': ['$' + col, i]},
+            } for col in ctx.columns for i, p in enumerate(pctls)]
+            return [group, *self._percentile_expand(records)]
+
+        return inner
+
+    def _percentile_sketch(self, pctls=None):
+        """
+        calculate approximate percentiles for all columns using a t-digest
+
+        The filtered documents are read in a single pass, in chunks of
+        sketch_chunksize documents. Each chunk updates a t-digest per
+        column, memory is bounded by the chunksize and number of columns.
+        Non-numeric values are ignored.
+
+        Note the collection is read whenever the pipeline is built, i.e. on
+        every .value, inspect(), persist() or reset_cache(), and also to look
+        up a persisted result, as its cache key includes the percentiles.
+
+        .. versionadded:: NEXT
+        """
+        from omegaml.backends.monitoring.sketches import QuantileDigest
+        pctls = self._percentile_list(pctls)
+
+        def inner(ctx):
+            mdf = ctx.caller
+            columns = list(ctx.columns)
+            digests = {col: QuantileDigest() for col in columns}
+            cursor = FilteredCollection(mdf.collection).find(filter=mdf._get_filter_criteria(),
+                                                             projection={col: 1 for col in columns})
+            if mdf.skip_topn:
+                cursor.skip(mdf.skip_topn)
+            if mdf.head_limit:
+                cursor.limit(mdf.head_limit)
+            for chunk in grouper(self.sketch_chunksize, cursor):
+                chunkdf = pd.DataFrame.from_records(list(chunk), columns=columns)
+                for col in columns:
+                    digests[col].update(pd.to_numeric(chunkdf[col], errors='coerce').dropna().values)
+            records = [{
+                'var': col,
+                'percentile': 'p{}'.format(p),
+                'value': float(value) if digests[col].count else None,
+            } for col in columns for p, value in zip(pctls, digests[col].quantile(pctls))]
+            # return the results as a literal, processed the same as with the server-side methods
+            return [{'$limit': 1}, *self._percentile_expand({'$literal': records})]
+
+        return inner
+
     def _percentile(self, pctls=None):
         """
         calculate percentiles for all columns
         """
-        pctls = pctls or [.25, .5, .75]
-        if not isinstance(pctls, (list, tuple)):
-            pctls = [pctls]
+        pctls = self._percentile_list(pctls)
 
         def calc(col, p, outcol):
             # sort values
@@ -35,12 +35,13 @@ class UtilitiesMixin:
             return self._get_dataframe_from_cursor(cursor)[self.name].dtype
         raise AttributeError('dtypes')
 
-    def describe(self, quantiles=None):
+    def describe(self, quantiles=None, method=None):
         """
         implement MDataFrame.describe()
 
         Args:
             quantiles: a list of quantiles to compute, defaults to .25, .5, .75
+            method: the method to compute quantiles, see MDataFrame.quantile()
 
         Returns:
             dataframe with quantiles
@@ -67,7 +68,7 @@ class UtilitiesMixin:
         if quantiles:
             if not isinstance(quantiles, (tuple, list)):
                 quantiles = self.standard_quantiles
-            quants_df = self.quantile(quantiles).value
+            quants_df = self.quantile(quantiles, method=method).value
             stats_df = pd.concat([stats_df, quants_df], sort=False)
         return stats_df[numcols]
 
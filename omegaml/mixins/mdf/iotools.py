@@ -18,6 +18,8 @@ Usage:
 import pandas as pd
 from tqdm import tqdm
 
+from omegaml.store.fastinsert import pipelined_insert
+
 try:
     from smart_open import open as open_file
 except:
@@ -39,7 +41,7 @@ class IOToolsMDFMixin:
 
 class IOToolsStoreMixin:
     def read_csv(self, csvfn, name, chunksize=10000, append=False, apply=None, mode='r',
-                 open_kwargs=None, **kwargs):
+                 open_kwargs=None, n_jobs=None, **kwargs):
         """
         read large files from s3, hdfs, http/s, sftp, scp, ssh, write to om.datasets
 
@@ -80,11 +82,24 @@ class IOToolsStoreMixin:
                Use this for transformations or filtering
             mode (str): file open mode, defaults to r
             open_kwargs (dict): additional kwargs to `smart_open`_
+            n_jobs (int): the number of threads converting and inserting chunks,
+               while the next chunks are parsed. Defaults to
+               ``om.defaults.OMEGA_READ_CSV['n_jobs']``. Set to 1 to parse and
+               insert every chunk in sequence
             **kwargs: additional kwargs are passed to ``pandas.read_csv``
 
         Returns:
             MDataFrame
 
+        Notes:
+            With n_jobs > 1, the first chunk is stored by ``om.datasets.put()``,
+            subsequent chunks are inserted by a pool of writer threads and the
+            Metadata is saved once all chunks are inserted. At most
+            ``OMEGA_READ_CSV['queue_size']`` parsed chunks are held in memory.
+
+        .. versionchanged:: NEXT
+            added n_jobs, parsing and inserting chunks is pipelined
+
         See Also:
 
             * `smart_open` https://github.com/RaRe-Technologies/smart_open
@@ -94,15 +109,18 @@ class IOToolsStoreMixin:
         """
         store = self
         open_kwargs = open_kwargs or {}
+        settings = getattr(store.defaults, 'OMEGA_READ_CSV', None) or {}
+        n_jobs = n_jobs or settings.get('n_jobs', 1)
         with open_file(csvfn, mode=mode, **open_kwargs) as fin:
             it = pd.read_csv(fin, chunksize=chunksize, iterator=True, **kwargs)
-            pbar = tqdm(it)
+            pbar = tqdm(_applied(it, apply))
             try:
-                for i, chunkdf in enumerate(pbar):
-                    if apply:
-                        result = apply(chunkdf)
-                        chunkdf = chunkdf if result is None else result
-                    store.put(chunkdf, name, append=(i > 0) or append)
+                if n_jobs > 1:
+                    pipelined_insert(store, pbar, name, append=append, n_jobs=n_jobs,
+                                     queue_size=settings.get('queue_size'))
+                else:
+                    for i, chunkdf in enumerate(pbar):
+                        store.put(chunkdf, name, append=(i > 0) or append)
             finally:
                 pbar.close()
         return store.getl(name)
@@ -145,8 +163,14 @@ class IOToolsStoreMixin:
 def _chunked_to_csv(df_iter, csvfn, mode, apply, open_kwargs=None, **kwargs):
     open_kwargs = open_kwargs or {}
     with open_file(csvfn, mode, **open_kwargs) as fout:
-        for i, chunkdf in tqdm(enumerate(df_iter)):
-            if apply:
-                result = apply(chunkdf)
-                chunkdf = chunkdf if result is None else result
+        for i, chunkdf in tqdm(enumerate(_applied(df_iter, apply))):
             chunkdf.to_csv(fout, **kwargs)
+
+
+def _applied(df_iter, apply):
+    # apply a function to each chunk, keeping the chunk if the function returns None
+    for chunkdf in df_iter:
+        if apply:
+            result = apply(chunkdf)
+            chunkdf = chunkdf if result is None else result
+        yield chunkdf
@@ -1,5 +1,6 @@
 from joblib import Parallel, delayed
 
+from omegaml.store.filtered import FilteredCollection
 from omegaml.util import PickableCollection
 
 
@@ -31,7 +32,8 @@ class ParallelApplyMixin:
             maxobs (int): number of max observations to process, defaults to
                len of mdf
             chunksize (int): max size of each chunk, defaults to 50000
-            chunkfn (func): the function to chunk by
+            chunkfn (func): the function to chunk by, defaults to chunking by
+               ranges of _om#rowid, see ._chunker()
             outname (name): output collection name, defaults to _tmp_ prefix of
               input name
             resolve (string): worker, function. If worker is specified chunkfn
@@ -63,9 +65,62 @@ class ParallelApplyMixin:
         return mdf
 
     def _chunker(self, mdf, chunksize, maxobs):
+        # chunk by _om#rowid ranges if possible, else fall back to positional chunks
+        ranges = self._rowid_ranges(mdf, chunksize, maxobs)
+        if ranges is not None:
+            yield from self._rowid_chunker(mdf, ranges)
+        else:
+            yield from self._positional_chunker(mdf, chunksize, maxobs)
+
+    def _rowid_chunker(self, mdf, ranges):
+        # each chunk is an index range scan on _om#rowid
+        for lower, upper in ranges:
+            yield mdf.query(**{'_om#rowid__gte': lower, '_om#rowid__lt': upper})
+
+    def _rowid_ranges(self, mdf, chunksize, maxobs):
+        """ compute the [lower, upper) _om#rowid ranges of at most chunksize rows each
+
+        The ranges are computed once, before any chunk is processed. If the
+        row ids are dense (the default for datasets stored by om.datasets.put),
+        the ranges are derived from the min and max row id (two index lookups).
+        Otherwise, e.g. for filtered MDataFrames, uses $bucketAuto to get ranges
+        of approx. equal number of rows.
+
+        Returns:
+            list of (lower, upper) tuples, or None if the MDataFrame is sorted,
+            sliced or its documents do not have an integer _om#rowid
+        """
+        if mdf.sort_order or mdf.head_limit or mdf.skip_topn:
+            return None
+        collection = mdf.collection
+        projection = {'_om#rowid': 1, '_id': 0}
+        first = collection.find_one(sort=[('_om#rowid', 1)], projection=projection) or {}
+        last = collection.find_one(sort=[('_om#rowid', -1)], projection=projection) or {}
+        lower, upper = first.get('_om#rowid'), last.get('_om#rowid')
+        if not all(isinstance(v, int) for v in (lower, upper)):
+            return None
+        upper += 1
+        is_filtered = isinstance(collection, FilteredCollection) and bool(collection.query)
+        if not is_filtered and upper - lower <= maxobs:
+            return [(i, min(i + chunksize, upper)) for i in range(lower, upper, chunksize)]
+        pipeline = [
+            {'$sort': {'_om#rowid': 1}},
+            {'$limit': int(maxobs)},
+            {'$project': projection},
+            {'$bucketAuto': {'groupBy': '$_om#rowid',
+                             'buckets': max(int(-(-maxobs // chunksize)), 1)}},
+        ]
+        buckets = list(collection.aggregate(pipeline, allowDiskUse=True))
+        # bucket max is exclusive, except for the last bucket
+        ranges = [(b['_id']['min'], b['_id']['max']) for b in buckets]
+        if ranges:
+            ranges[-1] = ranges[-1][0], ranges[-1][1] + 1
+        return ranges
+
+    def _positional_chunker(self, mdf, chunksize, maxobs):
         if getattr(mdf.collection, 'query', None):
             for i in range(0, maxobs, chunksize):
-                yield mdf.skip(i).head(i + chunksize)
+                yield mdf.skip(i).head(chunksize)
         else:
             for i in range(0, maxobs, chunksize):
                 yield mdf.iloc[i:i + chunksize]
@@ -2,9 +2,8 @@
 import pandas as pd
 import sys
 from datetime import datetime
-from tqdm import tqdm
 
-from omegaml.util import tryOr
+from omegaml.util import tryOr, grouper
 
 
 class DataRevisionMixin:
@@ -58,9 +57,19 @@ class DataRevisionMixin:
                'dt': <timestamp>, # the creation timestamp of the change
                'seq': N, # the sequence of the revision
                'tags': [], # list of tags to identify this revision
-            }, ...]
+            }, ...],
+            'snapshots': [N, ...], # the revisions stored as snapshots
+            'snapshot_rows': N, # the number of changed rows since the last snapshot
         }
 
+    Snapshots:
+        Every ``OMEGA_DATA_REVISIONS['snapshot_interval']`` revisions, or once
+        ``OMEGA_DATA_REVISIONS['snapshot_rows']`` rows have changed since the
+        last snapshot, the revision is stored as a snapshot (all changes applied,
+        deletions flagged) in the ``.revisions.<name>.snapshots`` dataset.
+        Retrieving a previous revision starts from the nearest snapshot
+        at or before the revision, instead of from revision 0.
+
     Notes:
         * this is currently implemented for pd.DataFrames only, however the mixin
           uses a revision protocol that is independent of the underlying storage
@@ -88,6 +97,13 @@ class DataRevisionMixin:
         name, tag = name.split('@') if '@' in name else (name, '')
         return f'.revisions.{name}'
 
+    def _snapname(self, revname):
+        return f'{revname}.snapshots'
+
+    @property
+    def _revision_settings(self):
+        return getattr(self.defaults, 'OMEGA_DATA_REVISIONS', None) or {}
+
     def _build_revision(self, df, name, append=True, revision_dt=None, tag=None, delete=False, **kwargs):
         """ build a new revision
 
@@ -112,6 +128,7 @@ class DataRevisionMixin:
         if not append:
             super().drop(name, force=True)
             super().drop(revname, force=True)
+            super().drop(self._snapname(revname), force=True)
         # build revision metadata
         if '_delete_' not in df.columns:
             df['_delete_'] = delete
@@ -138,11 +155,30 @@ class DataRevisionMixin:
             'tags': [tag] if tag else [],
             'delete': delete,
         })
-        meta.save()
         # -- record all changes to revision dataset
         self._store_changeset(df, revname, append=append)
+        # -- store a snapshot if due
+        snapshot_rows = revisions.get('snapshot_rows', 0) + len(df) if revision > 0 else 0
+        revisions['snapshot_rows'] = snapshot_rows
+        if self._snapshot_due(revision, snapshot_rows):
+            self._store_snapshot(revname, revision, revisions.setdefault('snapshots', []))
+            revisions['snapshot_rows'] = 0
+        meta.save()
         return meta
 
+    def _snapshot_due(self, revision, snapshot_rows):
+        interval = self._revision_settings.get('snapshot_interval')
+        max_rows = self._revision_settings.get('snapshot_rows')
+        return revision > 0 and bool((interval and revision % interval == 0)
+                                     or (max_rows and snapshot_rows >= max_rows))
+
+    def _store_snapshot(self, revname, revision, snapshots):
+        # materialize the revision with all changes applied, deletions flagged
+        data = self._apply_changesets(revname, revision, snapshots=snapshots, compact=True)
+        data['_om#snapshot'] = revision
+        super().put(data, self._snapname(revname), append=True)
+        snapshots.append(revision)
+
     def _store_changeset(self, df, revname, append=True, **kwargs):
         return super().put(df, revname, append=append)
 
@@ -189,72 +225,79 @@ class DataRevisionMixin:
             data = super().get(name, **kwargs)
         else:
             # -- get all changesets up to requested revision
-            data = self._apply_changesets(revname, revision, trace_revisions=trace_revisions, **kwargs)
+            snapshots = meta.kind_meta['revisions'].get('snapshots')
+            data = self._apply_changesets(revname, revision, trace_revisions=trace_revisions,
+                                          snapshots=snapshots, **kwargs)
         self._clean(data, trace_revisions=trace_revisions)
         return data
 
-    def _apply_changesets(self, revname, revision, trace_revisions=False, **kwargs):
-        # get base revision and apply all changesets up to requested by merging in sequence
-        # -- merge
-        base = super().get(revname, filter={'_om#revision': 0}, **kwargs)
-        base_types = base.dtypes
-        idx_type = base.index.dtype
-        for rev in range(1, revision + 1):
-            changes = super().get(revname, filter={'_om#revision': rev}, **kwargs)
-            if changes is None:
-                continue
-            # apply upserts, step 1
-            base = base.merge(changes,
-                              how='outer',
-                              left_index=True,
-                              right_index=True,
-                              suffixes=(None, '_r_'))
-            # apply upserts, step 2
-            revcols = []
-            for col in [c for c in base.columns if not c.endswith('_r_')]:
-                revcol = col + '_r_'
-                if revcol not in base.columns:
-                    continue
-                base[col] = base[revcol].fillna(base[col]).astype(base_types[col])
-                revcols.append(revcol)
-            base.index = base.index.astype(idx_type)
-            if revcols:
-                base.drop(columns=revcols, inplace=True)
-            # apply row deletions
-            if not trace_revisions:
-                flt_delete = base['_delete_'] == True  # noqa
-                base = base[~flt_delete]
-        return base
+    def _apply_changesets(self, revname, revision, trace_revisions=False, snapshots=None, compact=False,
+                          **kwargs):
+        # get the nearest snapshot at or before revision, else revision 0, and apply all
+        # later changesets up to the requested revision
+        # -- trace_revisions always starts at revision 0 since snapshots are compacted
+        # -- compact=True keeps deleted rows flagged, without values before their deletion
+        snapshot = max((seq for seq in snapshots or [] if seq <= revision and not trace_revisions), default=0)
+        if snapshot:
+            base = super().get(self._snapname(revname), filter={'_om#snapshot': snapshot}, **kwargs)
+            base = base.drop(columns=['_om#snapshot'])
+        else:
+            base = super().get(revname, filter={'_om#revision': 0}, **kwargs)
+        frames = [base]
+        if revision > snapshot:
+            changes = super().get(revname, filter={'_om#revision__between': (snapshot + 1, revision)}, **kwargs)
+            if changes is not None and len(changes):
+                frames.append(changes.sort_values('_om#revision', kind='stable'))
+        # combine all changesets in one step
+        # -- for every index, the last non-null value of each column is applied, i.e.
+        #    columns not included in a changeset remain unchanged
+        # -- unless tracing, rows up to the most recent deletion of an index are removed
+        #    (if compact, the most recent deletion is kept)
+        data = pd.concat(frames, sort=False)
+        levels = list(range(data.index.nlevels))
+        if compact or not trace_revisions:
+            deleted = data['_delete_'] == True  # noqa
+            if deleted.any():
+                last_deleted = (data['_om#revision'].where(deleted)
+                                .groupby(level=levels, dropna=False).transform('max'))
+                removed = (data['_om#revision'] < last_deleted if compact
+                           else data['_om#revision'] <= last_deleted)
+                data = data[~removed]
+        result = data.groupby(level=levels, sort=True, dropna=False).last()
+        # restore dtypes, the base dtypes take precedence
+        dtypes = {}
+        for frame in reversed(frames):
+            dtypes.update(frame.dtypes.items())
+        for col, dtype in dtypes.items():
+            if col in result.columns and result[col].dtype != dtype:
+                result[col] = tryOr(lambda: result[col].astype(dtype), result[col])
+        result.index = tryOr(lambda: result.index.astype(base.index.dtype), result.index)
+        return result
 
     def _make_upsert_fn(self, name, delete=False):
         collection = self.collection(name)
+        default_chunksize = self._revision_settings.get('upsert_chunksize') or 1000
 
-        def upsert(obj, store, name, chunksize=1):  # noqa
+        def upsert(obj, store, name, chunksize=None):  # noqa
             from pymongo import DeleteOne, UpdateOne
 
-            ops_updates = []
-            ops_deletions = []
-
-            for i, row in tqdm(obj.iterrows(), total=len(obj)):
-                data = row.to_dict()
-                # om rowid is re-added on insert only to preserve existing row id
-                del data['_om#rowid']
-                updates = {
-                    '$set': data,
-                    '$setOnInsert': {
-                        '_om#rowid': row['_om#rowid']
-                    }
-                }
-                key = {k: v for k, v in data.items() if k.startswith('_idx#')}
-                if data.get('_delete_', delete):
-                    # collection.delete_one(key)
-                    ops_deletions.append(DeleteOne(key))
-                else:
-                    # collection.update_one(key, updates, upsert=True)
-                    ops_updates.append(UpdateOne(key, updates, upsert=True))
-
-            # do all updates in one step
-            collection.bulk_write(ops_deletions + ops_updates)
+            chunksize = chunksize or default_chunksize
+            idx_cols = [col for col in obj.columns if col.startswith('_idx#')]
+            # for multiple changes of the same index, the last change applies
+            obj = obj.drop_duplicates(subset=idx_cols, keep='last') if idx_cols else obj
+            flags = (obj['_delete_'].astype('boolean').fillna(delete).astype(bool) if '_delete_' in obj.columns
+                     else pd.Series(delete, index=obj.index))
+            records = obj.drop(columns=['_om#rowid']).to_dict(orient='records')
+            rowids = obj['_om#rowid'].tolist()
+            keys = obj[idx_cols].to_dict(orient='records')
+            # om rowid is added on insert only to preserve existing row id
+            ops_deletions = (DeleteOne(key) for key, flag in zip(keys, flags) if flag)
+            ops_updates = (UpdateOne(key, {'$set': data, '$setOnInsert': {'_om#rowid': rowid}}, upsert=True)
+                           for key, data, rowid, flag in zip(keys, records, rowids, flags) if not flag)
+            # apply all deletions before all updates, each in unordered chunks
+            for ops in (ops_deletions, ops_updates):
+                for chunk in grouper(chunksize, ops):
+                    collection.bulk_write(list(chunk), ordered=False)
 
         return upsert
 
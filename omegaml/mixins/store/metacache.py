@@ -0,0 +1,56 @@
+from omegaml.store.metacache import MetadataCache
+
+
+class MetadataCacheMixin:
+    """ serve metadata() calls from a process-level cache
+
+    While RequestCache caches metadata for the duration of a request,
+    MetadataCacheMixin keeps Metadata across requests, for all stores in
+    the process. This is useful for long-running processes like the runtime
+    workers and the REST API, where the same objects are accessed repeatedly.
+
+    Usage::
+
+        # enable in the environment (or set om.defaults.OMEGA_METADATA_CACHE)
+        OMEGA_METADATA_CACHE=1
+        OMEGA_METADATA_CACHE_TTL=30
+        OMEGA_METADATA_CACHE_WATCH=1  # optional, requires a replica set
+
+        meta = om.datasets.metadata('foo')  # queries the db, adds to cache
+        meta = om.datasets.metadata('foo')  # retrieves from cache
+        meta = om.datasets.metadata('foo', cached=False)  # queries the db
+        om.datasets.metadata_cache.stats()
+        => {'entries': 1, 'hits': 1, 'misses': 1, 'watching': []}
+
+    Notes:
+        * entries are invalidated on Metadata.save() and .delete() in the
+          same process, i.e. on put(), drop() and any other change to
+          a Metadata object
+        * changes by other processes are seen after the ttl expires, or
+          immediately if watch is enabled
+        * the cache is disabled by default
+
+    .. versionadded:: NEXT
+    """
+
+    @property
+    def metadata_cache(self):
+        """ the process-level MetadataCache, or None if not enabled """
+        settings = dict(getattr(self.defaults, 'OMEGA_METADATA_CACHE', None) or {})
+        if not settings.pop('enabled', False):
+            return None
+        return MetadataCache.instance(**settings)
+
+    def metadata(self, name=None, bucket=None, prefix=None, cached=True, **kwargs):
+        cache = self.metadata_cache
+        cacheable = cache is not None and isinstance(name, str) and set(kwargs) <= {'version'}
+        if not cacheable:
+            return super().metadata(name=name, bucket=bucket, prefix=prefix, **kwargs)
+        Meta = self._Metadata
+        bucket = bucket or self.bucket
+        prefix = prefix or self.prefix
+        meta = cache.get(Meta, name, bucket, prefix) if cached else None
+        if meta is None:
+            meta = super().metadata(name=name, bucket=bucket, prefix=prefix, **kwargs)
+            cache.set(Meta, meta)
+        return meta
@@ -89,7 +89,7 @@ class RequestCache:
         return self._request.cache
 
     def metadata(self, name=None, cached=True, **kwargs):
-        _base_meta = partial(super().metadata, name=name, **kwargs)
+        _base_meta = partial(super().metadata, name=name, cached=cached, **kwargs)
         if self.current_request:
             try:
                 # if cached is False, we query the original metadata, yet still cache
@@ -1,11 +1,14 @@
 import atexit
+import hashlib
 import logging
+import threading
 import warnings
 from time import sleep
 from urllib.parse import urlencode
 
 from pymongo import MongoClient as RealMongoClient
 from pymongo.errors import AutoReconnect, ConnectionFailure
+from pymongo.monitoring import ConnectionPoolListener
 
 from omegaml.util import find_instances, ProcessLocal
 
@@ -51,6 +54,8 @@ def close_all_clients():
     except:
         # ignore any errors
         pass
+    # close shared clients
+    mongo_clients.clear()
     # close remaining MongoClients
     clients = find_instances(RealMongoClient)
     for client in clients:
@@ -118,6 +123,195 @@ def waitForConnection(client):
         raise _exc
 
 
+#: server versions by client
+_SERVER_VERSIONS = {}
+
+
+def server_version(collection):
+    """ return the MongoDB server version of a collection as a tuple (major, minor), (0, 0) if unknown
+
+    .. versionadded:: NEXT
+    """
+    client = collection.database.client
+    if id(client) not in _SERVER_VERSIONS:
+        try:
+            version = tuple(client.server_info().get('versionArray', (0, 0))[0:2])
+        except Exception:
+            version = (0, 0)
+        _SERVER_VERSIONS[id(client)] = version
+    return _SERVER_VERSIONS[id(client)]
+
+
+class PoolStatsListener(ConnectionPoolListener):
+    """ count connection pool events of a MongoClient
+
+    .. versionadded:: NEXT
+    """
+
+    def __init__(self):
+        self.created = 0
+        self.closed = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.failed = 0
+        self.cleared = 0
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self.cleared += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self.created += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self.closed += 1
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self.failed += 1
+
+    def connection_checked_out(self, event):
+        self.checkouts += 1
+
+    def connection_checked_in(self, event):
+        self.checkins += 1
+
+    def stats(self):
+        return {
+            'connections': self.created - self.closed,
+            'in_use': self.checkouts - self.checkins,
+            'created': self.created,
+            'checkouts': self.checkouts,
+            'failed': self.failed,
+            'cleared': self.cleared,
+        }
+
+
+class MongoClientPool:
+    """ process-wide registry of shared MongoClients
+
+    OmegaStore instances acquire a MongoClient for their mongoengine
+    alias from this pool, instead of creating a new MongoClient for each
+    alias. Clients are shared by all aliases that connect to the same host,
+    using the same credentials and connection kwargs (e.g. TLS settings).
+    Database handles are per alias, i.e. each alias can use a different
+    database on the shared client. A new client waits for the connection
+    once, subsequent acquires of the same client do not access the network.
+
+    Usage::
+
+        client = mongo_clients.acquire(alias, host, username=.., password=.., **kwargs)
+        mongo_clients.release(alias)
+        mongo_clients.stats()
+
+    Notes:
+        * clients are kept open while the process runs, even if there are
+          no active references. All clients are closed at exit
+        * the pool is reset in a forked child process, i.e. a child process
+          creates new clients, never using the parent's clients
+
+    .. versionadded:: NEXT
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._clients = ProcessLocal()
+        self._listeners = ProcessLocal()
+        self._hosts = ProcessLocal()
+        self._refs = ProcessLocal()
+        self._aliases = ProcessLocal()
+
+    def key(self, host, username=None, password=None, **kwargs):
+        # credentials are hashed so they are not kept in the key
+        creds = hashlib.sha256(f'{username}:{password}'.encode('utf8')).hexdigest()
+        return host, creds, tuple(sorted((k, repr(v)) for k, v in kwargs.items()))
+
+    def acquire(self, alias, host, username=None, password=None, **kwargs):
+        """ return a shared MongoClient for alias, creating a new client if required
+
+        Args:
+            alias (str): the mongoengine alias
+            host (str): the host url, as mongodb://host:port, without credentials
+            username (str): the username
+            password (str): the password
+            **kwargs: kwargs to MongoClient
+
+        Returns:
+            MongoClient
+        """
+        kwargs = sanitize_mongo_kwargs(kwargs)
+        key = self.key(host, username=username, password=password, **kwargs)
+        with self._lock:
+            if key not in self._clients:
+                listener = PoolStatsListener()
+                client = RealMongoClient(host, username=username, password=password,
+                                         event_listeners=[listener], connect=False, **kwargs)
+                # since PyMongo 4, the client no longer waits for connection
+                waitForConnection(client)
+                self._clients[key] = client
+                self._listeners[key] = listener
+                self._hosts[key] = host
+                self._refs[key] = {}
+            refs = self._refs[key]
+            refs[alias] = refs.get(alias, 0) + 1
+            self._aliases[alias] = key
+            return self._clients[key]
+
+    def release(self, alias):
+        """ release one reference of alias """
+        with self._lock:
+            key = self._aliases[alias] if alias in self._aliases else None
+            refs = self._refs[key] if key in self._refs else {}
+            if alias in refs:
+                refs[alias] -= 1
+                if refs[alias] <= 0:
+                    del refs[alias]
+
+    def stats(self):
+        """ return stats of all clients
+
+        Returns:
+            list of dict(host, aliases, refs, connections, in_use, created,
+            checkouts, failed, cleared) for each client, where connections is
+            the number of open connections, in_use is the number of connections
+            currently checked out
+        """
+        with self._lock:
+            return [{
+                'host': self._hosts[key],
+                'aliases': len(self._refs[key]),
+                'refs': sum(self._refs[key].values()),
+                **self._listeners[key].stats(),
+            } for key in list(self._clients.keys())]
+
+    def clear(self):
+        """ close all clients and reset the pool """
+        with self._lock:
+            for key in list(self._clients.keys()):
+                try:
+                    self._clients[key].close()
+                except Exception:
+                    pass
+            for registry in (self._clients, self._listeners, self._hosts, self._refs, self._aliases):
+                registry.clear()
+
+
+#: the process-wide pool of shared MongoClients
+mongo_clients = MongoClientPool()
+
 # -- patch mongoengine's global connection dictionaries to be ProcessLocal()s
 patch_mongoengine()
 # -- register closing all mongo clients at exit
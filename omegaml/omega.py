@@ -63,9 +63,9 @@ class Omega(CombinedStoreRequestCache, CombinedOmegaStoreMixin):
         return f'Omega(bucket={self.bucket})'
 
     def _clone(self, **kwargs):
-        return self.__class__(defaults=self.defaults,
-                              mongo_url=self.mongo_url,
-                              **kwargs)
+        kwargs.setdefault('defaults', self.defaults)
+        kwargs.setdefault('mongo_url', self.mongo_url)
+        return self.__class__(**kwargs)
 
     def _make_runtime(self, celeryconf):
         from omegaml.runtimes import OmegaRuntime
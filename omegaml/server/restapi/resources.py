@@ -8,7 +8,7 @@ import numpy as np
 import pandas as pd
 import re
 from flask import Blueprint, render_template, url_for, Response
-from flask_restx import Resource, fields, Api, marshal_with
+from flask_restx import Resource, fields, Api, marshal, marshal_with
 from flask_restx.apidoc import apidoc
 from functools import wraps
 from mongoengine import DoesNotExist
@@ -17,7 +17,8 @@ from werkzeug.exceptions import NotFound
 
 from omegaml import _base_config
 from omegaml.backends.restapi.asyncrest import AsyncTaskResourceMixin, AsyncResponseMixin, resolve
-from omegaml.server.restapi.util import OmegaResourceMixin, strict, AnyObject
+from omegaml.server.restapi.util import OmegaResourceMixin, strict, AnyObject, stream_dataframe, \
+    stream_format, STREAM_FORMATS, int_arg
 from omegaml.util import isTrue
 
 logger = logging.getLogger(__name__)
@@ -348,13 +349,16 @@ def add_api_endpoints(api):
     @api.route('/api/v1/dataset/<path:dataset_id>')
     class DatasetResource(OmegaResourceMixin, Resource):
         # TODO shall implement as a GenericResource, like all other resources
+        #: query args that are not filters
+        query_args = ['orient', 'limit', 'skip', 'page', 'after', 'columns', 'format', 'chunksize']
+
         def _restore_filter(self, om, fltparams, name):
             """
             restore filter kwargs for query in om.datasets.get
             """
             # -- get filters as specified on request query args
             fltkwargs = {k: v for k, v in fltparams.items()
-                         if k not in ['orient', 'limit', 'skip', 'page']}
+                         if k not in self.query_args}
             # -- get dtypes of dataframe and convert filter values
             metadata = om.datasets.metadata(name)
             kind_meta = metadata.kind_meta or {}
@@ -375,12 +379,75 @@ def add_api_endpoints(api):
                     fltkwargs[k] = value
             return fltkwargs
 
-        @api.marshal_with(DatasetQueryOutput)
+        def _query_dataset(self, om, name):
+            """
+            return the MDataFrame for the request's filter, projection and pagination
+
+            Returns:
+                tuple of (mdf, next_after), next_after is the _om#rowid to request
+                the next page (as after=<next_after>), or None if there is no next page
+            """
+            args = flask.request.args
+            fltkwargs = self._restore_filter(om, args, name)
+            limit, skip, page = (int_arg(args, k) for k in ('limit', 'skip', 'page'))
+            after = int_arg(args, 'after', minimum=None)
+            if after is not None:
+                # keyset pagination
+                fltkwargs['_om#rowid__gt'] = after
+            mdf = om.datasets.getl(name, filter=fltkwargs)
+            if args.get('columns'):
+                mdf = mdf[[col for col in args['columns'].split(',') if col]]
+            skip = (skip or 0) + ((page - 1) * limit if page and limit else 0)
+            next_after = None
+            if limit or after is not None:
+                # pages are in order of _om#rowid, so that next_after is well-defined
+                mdf = mdf.sort('_om#rowid')
+            if limit:
+                # there is a next page if there is a row after the last row of this page
+                last = list(mdf.collection.find(projection={'_om#rowid': 1})
+                            .sort('_om#rowid', 1).skip(skip + limit - 1).limit(2))
+                next_after = last[0].get('_om#rowid') if len(last) > 1 else None
+                mdf = mdf.head(limit)
+            if skip:
+                mdf = mdf.skip(skip)
+            return mdf, next_after
+
+        @api.response(200, 'Success', DatasetQueryOutput)
         def get(self, dataset_id):
+            """
+            query a dataset
+
+            The response format is determined by the Accept header or the format= query arg:
+
+                * application/json (default): a single json document, see DatasetQueryOutput
+                * application/x-ndjson (ndjson): streaming, one json record per line
+                * application/vnd.apache.arrow.stream (arrow): streaming, Arrow IPC stream
+                * application/vnd.apache.parquet (parquet): streaming, Parquet file
+
+            Query args:
+                columns: the comma-separated list of columns to return
+                limit: the max. number of rows to return
+                page: the page of limit rows to return, starting at 1
+                skip: the number of rows to skip
+                after: return rows after this _om#rowid (keyset pagination).
+                   If limit is specified, the X-Next-After response header
+                   contains the value for the next page
+                chunksize: the number of rows in each chunk of a streaming response
+                any other: filters as column__op=value, e.g. x__gte=5
+
+            .. versionchanged:: NEXT
+                added streaming formats, columns, after, applied limit, skip and page
+            """
             om = self._omega
+            mdf, next_after = self._query_dataset(om, dataset_id)
+            headers = {'X-Next-After': str(next_after)} if next_after is not None else {}
+            fmt = stream_format(flask.request.args.get('format'), flask.request.accept_mimetypes)
+            if fmt:
+                chunksize = int_arg(flask.request.args, 'chunksize', default=10000, minimum=1)
+                return flask.Response(flask.stream_with_context(stream_dataframe(mdf, fmt, chunksize=chunksize)),
+                                      content_type=STREAM_FORMATS[fmt], headers=headers)
             orient = flask.request.args.get('orient', 'dict')
-            fltkwargs = self._restore_filter(om, flask.request.args, dataset_id)
-            df = om.datasets.getl(dataset_id, filter=fltkwargs).value
+            df = mdf.value
             # get index values as python types to support Py3
             index_values = list(df.index.astype('O').values)
             index_type = type(df.index).__name__
@@ -390,13 +457,14 @@ def add_api_endpoints(api):
             # convert nan to None
             # https://stackoverflow.com/a/34467382
             data = df.where(pd.notnull(df), None).astype('O').to_dict(orient)
-            return {
+            # streaming responses are returned as is, only the json response is marshalled
+            return marshal({
                 'data': data,
                 'index': {
                     'values': index_values,
                     'type': index_type,
                 }
-            }
+            }, DatasetQueryOutput), 200, headers
 
         @api.expect(DatasetInput, validate=True)
         @api.response(200, 'updated')
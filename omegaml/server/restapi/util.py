@@ -1,8 +1,12 @@
+import os
+import threading
+
+import cachetools
 import flask
 from flask_restx import Model, fields
-from werkzeug.exceptions import BadRequest, HTTPException
+from werkzeug.exceptions import BadRequest, HTTPException, NotAcceptable
 
-from omegaml.util import MongoEncoder, tryOr
+from omegaml.util import MongoEncoder, tryOr, DefaultsContext, grouper
 
 
 class StrictModel(Model):
@@ -35,6 +39,108 @@ class strict(object):
         return smodel
 
 
+class OmegaInstancePool:
+    """ bounded, thread-safe pool of Omega instances for the REST API
+
+    Creating an Omega instance for every request is expensive, as it creates
+    all stores, the runtime and the logger. The pool keeps one instance per
+    (bucket, userid), created on first use and shared by all subsequent
+    requests for the same bucket and user. Instances that have not been used
+    for ttl seconds are evicted, as are the least recently used instances if
+    there are more than maxsize.
+
+    Each instance has its own copy of the defaults with OMEGA_USERID set to
+    the user, i.e. requests never modify the defaults of a shared instance.
+    The configuration is loaded once per process by om.setup(), each new
+    instance is created from it with the bucket and the copied defaults.
+
+    Configure in config.yml or om.defaults::
+
+        OMEGA_RESTAPI_POOL:
+            enabled: true
+            maxsize: 32
+            ttl: 300
+
+    .. versionadded:: NEXT
+    """
+
+    def __init__(self, maxsize=None, ttl=None):
+        self._lock = threading.Lock()
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._cache = None
+        self._base = None
+        self._pid = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, bucket=None, userid=None):
+        """ return the Omega instance for bucket and userid """
+        settings = self._settings()
+        if not settings.get('enabled', True):
+            return self._create(bucket, userid)
+        key = (bucket or 'default', userid)
+        with self._lock:
+            cache = self._get_cache(settings)
+            omega = cache.get(key)
+            if omega is not None:
+                # re-insert to reset the idle time
+                cache[key] = omega
+                self.hits += 1
+                return omega
+        omega = self._create(bucket, userid)
+        with self._lock:
+            self.misses += 1
+            return self._get_cache(settings).setdefault(key, omega)
+
+    def clear(self):
+        with self._lock:
+            self._cache = None
+            self._base = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._cache) if self._cache is not None else 0,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+    def _settings(self):
+        from omegaml import settings
+        return getattr(settings(), 'OMEGA_RESTAPI_POOL', None) or {}
+
+    def _get_cache(self, settings):
+        # create the cache on first use, and in a forked child process
+        if self._cache is None or self._pid != os.getpid():
+            self._base = None if self._pid != os.getpid() else self._base
+            self._cache = cachetools.TTLCache(maxsize=int(self._maxsize or settings.get('maxsize', 32)),
+                                              ttl=int(self._ttl or settings.get('ttl', 300)))
+            self._pid = os.getpid()
+        return self._cache
+
+    def _get_base(self):
+        # the configured instance, created once per process
+        # -- only used as the source of the configuration, requests use instances created by _create()
+        import omegaml as om
+        with self._lock:
+            if self._base is None or self._pid != os.getpid():
+                self._get_cache(self._settings())
+                self._base = self._base or om.setup()
+            return self._base
+
+    def _create(self, bucket, userid):
+        base = self._get_base()
+        defaults = DefaultsContext(base.defaults)
+        defaults.OMEGA_USERID = userid
+        bucket = None if bucket in (None, 'default') else bucket
+        return base._clone(bucket=bucket, defaults=defaults)
+
+
+#: the REST API's pool of Omega instances
+omega_pool = OmegaInstancePool()
+
+
 class OmegaResourceMixin(object):
     """
     helper mixin to resolve the request to a configured Omega instance
@@ -46,23 +152,24 @@ class OmegaResourceMixin(object):
         super().__init__(*args, **kwargs)
 
     def dispatch_request(self, *args, **kwargs):
-        self._omega_instance = None  # always start with a fresh omega instance
+        self._omega_instance = None  # always resolve the omega instance for this request, see omega_pool
         return super().dispatch_request(*args, **kwargs)
 
     @property
     def _omega(self):
-        import omegaml as om
         if self._omega_instance is None:
             bucket = flask.request.headers.get('bucket')
-            om = self._omega_instance = om.setup()[bucket]
-            try:
-                import flask_login
-                om.defaults.OMEGA_USERID = flask_login.current_user.get_id()
-            except:
-                import getpass
-                om.defaults.OMEGA_USERID = getpass.getuser()
+            self._omega_instance = omega_pool.get(bucket=bucket, userid=self._current_userid())
         return self._omega_instance
 
+    def _current_userid(self):
+        try:
+            import flask_login
+            return flask_login.current_user.get_id()
+        except:
+            import getpass
+            return getpass.getuser()
+
     def get_query_payload(self):
         from omegaml.server.restapi.resources import omega_api
         query = flask.request.args.to_dict()
@@ -156,3 +263,130 @@ class OmegaResourceMixin(object):
 
 class AwareJSONEncoder(MongoEncoder):
     pass
+
+
+#: streaming formats of the dataset resource, format => content type
+STREAM_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+def stream_format(fmt=None, accept=None):
+    """ return the streaming format requested by format= or the Accept header, None for json
+
+    Raises:
+        NotAcceptable if the format is not supported or requires pyarrow, which is not installed
+
+    .. versionadded:: NEXT
+    """
+    if not fmt and accept:
+        best = accept.best_match(['application/json'] + list(STREAM_FORMATS.values()))
+        fmt = {v: k for k, v in STREAM_FORMATS.items()}.get(best)
+    if not fmt or fmt == 'json':
+        return None
+    if fmt not in STREAM_FORMATS:
+        raise NotAcceptable(f'format {fmt} is not supported, use one of json, {", ".join(STREAM_FORMATS)}')
+    if fmt in ('arrow', 'parquet'):
+        try:
+            import pyarrow  # noqa
+        except ImportError:
+            raise NotAcceptable(f'format {fmt} requires pyarrow, which is not installed')
+    return fmt
+
+
+def int_arg(args, name, default=None, minimum=0):
+    """ return the query arg name as an int, or default if it is not specified
+
+    Raises:
+        BadRequest if the value is not an integer, or is less than minimum
+
+    .. versionadded:: NEXT
+    """
+    value = args.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise BadRequest(f'{name} must be an integer, got {value}')
+    if minimum is not None and value < minimum:
+        raise BadRequest(f'{name} must be >= {minimum}, got {value}')
+    return value
+
+
+def stream_dataframe(mdf, fmt, chunksize=10000):
+    """ stream the MDataFrame in the given format, chunk by chunk
+
+    Reads chunksize rows at a time from a single cursor, i.e. memory is
+    bounded by the chunksize, not the size of the dataset.
+
+    Args:
+        mdf (MDataFrame): the MDataFrame
+        fmt (str): the format, see STREAM_FORMATS
+        chunksize (int): the number of rows in each chunk
+
+    Yields:
+        str (ndjson) or bytes (arrow, parquet)
+
+    .. versionadded:: NEXT
+    """
+    frames = (mdf._get_dataframe_from_cursor(chunk)
+              for chunk in grouper(int(chunksize), mdf._get_cursor()))
+    if fmt == 'ndjson':
+        for df in frames:
+            df = df.reset_index() if any(df.index.names) else df
+            lines = df.to_json(orient='records', lines=True, date_format='iso') if len(df) else ''
+            yield lines if not lines or lines.endswith('\n') else lines + '\n'
+        return
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    sink = _StreamSink()
+    writer = schema = None
+    for df in frames:
+        table = pa.Table.from_pandas(df, schema=schema, preserve_index=True)
+        if writer is None:
+            schema = table.schema
+            writer = pa.ipc.new_stream(sink, schema) if fmt == 'arrow' else pq.ParquetWriter(sink, schema)
+        writer.write_table(table)
+        yield sink.drain()
+    if writer is None:
+        # no data, write an empty table
+        table = pa.Table.from_pandas(pd.DataFrame(columns=list(mdf.columns)), preserve_index=True)
+        writer = pa.ipc.new_stream(sink, table.schema) if fmt == 'arrow' else pq.ParquetWriter(sink, table.schema)
+        writer.write_table(table)
+    writer.close()
+    yield sink.drain()
+
+
+class _StreamSink:
+    # a write-only file-like object that collects written bytes until drained
+    def __init__(self):
+        self._buffer = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self._buffer.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def writable(self):
+        return True
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self._buffer)
+        self._buffer = []
+        return data
@@ -79,13 +79,13 @@ import os
 import shutil
 import warnings
 import weakref
-from mongoengine.connection import disconnect, connect, get_db
+from mongoengine.connection import disconnect, connect, get_db, register_connection
 from mongoengine.errors import DoesNotExist
 from mongoengine.queryset.visitor import Q
 from uuid import uuid4
 
 from omegaml.documents import make_Metadata, MDREGISTRY
-from omegaml.mongoshim import sanitize_mongo_kwargs, waitForConnection
+from omegaml.mongoshim import sanitize_mongo_kwargs, waitForConnection, mongo_clients
 from omegaml.util import load_class, extend_instance, ensure_index, PickableCollection, signature
 from omegaml.util import settings as omega_settings, urlparse
 
@@ -181,7 +181,20 @@ class OmegaStore(object):
         self._dbalias = alias = self._dbalias or 'omega-{}'.format(uuid4().hex)
         # local import of _connections ensure we get the actual object, not an earlier version
         from mongoengine.connection import _connections
-        if alias not in _connections:
+        if getattr(self.defaults, 'OMEGA_MONGO_SHARED_CLIENTS', True):
+            # use a MongoClient shared by all aliases with the same host, credentials and kwargs
+            # -- the database handle is per alias, see get_db()
+            mongo_kwargs = sanitize_mongo_kwargs(self.defaults.OMEGA_MONGO_SSL_KWARGS)
+            mongo_kwargs.setdefault('authSource', 'admin')
+            if alias not in _connections:
+                disconnect(alias)
+                register_connection(alias, db=self.database_name, host=f'{scheme}://{host}',
+                                    username=username, password=password, **mongo_kwargs)
+            _connections[alias] = mongo_clients.acquire(alias, f'{scheme}://{host}',
+                                                        username=username, password=password,
+                                                        **mongo_kwargs)
+            weakref.finalize(self, mongo_clients.release, alias)
+        elif alias not in _connections:
             # always disconnect before registering a new connection because
             # mongoengine.connect() forgets all connection settings upon disconnect
             disconnect(alias)
@@ -207,6 +220,26 @@ class OmegaStore(object):
                                                collection=self._fs_collection)
         return self._Metadata_cls
 
+    @property
+    def apply_cache(self):
+        """
+        The MDataFrame apply cache of this store's database
+
+        Usage::
+
+            om.datasets.apply_cache.stats()
+            => {'entries': 1, 'size': 1024, 'hits': 5, 'misses': 1}
+
+            om.datasets.apply_cache.sweep(force=True)
+
+        .. versionadded:: NEXT
+        """
+        from omegaml.mixins.mdf.apply import ApplyCache
+        # ensure the db alias is connected
+        self.mongodb
+        settings = getattr(self.defaults, 'OMEGA_APPLY_CACHE', None) or {}
+        return ApplyCache(self._dbalias, **settings)
+
     @property
     def fs(self):
         """
@@ -1,8 +1,11 @@
 import math
 import os
+import queue
+import threading
 from itertools import repeat
 from joblib import delayed, Parallel
 
+from omegaml.documents import MDREGISTRY
 from omegaml.runtimes.loky import OmegaRuntimeBackend
 from omegaml.util import PickableCollection
 
@@ -79,6 +82,104 @@ def fast_insert(df, omstore, name, chunksize=default_chunksize):
         omstore.collection(name).insert_many(df.to_dict(orient='records'))
 
 
+def pipelined_insert(store, df_iter, name, append=False, n_jobs=4, queue_size=None):
+    """ insert chunks of a dataframe by a pool of writer threads
+
+    Use this to insert a stream of dataframes, e.g. read from a file or
+    a database, while the next chunks are produced.
+
+    The first chunk is stored by store.put(), which creates the dataset's
+    collection, indicies and Metadata. Subsequent chunks are passed by a
+    bounded queue to n_jobs writer threads that convert and insert each
+    chunk, while df_iter produces the next chunks. Row ids are assigned in
+    order of df_iter. The Metadata is saved once after all chunks have been
+    inserted.
+
+    Args:
+        store (OmegaStore): the store
+        df_iter (iterable): an iterable of DataFrames
+        name (str): the name of the dataset
+        append (bool): if False the dataset is replaced by the first chunk
+        n_jobs (int): the number of writer threads
+        queue_size (int): the max. number of chunks waiting to be inserted,
+          defaults to 2 * n_jobs
+
+    Returns:
+        Metadata, or None if df_iter has no chunks
+
+    Raises:
+        the first exception raised by inserting a chunk. The chunk is
+        available as the exception's chunkdf attribute
+
+    .. versionadded:: NEXT
+    """
+    df_iter = iter(df_iter)
+    first = next(df_iter, None)
+    if first is None:
+        return None
+    meta = _put_chunk(store, first, name, append=append)
+    backend = store.get_backend_byobj(first, name)
+    if meta.kind != MDREGISTRY.PANDAS_DFROWS or not hasattr(backend, 'dataframe_to_documents'):
+        # not stored as documents, put every chunk
+        for chunkdf in df_iter:
+            meta = _put_chunk(store, chunkdf, name, append=True)
+        return meta
+    collection = store.collection(name)
+    row_count = collection.estimated_document_count()
+    jobs = queue.Queue(maxsize=queue_size or 2 * n_jobs)
+    errors = []
+    lock = threading.Lock()
+    # the kind_meta of the last chunk, by row id, same as with a put() for every chunk
+    last_chunk = {'row_count': -1, 'kind_meta': None}
+
+    def writer():
+        while True:
+            job = jobs.get()
+            try:
+                if job is None:
+                    return
+                if errors:
+                    # drain the queue so the reader is not blocked
+                    continue
+                chunkdf, offset = job
+                docs, kind_meta = backend.dataframe_to_documents(chunkdf, row_count=offset)
+                collection.insert_many(docs.to_dict(orient='records'), ordered=False)
+                with lock:
+                    if offset > last_chunk['row_count']:
+                        last_chunk.update(row_count=offset, kind_meta=kind_meta)
+            except Exception as e:
+                e.chunkdf = job[0]
+                errors.append(e)
+            finally:
+                jobs.task_done()
+
+    writers = [threading.Thread(target=writer, daemon=True) for i in range(n_jobs)]
+    [t.start() for t in writers]
+    try:
+        for chunkdf in df_iter:
+            if errors:
+                break
+            jobs.put((chunkdf, row_count))
+            row_count += len(chunkdf)
+    finally:
+        [jobs.put(None) for t in writers]
+        [t.join() for t in writers]
+    if errors:
+        raise errors[0]
+    if last_chunk['kind_meta'] is not None:
+        meta.kind_meta = last_chunk['kind_meta']
+        meta = meta.save()
+    return meta
+
+
+def _put_chunk(store, chunkdf, name, append=True):
+    try:
+        return store.put(chunkdf, name, append=append)
+    except Exception as e:
+        e.chunkdf = chunkdf
+        raise
+
+
 # ensure loky backend is registered
 from omegaml.runtimes.loky import OmegaRuntimeBackend  # noqa
 
@@ -0,0 +1,145 @@
+import logging
+import threading
+from collections import OrderedDict
+from time import monotonic
+
+logger = logging.getLogger(__name__)
+
+
+class MetadataCache:
+    """ process-level cache of Metadata documents
+
+    Entries are stored as the raw document and are returned as a new
+    Metadata instance on every hit, i.e. callers may modify and save the
+    returned object without affecting the cache. An entry is valid for
+    ttl seconds, and is invalidated when a Metadata document of the same
+    (collection, bucket, prefix, name) is saved or deleted in this process.
+    Changes from other processes are seen after at most ttl seconds, or
+    immediately if watch=True (requires a MongoDB replica set).
+
+    Usage::
+
+        cache = MetadataCache.instance()
+        meta = cache.get(Metadata, name, bucket, prefix)
+        if meta is None:
+            meta = Metadata.objects(...).first()
+            cache.set(Metadata, meta)
+
+    See Also:
+        MetadataCacheMixin
+
+    .. versionadded:: NEXT
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, ttl=30, maxsize=10000, watch=False):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.watch = watch
+        self.hits = 0
+        self.misses = 0
+        # key => (expires, son), key = (collection, bucket, prefix, name)
+        self._entries = OrderedDict()
+        # document id => key, to invalidate entries from change events
+        self._keys_by_id = {}
+        self._watchers = {}
+        self._lock = threading.RLock()
+
+    @classmethod
+    def instance(cls, **settings):
+        """ the process-wide cache, created with settings on first use """
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls(**settings)
+        return cls._instance
+
+    @classmethod
+    def active(cls):
+        """ the process-wide cache, or None if it was not created yet """
+        return cls._instance
+
+    def key(self, Meta, name, bucket, prefix):
+        return (Meta._get_collection().full_name, bucket, prefix, str(name))
+
+    def get(self, Meta, name, bucket, prefix):
+        key = self.key(Meta, name, bucket, prefix)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < monotonic():
+                self._pop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            son = entry[1]
+        return Meta._from_son(son)
+
+    def set(self, Meta, meta):
+        if meta is None or meta.pk is None:
+            return
+        key = self.key(Meta, meta.name, meta.bucket, meta.prefix)
+        son = meta.to_mongo()
+        self._watch(Meta) if self.watch else None
+        with self._lock:
+            self._entries[key] = (monotonic() + self.ttl, son)
+            self._entries.move_to_end(key)
+            self._keys_by_id[meta.pk] = key
+            while len(self._entries) > self.maxsize:
+                self._pop(next(iter(self._entries)))
+
+    def invalidate(self, Meta, name, bucket, prefix):
+        with self._lock:
+            self._pop(self.key(Meta, name, bucket, prefix))
+
+    def invalidate_document(self, meta):
+        """ invalidate the entry of a Metadata document that was saved or deleted """
+        self.invalidate(type(meta), meta.name, meta.bucket, meta.prefix)
+
+    def invalidate_id(self, pk):
+        with self._lock:
+            key = self._keys_by_id.get(pk)
+            self._pop(key) if key else None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_id.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'watching': sorted(name for name, t in self._watchers.items() if t.is_alive()),
+            }
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._keys_by_id.pop(entry[1].get('_id'), None)
+
+    def _watch(self, Meta):
+        # start a change stream on the metadata collection, invalidating entries by document id
+        # -- a failing change stream (e.g. no replica set) stops watching, ttl still applies
+        collection = Meta._get_collection()
+        with self._lock:
+            if collection.full_name in self._watchers:
+                return
+            watcher = threading.Thread(target=self._watch_changes, args=(collection,),
+                                       name=f'omega-metacache-{collection.full_name}', daemon=True)
+            self._watchers[collection.full_name] = watcher
+        watcher.start()
+
+    def _watch_changes(self, collection):
+        try:
+            with collection.watch() as stream:
+                for change in stream:
+                    pk = (change.get('documentKey') or {}).get('_id')
+                    if pk is not None:
+                        self.invalidate_id(pk)
+                    elif change.get('operationType') in ('drop', 'rename', 'dropDatabase', 'invalidate'):
+                        self.clear()
+        except Exception as e:
+            logger.warning(f'metadata cache stopped watching {collection.full_name}: {e}')
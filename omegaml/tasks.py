@@ -152,8 +152,18 @@ def omega_ping(task, *args, exception=False, **kwargs):
 
 @shared_task(base=OmegamlTask, bind=True)
 def omega_preload(task, *args, items=None, **kwargs):
-    """ preload models, datasets and other items into worker process """
-    pass
+    """ preload models, datasets and other items into worker process
+
+    Note this preloads models into the model cache of the worker process
+    that executes this task only.
+    """
+    from omegaml.backends.runtime.preload import RuntimeModelPreloader
+    from omegaml.backends.runtime.modelcache import model_cache
+    loaded = RuntimeModelPreloader(task.om).preload(items)
+    return sanitized({
+        'loaded': loaded,
+        'stats': model_cache.stats(),
+    })
 
 
 @worker_process_init.connect
@@ -175,3 +185,18 @@ def preload_frameworks(**kwargs):
     #      until then omegaml.defaults does this already, kept here for reference
     from omegaml import _base_config
     _base_config.load_framework_support()
+
+
+@worker_process_init.connect
+def preload_models(**kwargs):
+    # warm the model cache, if enabled and models are listed in OMEGA_MODEL_PRELOAD
+    from omegaml import _base_config
+    if not getattr(_base_config, 'OMEGA_MODEL_PRELOAD', None):
+        return
+    import omegaml as om
+    from omegaml.backends.runtime.preload import RuntimeModelPreloader
+    try:
+        RuntimeModelPreloader(om.setup()).preload()
+    except Exception as e:
+        import logging
+        logging.getLogger(__name__).error(f'could not preload models due to {e}')
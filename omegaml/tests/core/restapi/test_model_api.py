@@ -1,4 +1,6 @@
+import json
 from unittest import TestCase
+from unittest import mock
 
 import numpy as np
 import pandas as pd
@@ -55,6 +57,39 @@ class OmegaRestApiTests(OmegaTestMixin, TestCase):
         self.assertEqual(data.get('model'), 'regression')
         self.assertEqual(data.get('result'), [10.])
 
+    def test_omega_instance_pool(self):
+        from omegaml.server.restapi.util import omega_pool
+        clf = LinearRegression()
+        clf.fit(np.arange(10).reshape(-1, 1), np.arange(10) * 2)
+        self.om.models.put(clf, 'regression')
+        omega_pool.clear()
+        stats = omega_pool.stats()
+        for i in range(3):
+            resp = self.client.put('/api/v1/model/regression/predict', json={
+                'columns': ['v'],
+                'data': dict(v=[5]),
+            }, auth=self.auth, headers=self._headers)
+            self.assertEqual(resp.status_code, 200)
+        # the first request creates the instance, subsequent requests reuse it
+        self.assertEqual(omega_pool.stats()['size'], 1)
+        self.assertEqual(omega_pool.stats()['misses'] - stats['misses'], 1)
+        self.assertEqual(omega_pool.stats()['hits'] - stats['hits'], 2)
+        # each pooled instance has its own defaults
+        om = omega_pool.get(bucket=self._headers.get('bucket'), userid='someuser')
+        self.assertEqual(om.defaults.OMEGA_USERID, 'someuser')
+        self.assertIsNot(om.defaults, self.om.defaults)
+        self.assertEqual(om.bucket, self._headers.get('bucket'))
+        # the configuration is loaded once, each new instance is created once
+        import omegaml
+        omega_pool.clear()
+        with mock.patch.object(omegaml, 'setup', wraps=omegaml.setup) as setup, \
+                mock.patch.object(omega_pool, '_create', wraps=omega_pool._create) as create:
+            omega_pool.get(userid='user1')
+            omega_pool.get(userid='user2')
+            omega_pool.get(userid='user1')
+        self.assertEqual(setup.call_count, 1)
+        self.assertEqual(create.call_count, 2)
+
     def test_predict_from_dataset(self):
         X = np.arange(10).reshape(-1, 1)
         y = X * 2
@@ -129,6 +164,66 @@ class OmegaRestApiTests(OmegaTestMixin, TestCase):
         self.assertEqual(len(data['data']['x']), 10)
         self.assertEqual(len(data['data']['y']), 10)
 
+    def test_dataset_query_paginated(self):
+        om = self.om
+        df = pd.DataFrame({
+            'x': np.arange(100),
+            'y': np.arange(100),
+        })
+        om.datasets.put(df, 'test', append=False)
+        # limit and page are applied, with column projection
+        query = {'limit': 10, 'page': 2, 'columns': 'x'}
+        resp = self.client.get('/api/v1/dataset/test', query_string=query,
+                               auth=self.auth, headers=self._headers)
+        self.assertEqual(resp.status_code, 200)
+        data = resp.get_json()
+        self.assertEqual(list(data['data']['x'].values()), list(range(10, 20)))
+        self.assertNotIn('y', data['data'])
+        # keyset pagination
+        rows, after = [], None
+        while True:
+            query = {'limit': 30, **({'after': after} if after is not None else {})}
+            resp = self.client.get('/api/v1/dataset/test', query_string=query,
+                                   auth=self.auth, headers=self._headers)
+            rows.extend(resp.get_json()['data']['x'].values())
+            after = resp.headers.get('X-Next-After')
+            if after is None:
+                break
+        self.assertEqual(rows, list(range(100)))
+        # a page that ends at the last row has no next page
+        resp = self.client.get('/api/v1/dataset/test', query_string={'limit': 50, 'page': 2},
+                               auth=self.auth, headers=self._headers)
+        self.assertEqual(len(resp.get_json()['data']['x']), 50)
+        self.assertIsNone(resp.headers.get('X-Next-After'))
+        # invalid pagination args are rejected
+        for query in ({'limit': 'ten'}, {'after': 'x'}, {'skip': -1}):
+            resp = self.client.get('/api/v1/dataset/test', query_string=query,
+                                   auth=self.auth, headers=self._headers)
+            self.assertEqual(resp.status_code, 400)
+
+    def test_dataset_query_ndjson(self):
+        om = self.om
+        df = pd.DataFrame({
+            'x': np.arange(100),
+            'y': np.arange(100) * 1.5,
+        })
+        om.datasets.put(df, 'test', append=False)
+        headers = dict(self._headers, Accept='application/x-ndjson')
+        query = {'x__gte': 50, 'chunksize': 7}
+        resp = self.client.get('/api/v1/dataset/test', query_string=query,
+                               auth=self.auth, headers=headers)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.content_type, 'application/x-ndjson')
+        lines = resp.get_data(as_text=True).splitlines()
+        self.assertEqual(len(lines), 50)
+        records = [json.loads(line) for line in lines]
+        self.assertEqual([r['x'] for r in records], list(range(50, 100)))
+        self.assertEqual(records[0]['y'], 75.0)
+        # unknown formats are rejected
+        resp = self.client.get('/api/v1/dataset/test', query_string={'format': 'xml'},
+                               auth=self.auth, headers=self._headers)
+        self.assertEqual(resp.status_code, 406)
+
     def test_dataset_put(self):
         om = self.om
         om.datasets.drop('foo', force=True)
@@ -313,3 +313,47 @@ class DataRevisionMixinTests(OmegaTestMixin, unittest.TestCase):
             om.datasets.put(df_a, 'revtest', revisions=True)
         self.assertEquals(str(cm.exception),
                           "adding revisions to existing dataset revtest is not supported")
+
+    def test_revisions_snapshots(self):
+        om = self.om
+        om.defaults.OMEGA_DATA_REVISIONS = dict(om.defaults.OMEGA_DATA_REVISIONS,
+                                                snapshot_interval=2)
+        df_a = pd.DataFrame({
+            'x': range(0, 10),
+        })
+        om.datasets.put(df_a, 'revtest', append=False, revisions=True)
+        # revision 1, delete 5-7
+        om.datasets.put(df_a.iloc[5:8], 'revtest', delete=True)
+        # revision 2, update 0-1, snapshot
+        df_c = pd.DataFrame({
+            'x': [100, 101],
+        }, index=[0, 1])
+        om.datasets.put(df_c, 'revtest')
+        # revision 3, re-add 6
+        df_d = pd.DataFrame({
+            'x': [106],
+        }, index=[6])
+        om.datasets.put(df_d, 'revtest')
+        # revision 4, update 9, snapshot
+        df_e = pd.DataFrame({
+            'x': [109],
+        }, index=[9])
+        meta = om.datasets.put(df_e, 'revtest')
+        self.assertEqual(meta.kind_meta['revisions']['snapshots'], [2, 4])
+        # check revisions are the same as applying all changes
+        expected = df_a.drop(index=[5, 6, 7])
+        expected.loc[[0, 1], 'x'] = [100, 101]
+        dfx = om.datasets.get('revtest', revision=2)
+        assert_frame_equal(dfx, expected)
+        expected = pd.DataFrame({
+            'x': [100, 101, 2, 3, 4, 106, 8, 9],
+        }, index=[0, 1, 2, 3, 4, 6, 8, 9])
+        dfx = om.datasets.get('revtest', revision=3)
+        assert_frame_equal(dfx, expected)
+        expected.loc[9, 'x'] = 109
+        dfx = om.datasets.get('revtest', revision=4, trace_revisions=True)
+        assert_frame_equal(dfx[['x']], df_a.assign(x=[100, 101, 2, 3, 4, 5, 106, 7, 8, 109]))
+        self.assertTrue(dfx.loc[[5, 7], '_delete_'].all())
+        # latest revision is the same
+        dfx = om.datasets.get('revtest', revision=-1)
+        assert_frame_equal(dfx.sort_index(), expected)
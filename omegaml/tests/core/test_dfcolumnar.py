@@ -0,0 +1,76 @@
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from omegaml import Omega
+from omegaml.backends.dfcolumnar import PandasColumnarBackend
+from omegaml.tests.util import OmegaTestMixin
+
+
+class PandasColumnarBackendTests(OmegaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.om = Omega()
+        self.clean()
+
+    def _make_df(self, n=1000):
+        df = pd.DataFrame({
+            'x': np.arange(n),
+            'y': np.random.rand(n),
+            's': ['s{}'.format(i) for i in range(n)],
+            't': pd.date_range('2020-01-01', periods=n, freq='h', tz='UTC'),
+        })
+        df.index = pd.Index(np.arange(n) * 2, name='key')
+        return df
+
+    def test_put_get(self):
+        om = self.om
+        df = self._make_df()
+        meta = om.datasets.put(df, 'columnar', as_columnar=True, chunksize=100)
+        self.assertEqual(meta.kind, PandasColumnarBackend.KIND)
+        self.assertEqual(meta.kind_meta['rows'], len(df))
+        self.assertEqual(meta.kind_meta['chunkrows'], 100)
+        dfx = om.datasets.get('columnar')
+        pd.testing.assert_frame_equal(dfx, df)
+        # chunks are stored per column
+        coll = om.datasets.collection('columnar')
+        self.assertEqual(coll.count_documents({}), 10 * len(df.columns) + 10)
+
+    def test_projection_rows(self):
+        om = self.om
+        df = self._make_df()
+        om.datasets.put(df, 'columnar', as_columnar=True, chunksize=100)
+        dfx = om.datasets.get('columnar', columns=['y'], rows=slice(150, 420))
+        pd.testing.assert_frame_equal(dfx, df[['y']].iloc[150:420])
+        dfx = om.datasets.get('columnar', rows=(950, None))
+        pd.testing.assert_frame_equal(dfx, df.iloc[950:])
+
+    def test_filter(self):
+        om = self.om
+        df = self._make_df()
+        om.datasets.put(df, 'columnar', as_columnar=True, chunksize=100)
+        dfx = om.datasets.get('columnar', x__gte=500, x__lt=520)
+        pd.testing.assert_frame_equal(dfx, df[(df.x >= 500) & (df.x < 520)])
+        dfx = om.datasets.get('columnar', filter={'x': {'gt': 10, 'lte': 12}})
+        pd.testing.assert_frame_equal(dfx, df[(df.x > 10) & (df.x <= 12)])
+        with self.assertRaises(ValueError):
+            om.datasets.get('columnar', x__in=[1, 2])
+
+    def test_append_chunked(self):
+        om = self.om
+        df = self._make_df()
+        om.datasets.put(df, 'columnar', as_columnar=True, chunksize=100)
+        meta = om.datasets.put(df, 'columnar', as_columnar=True, append=True)
+        self.assertEqual(meta.kind_meta['rows'], 2 * len(df))
+        dfx = om.datasets.get('columnar')
+        pd.testing.assert_frame_equal(dfx, pd.concat([df, df]))
+        chunks = list(om.datasets.get('columnar', chunksize=300))
+        self.assertEqual(len(chunks), 7)
+        self.assertEqual(sum(len(c) for c in chunks), 2 * len(df))
+        # replace
+        meta = om.datasets.put(df, 'columnar', as_columnar=True, append=False)
+        self.assertEqual(meta.kind_meta['rows'], len(df))
+        # appending different columns is not supported
+        with self.assertRaises(ValueError):
+            om.datasets.put(df[['x']], 'columnar', as_columnar=True, append=True)
@@ -53,5 +53,26 @@ class IOToolsMixinTests(OmegaTestMixin, unittest.TestCase):
         om.datasets.to_csv('testdf', fn)
         self.assertTrue(os.path.exists(fn))
 
-
-
+    def test_readcsv_pipelined(self):
+        om = self.om
+        df = pd.DataFrame({
+            'x': range(1000),
+            'y': [str(v) for v in range(1000)],
+        })
+        fn = '/tmp/testdf.csv'
+        df.to_csv(fn, index=False)
+        # pipelined, with apply
+        def myfunc(df):
+            df['z'] = df['x'] * 2
+        mdf = om.datasets.read_csv(fn, 'testdf', chunksize=70, n_jobs=4, apply=myfunc, dtype={'y': str})
+        dfx = mdf.value
+        self.assertEqual(len(dfx), 1000)
+        self.assertEqual(list(dfx['x']), list(range(1000)))
+        self.assertEqual(list(dfx['y']), [str(v) for v in range(1000)])
+        self.assertEqual(list(dfx['z']), [v * 2 for v in range(1000)])
+        # sequential, same result
+        mdf = om.datasets.read_csv(fn, 'testdf_seq', chunksize=70, n_jobs=1, apply=myfunc, dtype={'y': str})
+        assert_frame_equal(mdf.value, om.datasets.get('testdf'))
+        # append
+        om.datasets.read_csv(fn, 'testdf', chunksize=70, n_jobs=4, append=True, dtype={'y': str})
+        self.assertEqual(len(om.datasets.get('testdf')), 2000)
@@ -1,9 +1,13 @@
+import time
 from unittest import TestCase
+from uuid import uuid4
 
 import pandas as pd
+from numpy.testing import assert_allclose
 from pandas.testing import assert_frame_equal, assert_series_equal
 
 from omegaml import Omega
+from omegaml.mongoshim import server_version
 
 
 class MDataFrameMixinTests(TestCase):
@@ -416,20 +420,24 @@ class MDataFrameMixinTests(TestCase):
         expected = df.groupby('x').agg(dict(v=['sum', 'mean', 'std']))
         self.assertIsNotNone(cache_key)
         self.assertIsNotNone(cursor)
-        # replace the data to supersede the cache, without resetting the cache
+        # evaluate the groupby, expected results are taken from cache
+        value = mdf.apply(lambda v: v.groupby('x').agg(v=['sum', 'mean', 'std'])).value
+        self.assertEqual(list(expected[('v', 'sum')].values), list(value['v_sum'].values))
+        self.assertEqual(list(expected[('v', 'mean')].values), list(value['v_avg'].values))
+        self.assertEqual(list(expected[('v', 'std')].values), list(value['v_std'].values))
+        # replace the data, this supersedes the cache without resetting the cache
         df = pd.DataFrame({
             'x': ['abc', 'def'] * 5,
             'v': range(17, 27),
         })
         df['v'] = df['v'] / 2
         om.datasets.put(df, 'sample', append=False)
-        # evaluate the groupby, expected results are taken from cache since we did not reset the cache
-        mdf = mdf.apply(lambda v: v.groupby('x').agg(v=['sum', 'mean', 'std'])).value
-        self.assertEqual(list(expected[('v', 'sum')].values), list(mdf['v_sum'].values))
-        self.assertEqual(list(expected[('v', 'mean')].values), list(mdf['v_avg'].values))
-        self.assertEqual(list(expected[('v', 'std')].values), list(mdf['v_std'].values))
-        # finally reset cache
         mdf = om.datasets.getl('sample')
+        cursor = mdf.apply(lambda v: v.groupby('x').agg(v=['sum', 'mean', 'std']))._get_cached_cursor()
+        self.assertIsNone(cursor)
+        value = mdf.apply(lambda v: v.groupby('x').agg(v=['sum', 'mean', 'std'])).value
+        self.assertNotEqual(list(expected[('v', 'sum')].values), list(value['v_sum'].values))
+        # finally reset cache
         mdf = mdf.apply(lambda v: v.groupby('x').agg(v=['sum', 'mean', 'std'])).reset_cache()
         # check reset was successful
         cursor = mdf.apply(lambda v: v.groupby('x').agg(v=['sum', 'mean', 'std']))._get_cached_cursor()
@@ -449,6 +457,42 @@ class MDataFrameMixinTests(TestCase):
         cursor = mdf.apply(lambda v: v.groupby('x').agg(v=['sum', 'mean', 'std']))._get_cached_cursor()
         self.assertIsNone(cursor)
 
+    def test_apply_cache_lifecycle(self):
+        """
+        test apply cache expiry, size budget, orphans and stats
+        """
+        om = self.om
+        df = pd.DataFrame({
+            'x': ['abc', 'def'] * 5,
+            'v': range(7, 17),
+        })
+        om.datasets.put(df, 'sample', append=False)
+        cache = om.datasets.apply_cache
+        cache.sweep(force=True)
+        mdf = om.datasets.getl('sample')
+        groupby = lambda v: v.groupby('x').agg(v=['sum', 'mean', 'std'])
+        mdf.apply(groupby).reset_cache().persist()
+        stats = cache.stats()
+        self.assertEqual(stats['entries'], 1)
+        self.assertIsNotNone(mdf.apply(groupby)._get_cached_cursor())
+        self.assertEqual(cache.stats()['hits'], stats['hits'] + 1)
+        # orphaned result collections are dropped after the grace period
+        db = om.datasets.mongodb
+        db['cache_1_{}'.format(uuid4().hex)].insert_one({'foo': 'bar'})
+        db['cache_{}_{}'.format(int(time.time()), uuid4().hex)].insert_one({'foo': 'bar'})
+        cache.sweep(force=True)
+        results = db.list_collection_names(filter={'name': {'$regex': '^cache_'}})
+        self.assertEqual(len(results), 2)
+        # expired entries are removed along with their result collection
+        expired = om.datasets.apply_cache
+        expired.ttl = 0.001
+        time.sleep(.01)
+        expired.sweep(force=True)
+        self.assertEqual(cache.stats()['entries'], 0)
+        self.assertIsNone(mdf.apply(groupby)._get_cached_cursor())
+        results = db.list_collection_names(filter={'name': {'$regex': '^cache_'}})
+        self.assertEqual(len(results), 1)
+
     def test_apply_quantile(self):
         """
         test covariance
@@ -460,10 +504,22 @@ class MDataFrameMixinTests(TestCase):
         })
         om.datasets.put(df, 'qtest', append=False)
         mdf = om.datasets.getl('qtest')
-        result = mdf.quantile([.1, .2]).value
+        result = mdf.quantile([.1, .2], method='exact').value
         # FIXME this is actually wrong, see df.quantile([.1, .2])
         self.assertListEqual(list(result.loc['p0.1'].values), [100, 100])
         self.assertListEqual(list(result.loc['p0.2'].values), [200, 200])
+        # approximate methods, all columns and quantiles in one pass
+        expected = df.quantile([.1, .2])
+        methods = ['sketch'] + (['approximate'] if server_version(mdf.collection) >= (7, 0) else [])
+        for method in methods:
+            result = mdf.quantile([.1, .2], method=method).value
+            assert_allclose(result.loc['p0.1'].values, expected.loc[.1].values, rtol=.02)
+            assert_allclose(result.loc['p0.2'].values, expected.loc[.2].values, rtol=.02)
+        # default method, with filter
+        result = mdf.query(x__gte=500).quantile(.5).value
+        assert_allclose(result.loc['p0.5'].values, [749.5, 749.5], rtol=.02)
+        with self.assertRaises(ValueError):
+            mdf.quantile(.5, method='unknown')
 
     def test_apply_covariance(self):
         """
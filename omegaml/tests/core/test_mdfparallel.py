@@ -136,3 +136,50 @@ class ParallelMixinTests(OmegaTestMixin, TestCase):
         large['y'] = large['x'] * 2
         self.assertEqual(len(dfx), len(large))
         assert_frame_equal(dfx.reset_index(), large.reset_index())
+
+    def test_parallel_rowid_chunks(self):
+        """
+        test default chunker uses _om#rowid ranges
+        """
+        om = self.om
+        large = pd.DataFrame({
+            'x': range(1050)
+        })
+        om.datasets.put(large, 'largedf', append=False)
+        mdf = om.datasets.getl('largedf')
+        # dense row ids, ranges are computed from min/max
+        ranges = mdf._rowid_ranges(mdf, 100, len(mdf))
+        self.assertEqual(len(ranges), 11)
+        self.assertEqual(ranges[0], (0, 100))
+        self.assertEqual(ranges[-1], (1000, 1050))
+        chunks = list(mdf._chunker(mdf, 100, len(mdf)))
+        self.assertEqual(sum(len(chunk.value) for chunk in chunks), len(large))
+        # filtered, ranges are computed by $bucketAuto
+        fmdf = mdf.query(x__gte=10, x__lt=1000)
+        ranges = fmdf._rowid_ranges(fmdf, 100, len(fmdf))
+        self.assertEqual(len(ranges), 10)
+        chunks = list(fmdf._chunker(fmdf, 100, len(fmdf)))
+        self.assertTrue(all(len(chunk.value) <= 100 for chunk in chunks))
+        self.assertEqual(sum(len(chunk.value) for chunk in chunks), 990)
+        # sorted mdf falls back to positional chunks
+        self.assertIsNone(mdf.sort('-x')._rowid_ranges(mdf, 100, len(mdf)))
+
+    def test_parallel_filtered(self):
+        """
+        parallel processing of a filtered mdf
+        """
+        om = self.om
+        large = pd.DataFrame({
+            'x': range(1000)
+        })
+
+        def myfunc(df):
+            df['y'] = df['x'] * 2
+
+        om.datasets.put(large, 'largedf', append=False)
+        mdf = om.datasets.getl('largedf').query(x__gte=100)
+        dfx = mdf.transform(myfunc, chunksize=100).value
+        expected = large[large.x >= 100].copy()
+        expected['y'] = expected['x'] * 2
+        assert_frame_equal(dfx.sort_values('x').reset_index(drop=True),
+                           expected.reset_index(drop=True))
@@ -1,7 +1,7 @@
 import unittest
 
 from omegaml.defaults import update_from_obj
-from omegaml.util import ensure_json_serializable
+from omegaml.util import ensure_json_serializable, CacheCounters
 
 
 class MiscTests(unittest.TestCase):
@@ -78,6 +78,22 @@ class MiscTests(unittest.TestCase):
         parsed = ensure_json_serializable(d)
         self.assertEqual(parsed, d)
 
+    def test_cache_counters(self):
+        counters = CacheCounters()
+        self.assertEqual(counters.get('foo'), {'hits': 0, 'misses': 0})
+        counters.count('foo', hits=2, misses=1)
+        counters.count('foo', hits=1)
+        self.assertEqual(counters.get('foo'), {'hits': 3, 'misses': 1})
+        self.assertEqual(counters.get('bar'), {'hits': 0, 'misses': 0})
+        counters.reset('foo')
+        self.assertEqual(counters.get('foo'), {'hits': 0, 'misses': 0})
+        # sweeps are due once per interval, unless forced
+        self.assertTrue(counters.sweep_due('foo', 300))
+        self.assertFalse(counters.sweep_due('foo', 300))
+        self.assertTrue(counters.sweep_due('bar', 300))
+        self.assertTrue(counters.sweep_due('foo', 300, force=True))
+        self.assertTrue(counters.sweep_due('foo', 0))
+
 
 if __name__ == '__main__':
     unittest.main()
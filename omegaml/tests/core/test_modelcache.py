@@ -0,0 +1,100 @@
+import pickle
+from types import SimpleNamespace
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+
+from omegaml import Omega
+from omegaml.backends.runtime.modelcache import model_cache
+from omegaml.backends.runtime.preload import RuntimeModelPreloader
+from omegaml.tests.util import OmegaTestMixin
+
+
+class ModelCacheTests(OmegaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.om = Omega()
+        self.clean()
+        self._cache_settings = self.om.defaults.OMEGA_MODEL_CACHE
+        self.om.defaults.OMEGA_MODEL_CACHE = {'enabled': True, 'maxbytes': 1024 ** 2}
+        model_cache.clear()
+
+    def tearDown(self):
+        self.om.defaults.OMEGA_MODEL_CACHE = self._cache_settings
+        model_cache.clear()
+        super().tearDown()
+
+    def _make_model(self):
+        df = pd.DataFrame({'x': np.arange(10), 'y': np.arange(10) * 2})
+        lr = LinearRegression()
+        lr.fit(df[['x']], df['y'])
+        return lr, df
+
+    def test_cache_hit_miss(self):
+        om = self.om
+        lr, df = self._make_model()
+        om.models.put(lr, 'mymodel')
+        model = model_cache.get(om.models, 'mymodel')
+        self.assertIs(model_cache.get(om.models, 'mymodel'), model)
+        stats = model_cache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['count'], 1)
+        self.assertGreater(stats['size'], 0)
+        # updating the model invalidates the cache
+        om.models.put(lr, 'mymodel')
+        self.assertIsNot(model_cache.get(om.models, 'mymodel'), model)
+        self.assertEqual(model_cache.stats()['misses'], 2)
+        # dropping the model removes it from the cache
+        om.models.drop('mymodel')
+        self.assertEqual(model_cache.stats()['count'], 0)
+        self.assertIsNone(model_cache.get(om.models, 'mymodel'))
+
+    def test_cache_disabled(self):
+        om = self.om
+        om.defaults.OMEGA_MODEL_CACHE = {'enabled': False}
+        lr, df = self._make_model()
+        om.models.put(lr, 'mymodel')
+        model = model_cache.get(om.models, 'mymodel')
+        self.assertIsNot(model_cache.get(om.models, 'mymodel'), model)
+        self.assertEqual(model_cache.stats()['count'], 0)
+
+    def test_cache_maxbytes(self):
+        om = self.om
+        lr, df = self._make_model()
+        om.models.put(lr, 'mymodel')
+        om.defaults.OMEGA_MODEL_CACHE = {'enabled': True, 'maxbytes': 1}
+        model_cache.get(om.models, 'mymodel')
+        self.assertEqual(model_cache.stats()['count'], 0)
+
+    def test_cache_size_without_gridfile(self):
+        # models not stored as a file count against maxbytes by their pickled size
+        lr, df = self._make_model()
+        meta = SimpleNamespace(gridfile=None)
+        self.assertEqual(model_cache._size(meta, lr), len(pickle.dumps(lr, protocol=pickle.HIGHEST_PROTOCOL)))
+        self.assertGreater(model_cache._size(meta, lambda x: x), 0)
+
+    def test_runtime_predict_cached(self):
+        om = self.om
+        lr, df = self._make_model()
+        om.models.put(lr, 'mymodel')
+        om.datasets.put(df[['x']], 'datax')
+        for i in range(3):
+            result = om.runtime.model('mymodel').predict('datax').get()
+            np.testing.assert_array_almost_equal(result, lr.predict(df[['x']]))
+        stats = model_cache.stats()
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hits'], 2)
+
+    def test_preload(self):
+        om = self.om
+        lr, df = self._make_model()
+        om.models.put(lr, 'mymodel')
+        om.models.put(lr, 'othermodel')
+        loaded = RuntimeModelPreloader(om).preload(['mymodel', 'other*'])
+        self.assertEqual(loaded, {'mymodel': True, 'othermodel': True})
+        self.assertEqual(model_cache.stats()['count'], 2)
+        result = om.runtime.task('omegaml.tasks.omega_preload').run(items=['mymodel']).get()
+        self.assertEqual(result['loaded'], {'mymodel': True})
@@ -7,6 +7,7 @@ from numpy import random
 from omegaml.backends.monitoring.alerting import AlertRule
 from omegaml.backends.monitoring.datadrift import DataDriftMonitor
 from omegaml.backends.monitoring.modeldrift import ModelDriftMonitor
+from omegaml.backends.monitoring.sketches import NumericSketch
 from omegaml.backends.monitoring.stats import DriftStats, DriftStatsSeries, DriftStatsCalc
 from omegaml.backends.virtualobj import virtualobj
 from omegaml.tests.util import OmegaTestMixin, dict_almost_equal
@@ -827,6 +828,55 @@ class DriftMonitoringTests(OmegaTestMixin, TestCase):
             corr_stored = stats.baseline().corr(method=method)
             assert_frame_equal(corr_stored, corr_expected)
 
+    def test_snapshot_chunked(self):
+        om = self.om
+        with om.runtime.experiment('test') as exp:
+            mon = DataDriftMonitor('gapminder', store=om.datasets, tracking=exp)
+            mon.clear(force=True)
+            expected = mon.snapshot('gapminder', logged=False)
+            snapshot = mon.snapshot('gapminder', chunksize=100, correlate=True)
+        self.assertEqual(snapshot['info']['len'], expected['info']['len'])
+        self.assertEqual(sorted(snapshot['info']['num_columns']), sorted(expected['info']['num_columns']))
+        self.assertEqual(sorted(snapshot['info']['cat_columns']), sorted(expected['info']['cat_columns']))
+        # exact statistics
+        for col in expected['info']['num_columns']:
+            for stat in ('mean', 'std', 'var', 'min', 'max', 'missing', 'bins'):
+                np.testing.assert_allclose(snapshot['stats'][col][stat], expected['stats'][col][stat], rtol=1e-6)
+            self.assertEqual(snapshot['stats'][col]['hist'][0].sum(), len(self.df))
+            self.assertIsNone(snapshot['stats'][col]['corr']['spearman'])
+        self.assertEqual(snapshot['stats']['continent']['groups'], expected['stats']['continent']['groups'])
+        # approximate statistics
+        quantiles, probs = snapshot['stats']['lifeExp']['percentiles']
+        expected_quantiles = self.df['lifeExp'].quantile(probs).values
+        np.testing.assert_allclose(quantiles, expected_quantiles, rtol=0.02)
+        corr = self.df[['lifeExp', 'gdpPercap']].corr().loc['lifeExp', 'gdpPercap']
+        self.assertAlmostEqual(snapshot['stats']['lifeExp']['corr']['pearson']['gdpPercap'], corr, places=5)
+        # snapshots can be compared to non-chunked snapshots
+        mon.snapshot('gapminder')
+        stats = mon.compare(raw=True)
+        self.assertIn('stats', stats[0])
+        # groupby is supported
+        snapshot = mon.snapshot(self.df, chunksize=500, groupby='continent', logged=False)
+        self.assertIn('lifeExp_Europe', snapshot['stats'])
+
+    def test_sketch_histogram(self):
+        # approximate histograms have the same edges and total as np.histogram
+        values = pd.Series(random.default_rng(42).normal(size=1704))
+        sketch = NumericSketch()
+        for i in range(0, len(values), 100):
+            sketch.update(values.iloc[i:i + 100])
+        counts, edges = sketch.stats([.5], 10)['hist']
+        expected_counts, expected_edges = np.histogram(values, bins=10)
+        self.assertEqual(counts.sum(), len(values))
+        np.testing.assert_allclose(edges, expected_edges)
+        # constant values fall into the middle bin of edges min-0.5, max+0.5
+        sketch = NumericSketch().update(pd.Series([5.0] * 10))
+        stats = sketch.stats([.5], 10)
+        expected_counts, expected_edges = np.histogram([5.0] * 10, bins=10)
+        np.testing.assert_array_equal(stats['hist'][0], expected_counts)
+        np.testing.assert_allclose(stats['hist'][1], expected_edges)
+        self.assertTrue(np.isfinite(stats['pdf'][0]).all())
+
     def test_multilevel_naming(self):
         # test fix issue #452
         om = self.om
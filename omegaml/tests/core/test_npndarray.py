@@ -1,3 +1,5 @@
+import os
+import tempfile
 from unittest import TestCase
 
 import numpy as np
@@ -28,3 +30,38 @@ class NumpyNDArrayBackendTests(OmegaTestMixin, TestCase):
         self.assertIsNotNone(data)
         self.assertEqual(data.shape, arr.shape)
         self.assertEqual(data.dtype, arr.dtype)
+
+    def test_lazy_partial_read(self):
+        om = self.om
+        arr = np.random.rand(1000, 16)
+        om.datasets.put(arr, 'ndarray-test')
+        lazy = om.datasets.get('ndarray-test', lazy=True)
+        self.assertEqual(lazy.shape, arr.shape)
+        self.assertEqual(lazy.dtype, arr.dtype)
+        np.testing.assert_array_equal(lazy[100:200], arr[100:200])
+        np.testing.assert_array_equal(lazy[::-7], arr[::-7])
+        np.testing.assert_array_equal(lazy[5, 2:4], arr[5, 2:4])
+        np.testing.assert_array_equal(lazy[-1], arr[-1])
+        np.testing.assert_array_equal(np.asarray(lazy), arr)
+
+    def test_local_cache(self):
+        om = self.om
+        self.addCleanup(setattr, om.defaults, 'OMEGA_NDARRAY_CACHE', om.defaults.OMEGA_NDARRAY_CACHE)
+        with tempfile.TemporaryDirectory() as path:
+            om.defaults.OMEGA_NDARRAY_CACHE = {'enabled': True, 'path': path, 'maxbytes': 10 * 1024 ** 2}
+            arr = np.random.rand(1000, 16)
+            meta = om.datasets.put(arr, 'ndarray-test')
+            data = om.datasets.get('ndarray-test')
+            self.assertIsInstance(data, np.memmap)
+            self.assertFalse(data.flags.writeable)
+            np.testing.assert_array_equal(data, arr)
+            self.assertTrue(os.path.exists(os.path.join(path, meta.kind_meta['md5'] + '.npy')))
+            # updated arrays are cached by their new contents
+            om.datasets.put(arr * 2, 'ndarray-test')
+            np.testing.assert_array_equal(om.datasets.get('ndarray-test'), arr * 2)
+            self.assertEqual(len(os.listdir(path)), 2)
+            # least recently used files are removed
+            om.defaults.OMEGA_NDARRAY_CACHE['maxbytes'] = arr.nbytes + 1024
+            om.datasets.put(arr * 3, 'ndarray-test')
+            np.testing.assert_array_equal(om.datasets.get('ndarray-test'), arr * 3)
+            self.assertEqual(len(os.listdir(path)), 1)
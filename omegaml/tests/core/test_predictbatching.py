@@ -0,0 +1,68 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase, mock
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+
+from omegaml import Omega
+from omegaml.backends.restapi.batching import PredictBatcher
+from omegaml.tests.util import OmegaTestMixin
+from omegaml.util import DefaultsContext
+
+
+class PredictBatchingTests(OmegaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.om = Omega()
+        self.clean()
+        self._batching_settings = self.om.defaults.OMEGA_PREDICT_BATCHING
+        self.om.defaults.OMEGA_PREDICT_BATCHING = {'enabled': True, 'window': 0.5, 'max_batch_size': 8}
+
+    def tearDown(self):
+        self.om.defaults.OMEGA_PREDICT_BATCHING = self._batching_settings
+        super().tearDown()
+
+    def test_predict_batched(self):
+        om = self.om
+        df = pd.DataFrame({'x': np.arange(10), 'y': np.arange(10) * 2})
+        lr = LinearRegression()
+        lr.fit(df[['x']], df['y'])
+        om.models.put(lr, 'mymodel')
+        batcher = PredictBatcher()
+        requests = [pd.DataFrame({'x': [i, i + 1]}) for i in range(8)]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda df: batcher.predict(om, 'mymodel', df), requests))
+        # each request gets its own predictions
+        for df, result in zip(requests, results):
+            np.testing.assert_allclose(np.asarray(result).flatten(), lr.predict(df))
+        # requests were batched up to max_batch_size rows
+        stats = batcher.stats()
+        self.assertEqual(stats['requests'], 8)
+        self.assertEqual(stats['rows'], 16)
+        self.assertLess(stats['batches'], 8)
+        self.assertLessEqual(stats['max_batch_size'], 4)
+        # disabled batching calls the model directly
+        om.defaults.OMEGA_PREDICT_BATCHING = {'enabled': False}
+        result = batcher.predict(om, 'mymodel', requests[0])
+        np.testing.assert_allclose(np.asarray(result).flatten(), lr.predict(requests[0]))
+        self.assertEqual(batcher.stats()['requests'], 8)
+
+    def test_predict_batched_index_and_user(self):
+        om = self.om
+        batcher = PredictBatcher()
+        requests = [pd.DataFrame({'x': [i, i + 1]}) for i in range(4)]
+        model = mock.MagicMock()
+        model.predict.side_effect = lambda df: mock.MagicMock(get=lambda: df['x'] * 2)
+        with mock.patch.object(type(om.runtime), 'model', return_value=model):
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                results = list(pool.map(lambda df: batcher.predict(om, 'mymodel', df), requests))
+        # each request gets a result indexed from 0, as if predicted alone
+        for df, result in zip(requests, results):
+            self.assertEqual(list(result.index), [0, 1])
+            self.assertEqual(list(result), list(df['x'] * 2))
+        # requests of different users are not batched together
+        other = om._clone(defaults=DefaultsContext(om.defaults))
+        other.defaults.OMEGA_USERID = 'otheruser'
+        df = requests[0]
+        self.assertNotEqual(batcher._key(om, 'mymodel', df), batcher._key(other, 'mymodel', df))
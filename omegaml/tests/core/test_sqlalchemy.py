@@ -171,6 +171,33 @@ class SQLAlchemyBackendTests(OmegaTestMixin, TestCase):
         dfx = om.datasets.get('foobar_copy')
         assert_frame_equal(dfx, df)
 
+    def test_put_copy_from_connection_partitioned(self):
+        """
+        copy from a sqlalchemy connection reading ranges concurrently
+        """
+        om = self.om
+        cnx_str = 'sqlite:///test.db'
+        engine = create_engine(cnx_str)
+        cnx = engine.connect()
+        df = pd.DataFrame({
+            'x': range(1000),
+            'y': [None if i % 100 == 0 else i for i in range(1000)],
+        })
+        df.to_sql('foobar', cnx, if_exists='replace', index=False)
+        om.datasets.put(cnx_str, 'foobar_copy',
+                        copy=True,
+                        sql='select * from foobar',
+                        partition_column='y',
+                        partitions=3,
+                        chunksize=100,
+                        kind=SQLAlchemyBackend.KIND)
+        meta = om.datasets.metadata('foobar_copy')
+        self.assertEqual(meta.kind, 'pandas.dfrows')
+        self.assertNotIn('partition_column', meta.kind_meta.get('kwargs', {}))
+        # rows are inserted in the order they are read
+        dfx = om.datasets.get('foobar_copy').sort_values('x').reset_index(drop=True)
+        assert_frame_equal(dfx, df)
+
     def test_put_connection_with_sql_no_index(self):
         """
         store sql alchemy connection to specific query
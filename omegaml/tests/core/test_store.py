@@ -160,6 +160,23 @@ class StoreTests(unittest.TestCase):
         result2 = lr2.predict(X)
         self.assertTrue((result == result2).all())
 
+    def test_shared_mongoclient(self):
+        from omegaml.mongoshim import mongo_clients
+        store = self._make_store(prefix='')
+        other = self._make_store(prefix='')
+        # each store has its own alias, sharing the same client
+        self.assertNotEqual(store._dbalias, other._dbalias)
+        self.assertIs(store.mongodb.client, other.mongodb.client)
+        self.assertEqual(store.mongodb.name, other.mongodb.name)
+        stats = {s['host']: s for s in mongo_clients.stats()}
+        self.assertTrue(any(s['aliases'] >= 2 and s['refs'] >= 2 for s in stats.values()))
+        self.assertNotIn('foobar', str(stats))
+        # dropping a store releases its reference
+        refs = sum(s['refs'] for s in mongo_clients.stats())
+        del other
+        gc.collect()
+        self.assertEqual(sum(s['refs'] for s in mongo_clients.stats()), refs - 1)
+
     def test_put_dataframe(self):
         # create some dataframe
         df = pd.DataFrame({
@@ -198,6 +215,52 @@ class StoreTests(unittest.TestCase):
         df2 = store.get('mydata')
         self.assertTrue(df.equals(df2), "expected dataframes to be equal")
 
+    def test_get_dataframe_parallel_readers(self):
+        df = pd.DataFrame({
+            'a': list(range(0, int(1e4 + 1))),
+            'b': [float(v) for v in range(0, int(1e4 + 1))],
+            'c': ['x{}'.format(v % 10) for v in range(0, int(1e4 + 1))],
+        })
+        store = self._make_store(prefix='')
+        self.addCleanup(setattr, store.defaults, 'OMEGA_DATAFRAME_READERS', store.defaults.OMEGA_DATAFRAME_READERS)
+        store.put(df, 'mydata')
+        # read by parallel cursors
+        store.defaults.OMEGA_DATAFRAME_READERS = {'n_jobs': 4, 'min_rows': 0, 'chunksize': 1000}
+        df2 = store.get('mydata')
+        assert_frame_equal(df, df2)
+        df2 = store.get('mydata', a__gte=5000)
+        assert_frame_equal(df[df.a >= 5000], df2)
+        # read by a single cursor
+        store.defaults.OMEGA_DATAFRAME_READERS = {'n_jobs': 1}
+        df2 = store.get('mydata')
+        assert_frame_equal(df, df2)
+
+    def test_metadata_cache(self):
+        store = self._make_store(prefix='')
+        self.assertIsNone(store.metadata_cache)
+        self.addCleanup(setattr, store.defaults, 'OMEGA_METADATA_CACHE', store.defaults.OMEGA_METADATA_CACHE)
+        store.defaults.OMEGA_METADATA_CACHE = {'enabled': True, 'ttl': 30}
+        cache = store.metadata_cache
+        self.addCleanup(cache.clear)
+        cache.clear()
+        store.put({'a': 1}, 'mydata')
+        # first access queries the db, next is served from cache as a new object
+        meta = store.metadata('mydata')
+        hits = cache.hits
+        meta2 = store.metadata('mydata')
+        self.assertEqual(cache.hits, hits + 1)
+        self.assertIsNot(meta, meta2)
+        self.assertEqual(meta.pk, meta2.pk)
+        # saving invalidates the cache
+        meta2.attributes['foo'] = 'bar'
+        meta2.save()
+        self.assertEqual(store.metadata('mydata').attributes['foo'], 'bar')
+        # put, drop invalidate the cache
+        store.put({'a': 2}, 'mydata', append=False)
+        self.assertGreater(store.metadata('mydata').modified, meta.modified)
+        store.drop('mydata')
+        self.assertIsNone(store.metadata('mydata'))
+
     def test_put_dataframe_timestamp(self):
         # create some dataframe
         from datetime import datetime
@@ -268,6 +268,36 @@ class TrackingTestCases(OmegaTestMixin, unittest.TestCase):
         exp = om.models.get('experiments/myexp', data_store=om.datasets)
         self.assertEqual(len(exp.data(event='metric')), 1)
 
+    def test_experiment_async_flush(self):
+        om = self.om
+        with om.runtime.experiment('myexp', async_flush=True) as exp:
+            for i in range(100):
+                exp.log_metric('accuracy', i)
+            self.assertIsNotNone(exp.experiment._flusher)
+        # stop() waits for all events to be written
+        stats = exp.flush_stats()
+        self.assertEqual(stats['queued'], 0)
+        self.assertEqual(stats['dropped'], 0)
+        self.assertEqual(stats['written'], stats['enqueued'])
+        exp = om.models.get('experiments/myexp', data_store=om.datasets)
+        self.assertEqual(len(exp.data(event='metric')), 100)
+        # the background flusher is not stored with the experiment
+        self.assertIsNone(exp._flusher)
+        # all trackers of the experiment share one flusher, i.e. one thread
+        for i in range(3):
+            with om.runtime.experiment('myexp', async_flush=True) as exp:
+                exp.log_metric('accuracy', i)
+                flusher = exp.experiment._flusher
+        exp = om.models.get('experiments/myexp', data_store=om.datasets)
+        exp._async_flush = True
+        self.assertIs(exp._async_flusher(), flusher)
+        # drop-oldest policy drops events if the queue is full
+        with om.runtime.experiment('myexp2', async_flush={'maxsize': 5, 'policy': 'drop-oldest'}) as exp:
+            for i in range(100):
+                exp.log_metric('accuracy', i)
+        stats = exp.flush_stats()
+        self.assertEqual(stats['written'] + stats['dropped'], stats['enqueued'])
+
     def test_experiments_not_versioned(self):
         om = self.om
         with om.runtime.experiment('myexp') as exp:
@@ -432,6 +462,30 @@ class TrackingTestCases(OmegaTestMixin, unittest.TestCase):
         self.assertEqual(len(latency_perc), 1)
         self.assertIn('50%', latency_perc.columns)
 
+    def test_stats_pushdown(self):
+        om = self.om
+        for i in range(10):
+            with om.runtime.experiment('myexp') as exp:
+                for j in range(5):
+                    exp.log_metric('accuracy', .9 + i * .01 + j * .001)
+        # statistics calculated by the database
+        exp = om.runtime.experiment('myexp')
+        self.assertTrue(exp.stats.options.pushdown)
+        metrics = exp.stats.metrics(run='all')
+        latency = exp.stats.latency(run='all', percentiles=True)
+        throughput = exp.stats.throughput(run='all')
+        # statistics calculated by pandas
+        exp.stats.options.pushdown = False
+        expected_metrics = exp.stats.metrics(run='all')
+        expected_latency = exp.stats.latency(run='all', percentiles=True)
+        expected_throughput = exp.stats.throughput(run='all')
+        assert_almost_equal(metrics.values, expected_metrics.values)
+        self.assertEqual(list(metrics.columns), list(expected_metrics.columns))
+        self.assertEqual(list(metrics.index), list(expected_metrics.index))
+        assert_almost_equal(latency.values, expected_latency.values, decimal=3)
+        self.assertEqual(list(latency.columns), list(expected_latency.columns))
+        self.assertEqual(len(throughput), len(expected_throughput))
+
     def test_lazy_data(self):
         om = self.om
         for i in range(10):
@@ -1,7 +1,8 @@
 import numpy as np
+import scipy.sparse as sp
 import unittest
 from numpy.testing import assert_allclose
-from omegaml.backends.genai.embedding import SimpleEmbeddingModel
+from omegaml.backends.genai.embedding import SimpleEmbeddingModel, dense_vector, sparse_matrix, sparse_to_dict
 from sklearn.feature_extraction.text import TfidfVectorizer
 
 
@@ -41,6 +42,38 @@ class TestSimpleEmbeddingModel(unittest.TestCase):
               0.479527938028855, 0.479527938028855],
              [0.8610369959439764, 0.5085423203783267, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0]]), rtol=1e-1)
 
+    def test_embed_sparse(self):
+        model = SimpleEmbeddingModel(sparse=True).fit(self.documents)
+        embeddings = model.embed(self.documents)
+        self.assertTrue(sp.issparse(embeddings))
+        self.assertEqual(embeddings.shape, (3, model.dimensions))
+        dense = SimpleEmbeddingModel().fit(self.documents).embed(self.documents)
+        assert_allclose(embeddings.toarray(), dense)
+        # sparse vectors can be stored as indices and values
+        vector = sparse_to_dict(embeddings[0])
+        self.assertEqual(vector['size'], model.dimensions)
+        self.assertEqual(len(vector['indices']), embeddings[0].nnz)
+        assert_allclose(sparse_matrix([vector]).toarray(), embeddings[0].toarray(), rtol=1e-6)
+        assert_allclose(dense_vector(vector), dense[0], rtol=1e-6)
+
+    def test_embed_projection(self):
+        model = SimpleEmbeddingModel(projection='hashing', n_components=32).fit(self.documents)
+        embeddings = model.embed(self.documents)
+        self.assertIsInstance(embeddings, np.ndarray)
+        self.assertEqual(embeddings.shape, (3, 32))
+        self.assertEqual(model.dimensions, 32)
+        model = SimpleEmbeddingModel(projection='hashing', n_components=32, sparse=True).fit(self.documents)
+        self.assertTrue(sp.issparse(model.embed(self.documents)))
+        model = SimpleEmbeddingModel(projection='svd', n_components=2).fit(self.documents)
+        embeddings = model.embed(self.documents)
+        self.assertIsInstance(embeddings, np.ndarray)
+        self.assertEqual(embeddings.shape, (3, 2))
+        self.assertEqual(model.dimensions, 2)
+        with self.assertRaises(ValueError):
+            SimpleEmbeddingModel(projection='svd', sparse=True)
+        with self.assertRaises(ValueError):
+            SimpleEmbeddingModel(projection='unknown')
+
 
 if __name__ == '__main__':
     unittest.main()
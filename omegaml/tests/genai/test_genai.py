@@ -224,6 +224,40 @@ class GenAIModelTests(OmegaTestMixin, TestCase):
         self.assertEqual(conversation_log[1]['role'], 'user')
         self.assertEqual(conversation_log[2]['role'], 'assistant')
 
+    @mock.patch('omegaml.backends.genai.textmodel.OpenAIProvider')
+    def test_openai_chat_conversation_cache(self, OpenAIProvider):
+        from omegaml.backends.genai.convcache import conversation_cache
+        om = self.om
+        self.addCleanup(setattr, om.defaults, 'OMEGA_CONVERSATION_CACHE', om.defaults.OMEGA_CONVERSATION_CACHE)
+        om.defaults.OMEGA_CONVERSATION_CACHE = {'enabled': True, 'maxsize': 10, 'ttl': 60}
+        conversation_cache.clear()
+        self.addCleanup(conversation_cache.clear)
+        meta = om.models.put('openai+http://localhost/mymodel', 'mymodel')
+        model = om.models.get('mymodel', data_store=om.datasets)
+        model.provider = OpenAIProvider
+        model.provider.complete.return_value = AttrDict({
+            'choices': [AttrDict({
+                'message': AttrDict({
+                    'role': 'assistant',
+                    'content': 'hello how are you',
+                })})]
+        })
+        # the history is loaded from tracking once, then kept in the cache
+        with patch.object(model, 'conversation', wraps=model.conversation) as conversation:
+            conversation_id, result = model.chat('hello')
+            for i in range(3):
+                model.chat(f'turn {i}', conversation_id=conversation_id)
+            self.assertEqual(conversation.call_count, 1)
+        cached = model.provider.complete.call_args.kwargs['messages']
+        self.assertEqual(conversation_cache.stats()['hits'], 3)
+        # all messages are tracked, the cached history is the same as the tracked history
+        conversation_log = model.conversation(conversation_id, raw=True)
+        self.assertEqual(len(conversation_log), 1 + 4 * 2)  # system, 4 x (user, assistant)
+        conversation_cache.clear()
+        model.chat('turn 3', conversation_id=conversation_id)
+        rehydrated = model.provider.complete.call_args.kwargs['messages']
+        self.assertEqual(len(rehydrated), len(cached) + 2)
+
     @mock.patch('omegaml.backends.genai.textmodel.OpenAIProvider')
     def test_openai_stream(self, OpenAIProvider):
         meta = self.om.models.put('openai+http://localhost/mymodel', 'mymodel')
@@ -282,6 +316,40 @@ class GenAIModelTests(OmegaTestMixin, TestCase):
         # check stream completes ok
         self.assertEqual(result[-1].get('finish_reason'), 'stop.consolidated')
 
+    @mock.patch('omegaml.backends.genai.textmodel.OpenAIProvider')
+    def test_openai_stream_flush(self, OpenAIProvider):
+        meta = self.om.models.put('openai+http://localhost/mymodel', 'mymodel')
+        model = self.om.models.get('mymodel', data_store=self.om.datasets)
+        assistant_response = 'hello how are you'
+        openai_responses = [AttrDict({
+            'choices': [AttrDict({
+                'finish_reason': 'stop' if i == len(assistant_response) - 1 else None,
+                'delta': AttrDict({
+                    'role': 'assistant',
+                    'content': c,
+                })})]
+        }) for i, c in enumerate(assistant_response)]
+        model.provider = OpenAIProvider
+        model.provider.complete.return_value = openai_responses
+        # a streamed chat flushes tracked events once, also if it is not fully consumed
+        with patch.object(model.tracking, 'flush') as flush:
+            result = model.chat('hello', stream=True)
+            next(result)
+            flush.assert_not_called()
+            result.close()
+            self.assertEqual(flush.call_count, 1)
+        # a completion flushes tracked events once
+        model.provider.complete.return_value = AttrDict({
+            'choices': [AttrDict({
+                'message': AttrDict({
+                    'role': 'assistant',
+                    'content': 'hello how are you',
+                })})]
+        })
+        with patch.object(model.tracking, 'flush') as flush:
+            model.complete('hello')
+            self.assertEqual(flush.call_count, 1)
+
     @mock.patch('omegaml.backends.genai.textmodel.OpenAIProvider')
     def test_openai_embedding(self, OpenAIProvider):
         meta = self.om.models.put('openai+http://localhost/mymodel', 'mymodel')
@@ -306,6 +374,36 @@ class GenAIModelTests(OmegaTestMixin, TestCase):
         result = model.embed('the quick brown fox jumps', raw=True)
         self.assertEqual(result, openai_responses)
 
+    @mock.patch('omegaml.backends.genai.textmodel.OpenAIProvider')
+    def test_openai_embedding_cache(self, OpenAIProvider):
+        om = self.om
+        self.addCleanup(setattr, om.defaults, 'OMEGA_EMBEDDING_CACHE', om.defaults.OMEGA_EMBEDDING_CACHE)
+        om.defaults.OMEGA_EMBEDDING_CACHE = {'enabled': True, 'maxbytes': 1024 ** 2, 'sweep_interval': 0}
+        meta = om.models.put('openai+http://localhost/mymodel', 'mymodel')
+        model = om.models.get('mymodel')
+        self.assertIsNotNone(model.embedding_cache)
+        model.embedding_cache.clear()
+        # mock openai call, embedding is [len(text), index]
+        model.provider = OpenAIProvider
+        model.provider.embed.side_effect = lambda documents, **kwargs: {
+            'data': [{'embedding': [len(doc), i]} for i, doc in enumerate(documents)]
+        }
+        result = model.embed(['a', 'bb'])
+        self.assertEqual(result, [[1, 0], [2, 1]])
+        self.assertEqual(model.provider.embed.call_count, 1)
+        # only the missing document is sent to the provider
+        result = model.embed(['bb', 'ccc', 'a'])
+        self.assertEqual(result, [[2, 1], [3, 0], [1, 0]])
+        self.assertEqual(model.provider.embed.call_count, 2)
+        self.assertEqual(model.provider.embed.call_args[0][0], ['ccc'])
+        stats = model.embedding_cache.stats()
+        self.assertEqual(stats['entries'], 3)
+        self.assertEqual(stats['hits'], 2)
+        # the size budget evicts least recently used embeddings
+        model.embedding_cache.maxbytes = 16
+        model.embedding_cache.sweep(force=True)
+        self.assertEqual(model.embedding_cache.stats()['entries'], 1)
+
     def test_tool_function(self):
         om = self.om
 
@@ -1,3 +1,5 @@
+import numpy as np
+
 from omegaml.backends.genai.inmemory import InMemoryVectorStore
 from omegaml.tests.genai.test_pgvector import PGVectorDBTests
 
@@ -10,5 +12,38 @@ class InMemoryVectorDBTests(PGVectorDBTests):
     def test_put_get_mocked(self):
         pass
 
+    def test_find_similar_vectorized(self):
+        om = self.om
+        om.datasets.put(self._cnx_str, 'mydocs', replace=True, collection='test', vector_size=8)
+        rng = np.random.default_rng(42)
+        embeddings = rng.normal(size=(100, 8))
+        documents = [(f'text {i}', embeddings[i].tolist(), {'tags': ['even' if i % 2 == 0 else 'odd']})
+                     for i in range(len(embeddings))]
+        om.datasets.put(documents, 'mydocs')
+        index = om.datasets.get('mydocs')
+        query = rng.normal(size=8)
+        # l2 distances match a brute-force search
+        expected = np.sort(np.linalg.norm(embeddings - query, axis=1))[:5]
+        results = index.store.find_similar(index.name, query, top=5)
+        np.testing.assert_allclose([r['distance'] for r in results], expected, rtol=1e-5)
+        # cos distances match a brute-force search
+        cos = 1 - embeddings @ query / (np.linalg.norm(embeddings, axis=1) * np.linalg.norm(query))
+        results = index.store.find_similar(index.name, query, top=5, distance='cos')
+        np.testing.assert_allclose([r['distance'] for r in results], np.sort(cos)[:5], rtol=1e-4, atol=1e-6)
+        # filters are applied before selecting the top results
+        results = index.store.find_similar(index.name, query, top=5, filter={'tags': ['odd']})
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(r['attributes']['tags'] == ['odd'] for r in results))
+        # multiple queries return one list of results per query
+        results = index.store.find_similar(index.name, [query, embeddings[3]], top=2)
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[1][0]['text'], 'text 3')
+        # inserting new documents updates the matrix
+        om.datasets.put([('new text', (query * 1.0).tolist())], 'mydocs')
+        results = index.store.find_similar(index.name, query, top=1)
+        self.assertEqual(results[0]['text'], 'new text')
+        with self.assertRaises(ValueError):
+            index.store.find_similar(index.name, query, distance='unknown')
+
 
 PGVectorDBTests = None  # type: ignore
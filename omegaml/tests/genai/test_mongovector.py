@@ -1,3 +1,10 @@
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import numpy as np
+from bson import ObjectId
+
+from omegaml.backends.genai.annindex import IVFIndex
 from omegaml.backends.genai.mongovector import MongoDBVectorStore
 from omegaml.tests.genai.test_pgvector import PGVectorDBTests
 
@@ -10,5 +17,90 @@ class MongoVectorDBTests(PGVectorDBTests):
     def test_put_get_mocked(self):
         pass
 
+    def test_ann_index(self):
+        om = self.om
+        om.datasets.put(self._cnx_str, 'mydocs', replace=True, collection='test', vector_size=8,
+                        ann={'nlist': 4, 'nprobe': 4, 'train_size': 50})
+        rng = np.random.default_rng(42)
+        embeddings = rng.normal(size=(100, 8))
+        documents = [(f'text {i}', embeddings[i].tolist(), {'tags': ['even' if i % 2 == 0 else 'odd']})
+                     for i in range(len(embeddings))]
+        om.datasets.put(documents, 'mydocs')
+        # with nprobe == nlist, the ann search is exact
+        query = rng.normal(size=8)
+        expected = np.sort(np.linalg.norm(embeddings - query, axis=1))[:5]
+        chunks = om.datasets.get('mydocs', document=query.tolist(), top=5)
+        np.testing.assert_allclose([c['distance'] for c in chunks], expected, rtol=1e-5)
+        self.assertIn('text', chunks[0])
+        self.assertIn('attributes', chunks[0])
+        # the index is persisted
+        index = IVFIndex()
+        for segment in om.datasets.fs.find({'filename': 'vecdb_mydocs_ann'}, sort=[('uploadDate', 1)]):
+            index.apply(segment.read())
+        self.assertEqual(len(index), 100)
+        self.assertTrue(index.is_trained)
+        # deleting a document removes its chunks from the index
+        index = om.datasets.get('mydocs')
+        document = index.list()[0]
+        om.datasets.drop('mydocs', obj=document)
+        chunks = om.datasets.get('mydocs', document=embeddings[0].tolist(), top=1)
+        self.assertNotEqual(chunks[0]['text'], 'text 0')
+        # dropping the index removes the ann index
+        om.datasets.drop('mydocs')
+        self.assertEqual(len(list(om.datasets.fs.find({'filename': 'vecdb_mydocs_ann'}))), 0)
+        lease = om.datasets.collection('vecdb_mydocs_ann_lease').name
+        self.assertNotIn(lease, om.datasets.mongodb.list_collection_names())
+
+    def test_ann_lease(self):
+        om = self.om
+        om.datasets.put(self._cnx_str, 'mydocs', replace=True, collection='test', vector_size=2,
+                        ann={'nlist': 2, 'nprobe': 2, 'train_size': 4})
+        om.datasets.put([('text 0', [0.0, 1.0])], 'mydocs')
+        # another process holds the write lease, writers wait for it
+        leases = om.datasets.collection('vecdb_mydocs_ann_lease')
+        leases.update_one({'_id': 'ann'}, {'$set': {'owner': ObjectId(),
+                                                    'expires': datetime.utcnow() + timedelta(seconds=60)}})
+        with patch.object(MongoDBVectorStore, 'ANN_LEASE_TIMEOUT', 0.1):
+            with self.assertRaises(TimeoutError):
+                om.datasets.put([('text 1', [1.0, 0.0])], 'mydocs')
+        # no document is inserted if the lease is not acquired
+        self.assertEqual(len(om.datasets.get('mydocs').list()), 1)
+        # an expired lease is taken over
+        leases.update_one({'_id': 'ann'}, {'$set': {'expires': datetime.utcnow() - timedelta(seconds=1)}})
+        om.datasets.put([('text 2', [1.0, 1.0])], 'mydocs')
+        self.assertIsNone(leases.find_one({'_id': 'ann'})['owner'])
+        chunks = om.datasets.get('mydocs', document=[1.0, 1.0], top=1)
+        self.assertEqual(chunks[0]['text'], 'text 2')
+        # without ann, deleting documents does not use a lease
+        om.datasets.put(self._cnx_str, 'plaindocs', replace=True, collection='test', vector_size=2)
+        om.datasets.put([('text 0', [0.0, 1.0])], 'plaindocs')
+        om.datasets.drop('plaindocs', obj=om.datasets.get('plaindocs').list()[0])
+        lease = om.datasets.collection('vecdb_plaindocs_ann_lease').name
+        self.assertNotIn(lease, om.datasets.mongodb.list_collection_names())
+
+    def test_build_pipeline(self):
+        om = self.om
+        om.datasets.put(self._cnx_str, 'mydocs', replace=True, collection='test', vector_size=2)
+
+        class EmbeddingModel:
+            calls = []
+
+            def embed(self, texts):
+                self.calls.append(len(texts))
+                return [[float(len(text)), 1.0] for text in texts]
+
+        model = EmbeddingModel()
+        index = om.datasets.get('mydocs', embedding_model=model)
+        documents = [(f'text {i}', {'tags': [str(i)]}) for i in range(10)]
+        documents.append((['chunk'], [[5.0, 1.0]], {'tags': ['embedded']}))
+        stats = index.build(documents, batch_size=4, in_flight=2)
+        # chunks of many documents are embedded in batches of batch_size
+        self.assertEqual(model.calls, [4, 4, 2])
+        self.assertEqual(stats['insert']['documents'], 11)
+        self.assertEqual(stats['embed']['chunks'], 10)
+        self.assertEqual(len(index.list()), 11)
+        chunks = om.datasets.get('mydocs', document=[5.0, 1.0], top=1)
+        self.assertEqual(chunks[0]['text'], 'chunk')
+
 
 PGVectorDBTests = None  # type: ignore
@@ -2,12 +2,13 @@ from contextlib import contextmanager
 from unittest import TestCase, mock
 from unittest.mock import MagicMock
 
+import numpy as np
 from sklearn.exceptions import NotFittedError
 
 from omegaml.backends.genai.dbmigrate import DatabaseMigrator
 from omegaml.backends.genai.embedding import SimpleEmbeddingModel
 from omegaml.backends.genai.index import DocumentIndex
-from omegaml.backends.genai.pgvector import PGVectorBackend
+from omegaml.backends.genai.pgvector import PGVectorBackend, PGVECTOR_COLLECTIONS
 from omegaml.client.util import subdict
 from omegaml.tests.util import OmegaTestMixin
 
@@ -205,6 +206,85 @@ class PGVectorDBTests(OmegaTestMixin, TestCase):
         labels = index.attributes(key='labels')
         self.assertEqual(labels, {'labels': {'lazy': 1}})
 
+    def test_sparse_embedding(self):
+        om = self.om
+        documents = [
+            'The quick brown fox jumps over the lazy dog',
+            'The lazy dog sleeps',
+            'A fast car zooms by',
+        ]
+        embedding_model = SimpleEmbeddingModel(sparse=True).fit(documents)
+        om.models.put(embedding_model, 'embedding')
+        om.datasets.put(self._cnx_str, 'mydocs',
+                        embedding_model='embedding',
+                        collection='test4',
+                        vector_size=embedding_model.dimensions,
+                        replace=True)
+        om.datasets.put(documents, 'mydocs', model_store=om.models)
+        mydocs = om.datasets.get('mydocs', model_store=om.models)
+        # distances of sparse embeddings are the same as of dense embeddings
+        dense = SimpleEmbeddingModel().fit(documents).embed(documents)
+        norms = np.linalg.norm(dense, axis=1)
+        for i, doc in enumerate(documents):
+            expected = {
+                'l2': np.linalg.norm(dense - dense[i], axis=1),
+                'cos': 1 - dense @ dense[i] / (norms * norms[i]),
+            }
+            for distance, distances in expected.items():
+                docs = mydocs.retrieve(doc, top=3, distance=distance)
+                self.assertEqual(docs[0]['text'], doc)
+                np.testing.assert_allclose([d['distance'] for d in docs], np.sort(distances), atol=1e-5)
+
+    def test_index_options(self):
+        om = self.om
+        indexes = {
+            'l2': {'method': 'hnsw', 'm': 8, 'ef_construction': 32, 'ef_search': 50},
+            'cos': {'method': 'ivfflat', 'lists': 1, 'probes': 1},
+        }
+        om.datasets.put(self._cnx_str, 'mydocs', replace=True, collection='test5', vector_size=3,
+                        indexes=indexes)
+        documents = [
+            ('my text', [1, 2, 3]),
+            ('my other text', [99, 100, 200]),
+            ('a third text', [-1, 0, 1]),
+        ]
+        om.datasets.put(documents, 'mydocs')
+        index = om.datasets.get('mydocs')
+        for distance in ('l2', 'cos'):
+            results = index.store.find_similar(index.name, [1, 2, 3], top=1, distance=distance,
+                                               ef_search=10, probes=1)
+            self.assertEqual(results[0]['text'], 'my text')
+        if self._vectordb_cls is PGVectorBackend:
+            # the schema is set up once and recorded in the metadata
+            meta = om.datasets.metadata('mydocs')
+            schema = meta.kind_meta['collections']['test5']['schema']
+            self.assertEqual(schema['indexes'], indexes)
+            self.assertEqual(schema['vector_size'], 3)
+            # -- a new process does not repeat the setup
+            PGVECTOR_COLLECTIONS.clear()
+            with mock.patch.object(PGVectorBackend, '_setup_collection') as setup:
+                om.datasets.put([('another text', [1, 1, 1])], 'mydocs')
+                self.assertEqual(len(om.datasets.get('mydocs').list()), 4)
+                setup.assert_not_called()
+            # -- an index that could not be created is not recorded, and is retried
+            om.datasets.put(self._cnx_str, 'otherdocs', replace=True, collection='test6', vector_size=3,
+                            indexes=indexes)
+            make_index = PGVectorBackend._index
+
+            def failing_index(backend, Chunk, metric, options):
+                if metric == 'cos':
+                    raise ValueError('cannot create index')
+                return make_index(backend, Chunk, metric, options)
+
+            with mock.patch.object(PGVectorBackend, '_index', failing_index):
+                om.datasets.put(documents, 'otherdocs')
+            schema = om.datasets.metadata('otherdocs').kind_meta['collections']['test6']['schema']
+            self.assertEqual(schema['indexes'], {'l2': indexes['l2']})
+            PGVECTOR_COLLECTIONS.clear()
+            om.datasets.put([('another text', [1, 1, 1])], 'otherdocs')
+            schema = om.datasets.metadata('otherdocs').kind_meta['collections']['test6']['schema']
+            self.assertEqual(schema['indexes'], indexes)
+
     def test_index(self):
         om = self.om
 
@@ -215,11 +295,16 @@ class PGVectorDBTests(OmegaTestMixin, TestCase):
         def _add(obj):
             store.append(obj) if obj.__class__.__name__ == 'Chunk' else None
 
-        def _results(*args, **kwargs):
+        def _results(statement=None, params=None, *args, **kwargs):
             results = MagicMock()
             as_dict = lambda this: {a: getattr(this, a) for a in dir(this) if a in fields}
             results.all.side_effect = lambda: [as_dict(obj) or obj for obj in store]
             results.mappings.side_effect = lambda: results
+            # bulk inserts, see PGVectorBackend._insert()
+            if isinstance(params, dict) and 'n' in params:
+                results.scalars.return_value.all.return_value = list(range(1, params['n'] + 1))
+            if isinstance(params, list) and str(getattr(statement, 'table', '')).endswith('_chunks'):
+                store.extend(params)
             return results
 
         @contextmanager
@@ -10,6 +10,7 @@ import os
 import sys
 import tempfile
 import threading
+import time
 import uuid
 import validators
 import warnings
@@ -361,10 +362,11 @@ def grouper(n, iterable):
         yield itertools.chain((first_el,), chunk_it)
 
 
-def cursor_to_dataframe(cursor, chunk_size=10000, parser=None):
+def cursor_to_dataframe(cursor, chunk_size=10000, parser=None, dtypes=None):
     # a faster and less memory hungry variant of DataFrame.from_records
     # works by building a set of smaller dataframes to reduce memory
     # consumption. Note chunks are of size max. chunk_size.
+    # -- if dtypes are given, numeric columns are built as typed arrays, see records_to_dataframe
     import pandas as pd
     frames = []
     if hasattr(cursor, 'count_documents'):
@@ -375,7 +377,8 @@ def cursor_to_dataframe(cursor, chunk_size=10000, parser=None):
         count = None
     if count is None or count > 0:
         for chunk in grouper(chunk_size, cursor):
-            df = pd.DataFrame.from_records(chunk) if not parser else parser(r for r in chunk)
+            df = (parser(r for r in chunk) if parser
+                  else records_to_dataframe(chunk, dtypes=dtypes))
             frames.append(df)
         if frames:
             df = pd.concat(frames)
@@ -386,6 +389,100 @@ def cursor_to_dataframe(cursor, chunk_size=10000, parser=None):
     return df
 
 
+def records_to_dataframe(records, dtypes=None):
+    """
+    build a DataFrame from a list of dicts
+
+    Same as pd.DataFrame.from_records(records), however if dtypes are given
+    numeric and bool columns are built as typed arrays directly, instead of
+    building an object array first and inferring the type of each column.
+    Columns that cannot be converted to their dtype are inferred by pandas.
+
+    Args:
+        records (iterable): the records, as dicts
+        dtypes (dict): optional, the mapping of column => dtype name,
+           as in kind_meta['dtypes']
+
+    Returns:
+        DataFrame
+
+    .. versionadded:: NEXT
+    """
+    import numpy as np
+    import pandas as pd
+    records = list(records)
+    if not dtypes:
+        return pd.DataFrame.from_records(records)
+    # columns in order of appearance, same as from_records
+    columns = list(records[0]) if records else []
+    if len(set().union(*records)) > len(columns):
+        columns = list(dict.fromkeys(key for record in records for key in record))
+    data = {}
+    for col in columns:
+        values = [record.get(col) for record in records]
+        dtype = tryOr(lambda: np.dtype(dtypes.get(col)), None) if dtypes.get(col) else None
+        if dtype is not None and dtype.kind in 'biuf':
+            # only use the typed array if the values are of the expected kind (e.g. no missing values)
+            arr = tryOr(lambda: np.array(values), None)
+            kind = getattr(arr, 'dtype', np.dtype('O')).kind
+            if kind == dtype.kind or (dtype.kind == 'f' and kind in 'iu'):
+                data[col] = arr.astype(dtype, copy=False)
+                continue
+        data[col] = values
+    return pd.DataFrame(data, columns=columns)
+
+
+def collection_to_dataframe(collection, filter=None, projection=None, dtypes=None,
+                            n_jobs=4, chunk_size=50000):
+    """
+    read documents into a DataFrame using parallel cursors
+
+    Splits the documents into ranges of _om#rowid, and reads each range
+    by a separate cursor in a pool of threads. This overlaps the network
+    I/O of one cursor with decoding and DataFrame construction of others.
+    The resulting DataFrame is in order of ranges, i.e. in the order of
+    _om#rowid. Falls back to a single cursor if the documents do not have
+    an integer _om#rowid.
+
+    Args:
+        collection (Collection): the collection, or FilteredCollection
+        filter (dict): optional, the query filter
+        projection (list|dict): optional, the projection
+        dtypes (dict): optional, the mapping of column => dtype, see records_to_dataframe
+        n_jobs (int): the number of parallel cursors
+        chunk_size (int): the number of rows in each range, is increased
+           to ensure there are at most n_jobs * 4 ranges
+
+    Returns:
+        DataFrame
+
+    .. versionadded:: NEXT
+    """
+    import pandas as pd
+    from concurrent.futures import ThreadPoolExecutor
+
+    filter = filter or {}
+    sorted_rowids = lambda order: collection.find_one(filter, projection={'_om#rowid': 1, '_id': 0},
+                                                      sort=[('_om#rowid', order)]) or {}
+    lower, upper = sorted_rowids(1).get('_om#rowid'), sorted_rowids(-1).get('_om#rowid')
+    if n_jobs < 2 or not all(isinstance(v, int) for v in (lower, upper)):
+        return cursor_to_dataframe(collection.find(filter=filter, projection=projection), dtypes=dtypes)
+    upper += 1
+    range_size = max(int(chunk_size), -(-(upper - lower) // (n_jobs * 4)))
+    ranges = [(i, min(i + range_size, upper)) for i in range(lower, upper, range_size)]
+
+    def read(bounds):
+        range_filter = {'_om#rowid': {'$gte': bounds[0], '$lt': bounds[1]}}
+        query = {'$and': [filter, range_filter]} if filter else range_filter
+        cursor = collection.find(filter=query, projection=projection)
+        # convert in chunks of the default size, a range may hold millions of rows
+        return cursor_to_dataframe(cursor, dtypes=dtypes)
+
+    with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+        frames = [df for df in pool.map(read, ranges) if len(df)]
+    return pd.concat(frames) if frames else pd.DataFrame()
+
+
 def ensure_index(coll, idx_specs, replace=False, **kwargs):
     """
     ensure a pymongo index specification exists on a given collection
@@ -1215,6 +1312,75 @@ class ProcessLocal(dict):
         return (self._cache or super()).__contains__(item)
 
 
+class CacheCounters:
+    """ process-local hit/miss counters and sweep times of persistent caches
+
+    Caches stored in a database, e.g. ApplyCache and EmbeddingCache, share
+    their entries across processes, while counters and sweep times are
+    kept by each process. Each cache module holds one CacheCounters, keyed
+    by the cache's database or collection. All methods are thread-safe, a
+    forked child process starts with no counters.
+
+    Usage::
+
+        counters = CacheCounters()
+        counters.count(key, hits=1, misses=2)
+        counters.get(key)
+        => {'hits': 1, 'misses': 2}
+        if counters.sweep_due(key, interval=300):
+            ... # sweep the cache
+
+    .. versionadded:: NEXT
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._pid = None
+        self._check_pid()
+
+    def _check_pid(self):
+        if self._pid != os.getpid():
+            self._counters = {}
+            self._last_sweep = {}
+            self._pid = os.getpid()
+
+    def count(self, key, hits=0, misses=0):
+        """ add hits and misses to the counters of key """
+        with self._lock:
+            self._check_pid()
+            counters = self._counters.setdefault(key, {'hits': 0, 'misses': 0})
+            counters['hits'] += hits
+            counters['misses'] += misses
+
+    def get(self, key):
+        """ return dict(hits, misses) of key """
+        with self._lock:
+            self._check_pid()
+            return dict(self._counters.get(key) or {'hits': 0, 'misses': 0})
+
+    def reset(self, key):
+        """ reset the counters of key """
+        with self._lock:
+            self._check_pid()
+            self._counters.pop(key, None)
+
+    def sweep_due(self, key, interval, force=False):
+        """ return True and record the time if the last sweep of key was more than interval seconds ago
+
+        Args:
+            key (str): the cache key
+            interval (float): the min. number of seconds between sweeps
+            force (bool): if True the sweep is always due
+        """
+        now = time.time()
+        with self._lock:
+            self._check_pid()
+            if not force and now - self._last_sweep.get(key, 0) < (interval or 0):
+                return False
+            self._last_sweep[key] = now
+            return True
+
+
 class KeepMissing(dict):
     # a missing '{key}' is replaced by '{key}'
     # in order to avoid raising KeyError